@@ -0,0 +1,105 @@
+# benchmark_matcher.py - Per-message matching latency vs number of rules
+# Run with:  python3 benchmark_matcher.py --rules 20 100 1000 5000
+#
+# Rule sets are the patterns of intents.json followed by synthetic intents
+# in the same style (phrase alternations between \b anchors, some with
+# \s+ / (\d+) parameters). Messages are half phrases of random rules, half
+# chatter that matches nothing. For every message the prefiltered match must pick the
+# same rule as the linear scan. Times per message (us):
+#   re.search:   the old find_response loop, re.search(pattern_string, text);
+#                past re's 512-pattern cache this recompiles, so it only runs
+#                on the first --slow_messages messages
+#   linear:      the same loop over precompiled patterns
+#   prefiltered: PatternMatcher.match (keyword automaton + candidate regexes)
+
+import re
+import time
+import random
+import argparse
+import statistics
+
+from chatbot import RULES, clean_input
+from matcher import PatternMatcher
+
+EXAMPLES = ["hi", "how are you", "what can you do", "coding tips", "explain big o", "python or c++",
+            "suggest a movie", "any good sci-fi movies?", "anime", "attendance 40 30", "motivate me",
+            "tell me a joke", "who created you"]
+
+
+def make_rules(n: int, rng: random.Random, vocab: list) -> list:
+    rules = list(RULES.patterns[:n])
+    while len(rules) < n:
+        phrases = [" ".join(rng.sample(vocab, rng.randint(1, 3))) for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.1:
+            rules.append(rf"\b{rng.choice(vocab)}\s+(\d+)\b")
+        else:
+            rules.append(r"\b(" + "|".join(phrases) + r")\b")
+    return rules
+
+
+def make_messages(rules: list, n: int, rng: random.Random, vocab: list, filler: list) -> list:
+    messages = []
+    for _ in range(n):
+        if rng.random() < 0.5:
+            # Text containing a phrase of a random rule (or a built-in example)
+            rule = rng.choice(rules)
+            if rule.startswith(r"\b(") and rule.endswith(r")\b") and "\\" not in rule[3:-3]:
+                phrase = rng.choice(rule[3:-3].split("|"))
+            else:
+                phrase = rng.choice(EXAMPLES)
+            messages.append(f"{' '.join(rng.sample(filler, 3))} {phrase} {' '.join(rng.sample(filler, 2))}")
+        else:
+            messages.append(" ".join(rng.sample(filler, rng.randint(3, 12))))
+    return [clean_input(m) for m in messages]
+
+
+def time_us(fn, messages) -> list:
+    times = []
+    for text in messages:
+        start = time.perf_counter()
+        fn(text)
+        times.append(1e6 * (time.perf_counter() - start))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, nargs="+", default=[20, 100, 1000, 5000])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--slow_messages", type=int, default=200, help="Messages timed with re.search")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = [f"intent{i}" for i in range(3000)]
+    filler = ["so", "i", "was", "wondering", "about", "the", "weather", "today", "maybe", "later", "ok",
+              "please", "thanks", "my", "friend", "said", "that", "this", "is", "weird", "lol", "again"]
+
+    print(f"{'rules':>6} | {'build ms':>8} | {'re.search p50/p99':>18} | {'linear p50/p99':>16} | "
+          f"{'prefiltered p50/p99':>20}")
+    for n in args.rules:
+        rules = make_rules(n, rng, vocab)
+        messages = make_messages(rules, args.messages, rng, vocab, filler)
+
+        start = time.perf_counter()
+        matcher = PatternMatcher(rules)
+        build_ms = 1000 * (time.perf_counter() - start)
+
+        for text in messages:
+            assert matcher.match(text)[0] == matcher.match_linear(text)[0], text
+
+        def re_search(text):
+            for i, pattern in enumerate(rules):
+                if re.search(pattern, text):
+                    return i
+
+        row = []
+        for fn, sample in ((re_search, messages[:args.slow_messages]), (matcher.match_linear, messages),
+                           (matcher.match, messages)):
+            times = sorted(time_us(fn, sample))
+            row.append(f"{statistics.median(times):7.1f} /{times[int(0.99 * len(times))]:8.1f}")
+        print(f"{n:>6} | {build_ms:>8.1f} | {row[0]:>18} | {row[1]:>16} | {row[2]:>20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 # chatbot.py - Rule-based AI Chatbot for Portfolio
 # Works in terminal. Run with:  python3 chatbot.py
 
+import os
 import random
-import re
+import argparse
+import threading
+
+from intents import ACTIONS, IntentError, RuleTable, load_rules, register_action
 
 # -----------------------------
 # PATTERN → RESPONSES / ACTIONS
@@ -62,104 +66,51 @@ def show_help():
         "- Type 'bye' or 'quit' to exit."
     )
 
-PATTERNS = [
-    # Greetings
-    (r'\b(hi|hello|hey)\b', [
-        "Hello! How can I help you today?",
-        "Hi there! What do you want to talk about?",
-        "Hey! Need help with coding, movies, or attendance?"
-    ]),
-
-    (r'\bhow are you\b', [
-        "I'm doing great, thanks for asking! How are you?",
-        "All systems running fine. How are you feeling?",
-        "I’m good. Ready to help you with anything."
-    ]),
-
-    # About bot
-    (r'\bwhat is your name\b', [
-        "I'm a simple AI chatbot built by Samarth Shukla.",
-        "You can call me SamBot, made by Samarth Shukla.",
-        "I'm Samarth's chatbot project for his AI/ML portfolio."
-    ]),
-
-    (r'\b(who created you|your creator)\b', [
-        "I was created by Samarth Shukla, B.Tech CSE (AIML) at SRMIST Delhi NCR.",
-        "Samarth Shukla built me as a rule-based chatbot project.",
-        "My creator is Samarth Shukla."
-    ]),
-
-    # Help / options
-    (r'\b(help|options|what can i ask|what can you do)\b', [
-        show_help
-    ]),
-
-    # Coding help
-    (r'\bcoding tips\b', [
-        "Start with small problems daily, then move to LeetCode / Codeforces. Focus on understanding, not memorizing.",
-        "Pick one language (Python or C++) and be consistent. Solve at least 2–3 DSA problems each day.",
-        "Read other people's solutions after trying yourself. You learn patterns and clean coding style."
-    ]),
-
-    (r'\bhow to learn dsa\b', [
-        "Start with arrays, strings, hash maps, and two pointers. Then move to recursion, trees, and DP.",
-        "Pick a roadmap: arrays → strings → stacks/queues → trees → graphs → DP. Solve at least 5–10 questions per topic."
-    ]),
-
-    (r'\b(explain big o|what is big o)\b', [
-        "Big O describes how fast or slow an algorithm grows as input size increases. Example: O(n) grows linearly, O(n^2) much slower.",
-        "Think of Big O as 'how many steps' roughly. Fewer steps for large n is better."
-    ]),
-
-    (r'\b(python or c\+\+)\b', [
-        "Python is faster to write and great for ML and quick scripts. C++ is faster to run and used in competitive programming.",
-        "If you care about interviews and LeetCode speed, C++ is solid. For AI/ML projects and fast prototyping, Python is perfect."
-    ]),
-
-    # Movie suggestions
-    (r'\b(suggest a movie|movie recommendation|movie suggester|recommend a movie)\b', [
-        lambda: get_movie_suggestions()
-    ]),
-
-    (r'\b(sci[- ]?fi movies|science fiction movies)\b', [
-        lambda: get_movie_suggestions("sci-fi")
-    ]),
-
-    (r'\b(action movies)\b', [
-        lambda: get_movie_suggestions("action")
-    ]),
-
-    (r'\b(drama movies)\b', [
-        lambda: get_movie_suggestions("drama")
-    ]),
-
-    (r'\b(anime movies?|anime)\b', [
-        lambda: get_movie_suggestions("anime")
-    ]),
-
-    # Attendance calculator: pattern like "attendance 40 30"
-    (r'\battendance\s+(\d+)\s+(\d+)\b', 'attendance'),
-
-    # Study / life conversations
-    (r'\bstudy tips\b', [
-        "Use 25 minutes focus + 5 minute break (Pomodoro). Put phone away during the 25 minutes.",
-        "Teach the topic to an imaginary friend. If you can explain it simply, you understand it."
-    ]),
-
-    (r'\b(motivate me|i am tired|i feel lazy)\b', [
-        "Totally normal to feel tired. Do one very small task now, just 5 minutes. Momentum matters more than motivation.",
-        "Remember why you started B.Tech CSE (AIML). Future you will thank present you for today’s 30 minutes of focus.",
-        "You don't have to be perfect; you just need to be a little better than yesterday."
-    ]),
-
-    # Jokes
-    (r'\b(joke|make me laugh|tell me a joke)\b', [
-        "Why do programmers prefer dark mode? Because light attracts bugs.",
-        "There are only 10 types of people in the world: those who understand binary and those who don't.",
-        "I had a bug in my code, so I added a print statement. Now I have two problems."
-    ]),
+# Handlers that intent files can name in "action"; each gets the regex match and the intent's args
+register_action("show_help", lambda match: show_help())
+register_action("get_movie_suggestions", lambda match, genre=None: get_movie_suggestions(genre))
+register_action("calculate_attendance",
+                lambda match, *args: calculate_attendance(int(match.group(1)), int(match.group(2)), *args),
+                groups=2)
+
+FALLBACK_RESPONSES = [
+    "That's interesting. You can type 'help' to see what I can do.",
+    "I'm not sure about that yet. Try asking for 'help' to see my skills.",
+    "I didn't understand fully. Type 'help' to see example questions."
 ]
 
+# Patterns, responses and actions live in intents.json (see intents.py)
+INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intents.json")
+RULES = load_rules(INTENTS_PATH, FALLBACK_RESPONSES)
+_RELOAD_LOCK = threading.Lock()
+_REJECTED = None  # (path, size, mtime_ns, IntentError) of the last intent file that failed to load
+
+def reload_rules(path: str = None, force: bool = False) -> bool:
+    """
+    Loads the intent file again if it changed on disk (or path is a different
+    file, or force is set) and swaps the new table in with one assignment.
+    Messages already being answered finish on the table they started with.
+    Returns True if the table was replaced; raises IntentError (keeping the
+    current table) if the new file is invalid. A rejected file isn't read
+    again until it changes: until then the same IntentError is raised.
+    """
+    global RULES, _REJECTED
+    with _RELOAD_LOCK:
+        path = path or RULES.source
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        if not force and path == RULES.source and key[1:] == RULES.source_stat:
+            return False
+        if not force and _REJECTED is not None and key == _REJECTED[:3]:
+            raise _REJECTED[3]
+        try:
+            RULES = load_rules(path, FALLBACK_RESPONSES)
+        except IntentError as exc:
+            _REJECTED = key + (exc,)
+            raise
+        _REJECTED = None
+        return True
+
 # -----------------------------
 # CORE CHATBOT FUNCTIONS
 # -----------------------------
@@ -168,40 +119,30 @@ def clean_input(text: str) -> str:
     """Lowercase and strip extra spaces."""
     return text.strip().lower()
 
-def find_response(user_input: str) -> str:
-    """Match user input against patterns and return a response string."""
+def respond(user_input: str, rng=random, rules: RuleTable = None):
+    """
+    (index of the matching intent or None for the fallback, response).
+    rng is anything with .choice (the random module, or a session's own
+    random.Random); rules defaults to the current RULES table.
+    """
+    if rules is None:
+        rules = RULES
     text = clean_input(user_input)
 
-    for pattern, responses in PATTERNS:
-        match = re.search(pattern, text)
-        if not match:
-            continue
-
-        # Attendance special case
-        if responses == 'attendance':
-            total_classes = int(match.group(1))
-            attended_classes = int(match.group(2))
-            return calculate_attendance(total_classes, attended_classes)
-
-        # If response is a callable (function), call it
-        if callable(responses):
-            return responses()
-
-        # If response is a list, randomly choose one
-        if isinstance(responses, list):
-            # Some list entries may be functions (like lambda for movies)
-            choice = random.choice(responses)
-            if callable(choice):
-                return choice()
-            return choice
+    # Only the intents whose keywords occur in the text are tried, still in file order
+    index, match = rules.matcher.match(text)
+    if match:
+        intent = rules.intents[index]
+        if intent.action:
+            return index, ACTIONS[intent.action].handler(match, *intent.args)
+        return index, rng.choice(intent.responses)
 
     # Fallback if nothing matched
-    fallback_responses = [
-        "That's interesting. You can type 'help' to see what I can do.",
-        "I'm not sure about that yet. Try asking for 'help' to see my skills.",
-        "I didn't understand fully. Type 'help' to see example questions."
-    ]
-    return random.choice(fallback_responses)
+    return None, rng.choice(rules.fallback)
+
+def find_response(user_input: str) -> str:
+    """Match user input against patterns and return a response string."""
+    return respond(user_input)[1]
 
 def display_welcome():
     """Print welcome banner."""
@@ -211,10 +152,13 @@ def display_welcome():
     print("Type 'help' to see what I can do.")
     print("Type 'bye' or 'quit' to exit.\n")
 
-def main():
-    """Main chat loop."""
+def main(intents_path: str = None):
+    """Main chat loop. Edits to the intent file take effect from the next message."""
+    if intents_path:
+        reload_rules(intents_path)
     display_welcome()
 
+    reload_error = None
     while True:
         user_input = input("You: ").strip()
         if not user_input:
@@ -224,9 +168,20 @@ def main():
             print("Chatbot: Goodbye! Have a great day.")
             break
 
+        try:
+            if reload_rules():
+                print(f"(Reloaded {len(RULES)} intents from {RULES.source})")
+            reload_error = None
+        except (IntentError, OSError) as exc:
+            if str(exc) != reload_error:  # say it once, not on every message
+                print(f"(Intent file not reloaded, keeping the previous rules: {exc})")
+            reload_error = str(exc)
+
         response = find_response(user_input)
         print(f"Chatbot: {response}\n")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Rule-based terminal chatbot")
+    parser.add_argument("--intents", type=str, default=None, help="Intent file (JSON, or YAML with PyYAML)")
+    main(parser.parse_args().intents)
 
@@ -0,0 +1,181 @@
+# intents.py - Intent files and the compiled rule table
+#
+# Intents live in a JSON (or, with PyYAML installed, YAML) file instead of
+# Python code:
+#
+#   {
+#     "intents": [
+#       {"name": "greeting", "pattern": "\\b(hi|hello|hey)\\b", "responses": ["Hello!", "Hi there!"]},
+#       {"name": "sci_fi_movies", "pattern": "\\bsci-fi movies\\b",
+#        "action": "get_movie_suggestions", "args": ["sci-fi"]}
+#     ],
+#     "fallback": ["Type 'help' to see what I can do."]
+#   }
+#
+# An intent either picks one of its "responses" at random or calls an
+# action handler registered by name (register_action), with the regex match
+# and the intent's "args". Intents are tried in file order; the first match
+# wins. load_rules() validates the whole file, reporting every problem at
+# once, and compiles it into a RuleTable, which is never modified
+# afterwards - reloading builds a new table and swaps it in.
+
+import os
+import re
+import json
+import time
+import inspect
+from typing import Callable, Dict, List, Optional, Tuple
+
+from matcher import PatternMatcher
+
+
+class IntentError(ValueError):
+    """Raised when an intent file can't be read or fails validation."""
+
+
+class Action:
+    __slots__ = ("name", "handler", "groups")
+
+    def __init__(self, name: str, handler: Callable, groups: int = 0):
+        self.name = name
+        self.handler = handler  # handler(match, *args) -> str
+        self.groups = groups    # capture groups the pattern must have
+
+
+ACTIONS: Dict[str, Action] = {}
+
+
+def register_action(name: str, handler: Callable, groups: int = 0):
+    """Makes handler(match, *args) available to intent files as "action": name."""
+    ACTIONS[name] = Action(name, handler, groups)
+
+
+class Intent:
+    __slots__ = ("name", "pattern", "responses", "action", "args")
+
+    def __init__(self, name: str, pattern: str, responses=(), action: Optional[str] = None, args=()):
+        self.name = name
+        self.pattern = pattern
+        self.responses = tuple(responses)
+        self.action = action
+        self.args = tuple(args)
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, {self.pattern!r})"
+
+
+def _is_strings(value) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(v, str) for v in value)
+
+
+def parse_intents(data) -> Tuple[List[Intent], Optional[List[str]]]:
+    """(intents, fallback responses or None) from a decoded intent file; raises IntentError listing every problem."""
+    if not isinstance(data, dict) or not isinstance(data.get("intents"), list):
+        raise IntentError('An intent file is an object with an "intents" list.')
+
+    problems, intents, names = [], [], set()
+    for i, entry in enumerate(data["intents"]):
+        where = f"intent #{i}"
+        if not isinstance(entry, dict):
+            problems.append(f"{where}: not an object")
+            continue
+        name = entry.get("name")
+        if not isinstance(name, str) or not name:
+            problems.append(f"{where}: missing name")
+        else:
+            where = f"intent '{name}'"
+            if name in names:
+                problems.append(f"{where}: duplicate name")
+            names.add(name)
+
+        pattern, compiled = entry.get("pattern"), None
+        if not isinstance(pattern, str) or not pattern:
+            problems.append(f"{where}: missing pattern")
+        else:
+            try:
+                compiled = re.compile(pattern)
+            except re.error as exc:
+                problems.append(f"{where}: bad pattern {pattern!r}: {exc}")
+
+        responses, action, args = entry.get("responses"), entry.get("action"), entry.get("args", [])
+        if (responses is None) == (action is None):
+            problems.append(f'{where}: needs exactly one of "responses" or "action"')
+        elif responses is not None and not _is_strings(responses):
+            problems.append(f"{where}: responses must be a non-empty list of strings")
+        elif action is not None:
+            if action not in ACTIONS:
+                problems.append(f"{where}: unknown action '{action}' (known: {sorted(ACTIONS)})")
+            elif compiled is not None and compiled.groups < ACTIONS[action].groups:
+                problems.append(f"{where}: action '{action}' needs {ACTIONS[action].groups} capture groups")
+            if not isinstance(args, list):
+                problems.append(f"{where}: args must be a list")
+            elif action in ACTIONS:
+                # The handler is called as handler(match, *args); check that call now, not on the first message
+                try:
+                    inspect.signature(ACTIONS[action].handler).bind(None, *args)
+                except TypeError as exc:
+                    problems.append(f"{where}: args {args} don't fit action '{action}': {exc}")
+        if "args" in entry and action is None:
+            problems.append(f"{where}: args only apply to actions")
+
+        intents.append(Intent(name, pattern, responses or (), action, args if isinstance(args, list) else ()))
+
+    fallback = data.get("fallback")
+    if fallback is not None and not _is_strings(fallback):
+        problems.append("fallback must be a non-empty list of strings")
+    if problems:
+        raise IntentError("Invalid intent file:\n  " + "\n  ".join(problems))
+    return intents, fallback
+
+
+def read_intent_file(path: str):
+    is_yaml = path.lower().endswith((".yaml", ".yml"))
+    errors = (OSError, ValueError)
+    if is_yaml:
+        try:
+            import yaml
+        except ImportError:
+            raise IntentError("YAML intent files need PyYAML (pip install pyyaml); JSON works without it.")
+        errors += (yaml.YAMLError,)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return yaml.safe_load(f) if is_yaml else json.load(f)
+    except errors as exc:
+        raise IntentError(f"Can't read {path}: {exc}") from exc
+
+
+class RuleTable:
+    """
+    Intents compiled once (see matcher.py). Never modified after it is
+    built, so every session and thread can share one instance.
+    """
+
+    def __init__(self, intents: List[Intent], fallback: List[str], source: Optional[str] = None,
+                 source_stat=None):
+        start = time.perf_counter()
+        self.intents = tuple(intents)
+        self.names = tuple(intent.name for intent in intents)
+        self.patterns = tuple(intent.pattern for intent in intents)
+        self.fallback = tuple(fallback)
+        self.matcher = PatternMatcher(list(self.patterns))
+        self.compile_ms = 1000 * (time.perf_counter() - start)
+        self.source = source
+        self.source_stat = (source_stat.st_size, source_stat.st_mtime_ns) if source_stat else None
+        self.loaded_at = time.time()
+
+    def __len__(self):
+        return len(self.intents)
+
+    def info(self) -> dict:
+        return {"source": self.source, "intents": len(self), "compile_ms": round(self.compile_ms, 2),
+                "loaded_at": self.loaded_at}
+
+
+def load_rules(path: str, default_fallback: List[str] = ()) -> RuleTable:
+    """Reads, validates and compiles an intent file. Raises IntentError on any problem."""
+    try:
+        source_stat = os.stat(path)
+    except OSError as exc:
+        raise IntentError(f"Can't read {path}: {exc}") from exc
+    intents, fallback = parse_intents(read_intent_file(path))
+    return RuleTable(intents, fallback or list(default_fallback), source=path, source_stat=source_stat)
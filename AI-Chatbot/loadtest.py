@@ -0,0 +1,106 @@
+# loadtest.py - Load-test client for server.py
+# Run with:  python3 server.py &  python3 loadtest.py --sessions 5000 --connections 200
+#
+# Simulates many users: each session sends --messages messages (picked from
+# typical chatbot inputs plus unmatched chatter) over a pool of keep-alive
+# connections, then the client reports messages/s and round-trip p50/p99,
+# checks that every reply kept its session id, and prints the server's /stats.
+
+import json
+import time
+import random
+import asyncio
+import argparse
+
+MESSAGES = ["hi", "how are you", "what can you do", "coding tips", "explain big o", "suggest a movie",
+            "sci-fi movies", "anime", "attendance 40 30", "attendance 50 45", "motivate me", "tell me a joke",
+            "who created you", "study tips", "what's the weather like", "ok thanks", "lol"]
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> "Connection":
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method: str, path: str, payload=None) -> dict:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await self.writer.drain()
+        status = await self.reader.readline()
+        length = 0
+        while True:
+            h = await self.reader.readline()
+            if h in (b"\r\n", b""):
+                break
+            name, _, value = h.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = json.loads(await self.reader.readexactly(length))
+        if status.split()[1] != b"200":
+            raise RuntimeError(f"{status.decode().strip()}: {data}")
+        return data
+
+    def close(self):
+        self.writer.close()
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    # Every session's messages, interleaved so sessions overlap in time
+    work = asyncio.Queue()
+    for _ in range(args.messages):
+        for s in range(args.sessions):
+            work.put_nowait((f"load-{args.seed}-{s}", rng.choice(MESSAGES)))
+
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        conn = await Connection.open(args.host, args.port)
+        try:
+            while not work.empty():
+                session, message = work.get_nowait()
+                start = time.perf_counter()
+                try:
+                    reply = await conn.request("POST", "/chat", {"session": session, "message": message})
+                    if reply["session"] != session:
+                        errors += 1
+                except RuntimeError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.connections)))
+    wall = time.perf_counter() - start
+
+    lat = sorted(1000 * x for x in latencies)
+    print(f"{len(lat)} messages, {args.sessions} sessions, {args.connections} connections: "
+          f"{len(lat) / wall:,.0f} msg/s | round trip p50 {lat[len(lat) // 2]:.2f} ms, "
+          f"p99 {lat[int(0.99 * len(lat))]:.2f} ms | errors {errors}")
+
+    conn = await Connection.open(args.host, args.port)
+    try:
+        print("server /stats:", json.dumps(await conn.request("GET", "/stats"), indent=2))
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=5, help="Messages per session")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
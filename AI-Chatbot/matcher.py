@@ -0,0 +1,184 @@
+# matcher.py - Keyword-prefiltered regex matching for chatbot patterns
+#
+# find_response() used to call re.search for every pattern in order until
+# one matched, so a message that matches nothing paid for every rule.
+# PatternMatcher keeps the same first-match-wins answer but only runs the
+# regexes that can possibly match:
+#
+#   1. For each pattern, required_literals() reads the parsed regex and finds
+#      a set of plain strings such that every match contains one of them
+#      (r'\b(hi|hello|hey)\b' -> {"hi", "hello", "hey"},
+#       r'\battendance\s+(\d+)\s+(\d+)\b' -> {"attendance"}).
+#   2. All literals go into one Aho-Corasick automaton, which finds every
+#      literal in the message in a single pass, whatever the number of rules.
+#   3. The rules whose literals were found (plus the few with no extractable
+#      literal) are tried in their original order; the first match wins.
+#
+# A single alternation of all patterns would not work here: re picks the
+# leftmost match in the text, not the first rule in the list.
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Parsed-regex node types
+LITERAL, SUBPATTERN, BRANCH, AT, IN = (
+    sre_parse.LITERAL, sre_parse.SUBPATTERN, sre_parse.BRANCH, sre_parse.AT, sre_parse.IN)
+REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+MAX_ALTERNATIVES = 64  # cap on literal combinations like (a|b)(c|d) -> ac, ad, bc, bd
+
+
+def _best(factors: List[frozenset]) -> Optional[frozenset]:
+    # The set whose shortest literal is longest is the most selective
+    return max(factors, key=lambda s: min(len(x) for x in s), default=None)
+
+
+def _exact(items) -> Optional[frozenset]:
+    """All strings a purely literal sequence (literals, groups, alternations) can match, else None."""
+    out = {""}
+    for op, av in items:
+        if op is LITERAL:
+            alts = {chr(av)}
+        elif op is AT:  # \b, ^, $ are zero-width
+            continue
+        elif op is IN and all(o is LITERAL for o, _ in av):  # [xy], also (x|y) after re's own rewriting
+            alts = {chr(c) for _, c in av}
+        elif op is SUBPATTERN and not av[1] & re.IGNORECASE:
+            alts = _exact(av[-1])
+        elif op is BRANCH:
+            subs = [_exact(branch) for branch in av[1]]
+            alts = None if any(s is None for s in subs) else frozenset().union(*subs)
+        else:
+            return None
+        if alts is None:
+            return None
+        out = {a + b for a in out for b in alts}
+        if len(out) > MAX_ALTERNATIVES:
+            return None
+    return frozenset(out)
+
+
+def _required(items) -> Optional[frozenset]:
+    """Literal set for a parsed sequence, or None if no literal is guaranteed."""
+    factors, run = [], {""}
+    for item in items:
+        exact = _exact([item])
+        if exact is not None and len(run) * len(exact) <= MAX_ALTERNATIVES:
+            # Extend the current literal run: "h" + (i|ello|ey) -> hi, hello, hey
+            run = {a + b for a in run for b in exact}
+            continue
+        factors.append(frozenset(run))
+        run = {""}
+        op, av = item
+        if exact is not None:
+            sub = exact
+        elif op is SUBPATTERN and not av[1] & re.IGNORECASE:
+            sub = _required(av[-1])
+        elif op is BRANCH:
+            subs = [_required(branch) for branch in av[1]]
+            sub = None if any(s is None for s in subs) else frozenset().union(*subs)
+        elif op in REPEATS and av[0] >= 1:
+            sub = _required(av[2])
+        else:
+            sub = None
+        if sub:
+            factors.append(sub)
+    factors.append(frozenset(run))
+    # A set containing "" guarantees nothing
+    return _best([f for f in factors if "" not in f])
+
+
+def required_literals(pattern: str) -> Optional[frozenset]:
+    """
+    Strings such that every match of pattern contains at least one of them,
+    or None when no such set can be read off the regex (the rule is then
+    always tried). Case-insensitive patterns return None.
+    """
+    parsed = sre_parse.parse(pattern)
+    state = getattr(parsed, "state", None) or parsed.pattern  # renamed in Python 3.11
+    if state.flags & re.IGNORECASE:
+        return None
+    return _required(parsed)
+
+
+class KeywordIndex:
+    """Aho-Corasick automaton: finds the rules of every keyword in a text in one pass."""
+
+    def __init__(self, keywords: Dict[str, List[int]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.out: List[frozenset] = [frozenset()]
+        for keyword, rules in keywords.items():
+            state = 0
+            for ch in keyword:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.out.append(frozenset())
+                state = nxt
+            self.out[state] = self.out[state].union(rules)
+
+        # Breadth-first failure links; each state also reports its fail state's keywords
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if state else 0
+                self.out[nxt] = self.out[nxt].union(self.out[self.fail[nxt]])
+                queue.append(nxt)
+
+    def search(self, text: str) -> set:
+        goto, fail, out = self.goto, self.fail, self.out
+        found, state = set(), 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class PatternMatcher:
+    """First pattern (in list order) that matches a text, via a keyword prefilter."""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = [re.compile(p) for p in patterns]
+        keywords: Dict[str, List[int]] = {}
+        always = []
+        for i, p in enumerate(patterns):
+            literals = required_literals(p)
+            if literals is None:
+                always.append(i)
+                continue
+            for lit in literals:
+                keywords.setdefault(lit, []).append(i)
+        self.always = frozenset(always)
+        self.keywords = KeywordIndex(keywords)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def match(self, text: str) -> Tuple[Optional[int], Optional[re.Match]]:
+        """(rule index, match) of the first matching pattern, or (None, None)."""
+        for i in sorted(self.keywords.search(text) | self.always):
+            m = self.patterns[i].search(text)
+            if m:
+                return i, m
+        return None, None
+
+    def match_linear(self, text: str) -> Tuple[Optional[int], Optional[re.Match]]:
+        """Same answer as match() without the prefilter; kept as the reference."""
+        for i, pattern in enumerate(self.patterns):
+            m = pattern.search(text)
+            if m:
+                return i, m
+        return None, None
@@ -0,0 +1,170 @@
+# replay.py - Replay logged user messages through the chatbot in bulk
+# Run with:  python3 replay.py messages.jsonl --out results.jsonl --counts intents.json
+#            python3 replay.py chats.csv --field text --workers 8
+#
+# Input is JSONL (one object per line with a "message" field, or a bare JSON
+# string per line) or CSV (a "message" column); --field picks another name.
+# JSONL lines that aren't valid JSON, or are neither an object nor a string,
+# are skipped with a warning naming the line; a null message counts as "".
+# The file is streamed in chunks of --chunk_size messages, chunks are
+# answered by a process pool, and results are written in input order as
+# they complete, so memory use depends on chunk size and worker count, not
+# on the file size. Each output line records the input line, the message,
+# the matched intent (index and name, null = fallback) and the response.
+# --intents replays against another intent file, e.g. a candidate rule change.
+#
+# Responses are picked with a random.Random seeded from --seed and the line
+# number, so a replay gives the same output regardless of --workers and can
+# be diffed against an earlier run for regression testing. Per-intent hit
+# counts are rewritten to --counts every --counts_every chunks and at the end.
+
+import os
+import sys
+import csv
+import json
+import random
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import chatbot
+
+
+def read_messages(path: str, field: str = "message", fmt: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """(line number, message) for each input record, read lazily. fmt is "jsonl" or "csv" (default: by extension)."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            if field not in (reader.fieldnames or []):
+                raise ValueError(f"{path} has no '{field}' column (columns: {reader.fieldnames})")
+            for row in reader:
+                yield reader.line_num, row[field] or ""
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    print(f"{path}:{line_no}: skipped, invalid JSON ({exc})", file=sys.stderr)
+                    continue
+                if isinstance(record, dict):
+                    record = record.get(field)
+                    yield line_no, "" if record is None else str(record)
+                elif isinstance(record, str):
+                    yield line_no, record
+                else:
+                    print(f"{path}:{line_no}: skipped, expected an object or a string", file=sys.stderr)
+
+
+def use_intents(path: Optional[str]):
+    """Pool initializer: every worker answers from the same intent file."""
+    if path:
+        chatbot.reload_rules(path)
+
+
+def answer_chunk(chunk: List[Tuple[int, str]], seed: int) -> List[Tuple[int, str, Optional[int], str]]:
+    """Runs in a worker process: (line, message, intent index or None, response) per message."""
+    return [(line, message, *chatbot.respond(message, rng=random.Random(f"{seed}:{line}")))
+            for line, message in chunk]
+
+
+def chunks(records: Iterator, size: int) -> Iterator[list]:
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_counts(path: str, hits: List[int], fallback: int):
+    rules = chatbot.RULES
+    report = {
+        "intent_file": rules.source,
+        "messages": sum(hits) + fallback,
+        "fallback": fallback,
+        "intents": sorted(
+            ({"index": i, "name": rules.names[i], "pattern": rules.patterns[i], "hits": n}
+             for i, n in enumerate(hits)),
+            key=lambda r: -r["hits"],
+        ),
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)  # readers never see a half-written file
+
+
+def replay(path: str, out, counts_path: Optional[str] = None, field: str = "message", fmt: Optional[str] = None,
+           workers: Optional[int] = None, chunk_size: int = 1000, seed: int = 0, counts_every: int = 50,
+           intents_path: Optional[str] = None):
+    use_intents(intents_path)
+    names = chatbot.RULES.names
+    hits, fallback, done = [0] * len(names), 0, 0
+
+    def emit(results):
+        nonlocal fallback, done
+        for line, message, intent, response in results:
+            if intent is None:
+                fallback += 1
+            else:
+                hits[intent] += 1
+            out.write(json.dumps({
+                "line": line, "message": message, "intent": intent,
+                "name": names[intent] if intent is not None else None, "response": response,
+            }) + "\n")
+        done += 1
+        if counts_path and done % counts_every == 0:
+            out.flush()
+            write_counts(counts_path, hits, fallback)
+
+    work = chunks(read_messages(path, field, fmt), chunk_size)
+    if workers == 0:
+        for chunk in work:
+            emit(answer_chunk(chunk, seed))
+    else:
+        with ProcessPoolExecutor(workers, initializer=use_intents, initargs=(chatbot.RULES.source,)) as pool:
+            # A bounded window of chunks in flight; results are written in input order
+            in_flight = deque()
+            max_in_flight = 2 * (workers or os.cpu_count() or 1)
+            for chunk in work:
+                in_flight.append(pool.submit(answer_chunk, chunk, seed))
+                while len(in_flight) >= max_in_flight or (in_flight and in_flight[0].done()):
+                    emit(in_flight.popleft().result())
+            while in_flight:
+                emit(in_flight.popleft().result())
+    out.flush()
+    if counts_path:
+        write_counts(counts_path, hits, fallback)
+    return sum(hits) + fallback, fallback
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged messages through the chatbot")
+    parser.add_argument("input", type=str, help="JSONL or CSV file of messages")
+    parser.add_argument("--out", type=str, default=None, help="Results JSONL (default: stdout)")
+    parser.add_argument("--counts", type=str, default=None, help="Per-intent hit counts JSON")
+    parser.add_argument("--field", type=str, default="message", help="JSON key / CSV column holding the message")
+    parser.add_argument("--format", type=str, choices=["jsonl", "csv"], default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count, 0 = no pool)")
+    parser.add_argument("--chunk_size", type=int, default=1000)
+    parser.add_argument("--counts_every", type=int, default=50, help="Rewrite --counts every N chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--intents", type=str, default=None, help="Intent file to replay against (default: intents.json)")
+    args = parser.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        total, fallback = replay(args.input, out, args.counts, args.field, args.format, args.workers,
+                                 args.chunk_size, args.seed, args.counts_every, args.intents)
+    finally:
+        if args.out:
+            out.close()
+    print(f"Replayed {total} messages ({fallback} fallback)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
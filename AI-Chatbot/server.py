@@ -0,0 +1,270 @@
+# server.py - Multi-session chatbot server (asyncio, standard library only)
+# Run with:  python3 server.py --port 8765
+#
+#   POST /chat   {"session": "abc", "message": "hi"}  ->  {"session", "intent", "name", "response"}
+#                (omit "session" to start a new one; the reply carries its id)
+#   GET  /history?session=abc                      ->  last HISTORY_LEN turns of a session
+#   GET  /stats                                    ->  sessions, throughput and latency counters
+#   POST /reload {"force": false}                  ->  re-read the intent file if it changed
+#
+# Each session has its own random.Random (so replies are reproducible per
+# session with --seed) and a bounded history. All sessions share the one
+# compiled chatbot.RULES table, read at message time. Sessions idle for
+# longer than --idle_timeout seconds are evicted by a background task.
+# With --watch, the intent file is checked every few seconds; a changed file
+# is validated and compiled in a worker thread and then swapped in, so
+# sessions keep being served while it compiles. An invalid file is reported
+# in /stats and the previous rules stay in use.
+# Connections use HTTP/1.1 keep-alive, so one client connection can carry
+# many sessions.
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+from urllib.parse import urlparse, parse_qs
+
+import chatbot
+
+HISTORY_LEN = 20          # turns kept per session (user + bot messages)
+LATENCY_SAMPLES = 10000   # recent per-message latencies kept for percentiles
+KEEPALIVE_S = 30          # idle connection timeout
+MAX_BODY = 64 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}
+
+
+class Session:
+    __slots__ = ("id", "rng", "history", "created", "last_seen", "messages")
+
+    def __init__(self, session_id: str, seed=None):
+        self.id = session_id
+        self.rng = random.Random(f"{seed}:{session_id}" if seed is not None else None)
+        self.history = deque(maxlen=HISTORY_LEN)
+        self.created = self.last_seen = time.monotonic()
+        self.messages = 0
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.messages = 0
+        self.errors = 0
+        self.sessions_created = 0
+        self.sessions_evicted = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # seconds
+        self._window = (self.started, 0)  # (time, messages) at the last snapshot
+
+    def record(self, latency: float):
+        self.messages += 1
+        self.latencies.append(latency)
+
+    def snapshot(self, active_sessions: int) -> dict:
+        now = time.monotonic()
+        since, count = self._window
+        self._window = (now, self.messages)
+        lat = sorted(self.latencies)
+
+        def pct(p):
+            return round(1e6 * lat[min(int(p * len(lat)), len(lat) - 1)], 1) if lat else None
+
+        return {
+            "uptime_s": round(now - self.started, 1),
+            "sessions": {"active": active_sessions, "created": self.sessions_created,
+                         "evicted": self.sessions_evicted},
+            "messages": self.messages,
+            "errors": self.errors,
+            "messages_per_s": {
+                "overall": round(self.messages / max(now - self.started, 1e-9), 1),
+                "since_last_stats": round((self.messages - count) / max(now - since, 1e-9), 1),
+            },
+            "latency_us": {"p50": pct(0.50), "p99": pct(0.99), "samples": len(lat)},
+        }
+
+
+class ChatServer:
+    def __init__(self, idle_timeout: float = 300.0, max_sessions: int = 100_000, seed=None,
+                 watch_interval: float = 0):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.seed = seed
+        self.watch_interval = watch_interval
+        self.reloads = 0
+        self.reload_error = None
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()  # least recently used first
+        self.stats = Stats()
+
+    # ---- sessions ----
+
+    def session(self, session_id=None) -> Session:
+        s = self.sessions.get(session_id) if session_id else None
+        if s is None:
+            s = Session(session_id or uuid.uuid4().hex, self.seed)
+            self.sessions[s.id] = s
+            self.stats.sessions_created += 1
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.stats.sessions_evicted += 1
+        else:
+            self.sessions.move_to_end(s.id)
+        s.last_seen = time.monotonic()
+        return s
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = 0
+        # Sessions are in last-use order, so stop at the first one still active
+        while self.sessions:
+            s = next(iter(self.sessions.values()))
+            if s.last_seen >= cutoff:
+                break
+            self.sessions.popitem(last=False)
+            evicted += 1
+        self.stats.sessions_evicted += evicted
+        return evicted
+
+    async def evict_loop(self):
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 0.5))
+            self.evict_idle()
+
+    # ---- intent file ----
+
+    async def reload(self, force: bool = False) -> dict:
+        loop = asyncio.get_running_loop()
+        previous_error = self.reload_error
+        try:
+            # Compiling a large intent file takes a while; keep the event loop serving meanwhile
+            reloaded = await loop.run_in_executor(None, chatbot.reload_rules, None, force)
+            self.reload_error = None
+        except (chatbot.IntentError, OSError) as exc:
+            reloaded, self.reload_error = False, str(exc)
+        if reloaded:
+            self.reloads += 1
+            print(f"Reloaded {len(chatbot.RULES)} intents in {chatbot.RULES.compile_ms:.1f} ms")
+        elif self.reload_error and self.reload_error != previous_error:
+            print(f"Intent file rejected, keeping the previous rules: {self.reload_error}")
+        return {"reloaded": reloaded, "error": self.reload_error, "rules": chatbot.RULES.info()}
+
+    async def watch_loop(self):
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            await self.reload()
+
+    # ---- requests ----
+
+    def chat(self, body: dict) -> dict:
+        message = body.get("message")
+        if not isinstance(message, str):
+            raise ValueError("message must be a string")
+        start = time.perf_counter()
+        s = self.session(body.get("session"))
+        rules = chatbot.RULES  # one table for the whole message, even if a reload swaps it meanwhile
+        intent, response = chatbot.respond(message, rng=s.rng, rules=rules)
+        s.history.append(("user", message))
+        s.history.append(("bot", response))
+        s.messages += 1
+        self.stats.record(time.perf_counter() - start)
+        return {"session": s.id, "intent": intent, "name": rules.names[intent] if intent is not None else None,
+                "response": response}
+
+    async def route(self, method: str, target: str, body: bytes):
+        url = urlparse(target)
+        if method == "POST" and url.path == "/chat":
+            return 200, self.chat(json.loads(body or b"{}"))
+        if method == "GET" and url.path == "/stats":
+            stats = self.stats.snapshot(len(self.sessions))
+            stats["rules"] = {**chatbot.RULES.info(), "reloads": self.reloads, "last_error": self.reload_error}
+            return 200, stats
+        if method == "POST" and url.path == "/reload":
+            return 200, await self.reload(force=bool(json.loads(body or b"{}").get("force")))
+        if method == "GET" and url.path == "/history":
+            s = self.sessions.get(parse_qs(url.query).get("session", [""])[0])
+            if s is None:
+                return 404, {"error": "unknown session"}
+            return 200, {"session": s.id, "messages": s.messages,
+                         "history": [{"from": who, "text": text} for who, text in s.history]}
+        return 404, {"error": "not found"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), KEEPALIVE_S)
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    try:
+                        status, payload = await self.route(method, target, body)
+                    except (ValueError, TypeError, AttributeError) as exc:
+                        self.stats.errors += 1
+                        status, payload = 400, {"error": str(exc)}
+
+                data = json.dumps(payload).encode("utf-8")
+                head = (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n")
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write((head + "\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # idle, truncated or malformed connection: just drop it
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        tasks = [asyncio.create_task(self.evict_loop())]
+        if self.watch_interval:
+            tasks.append(asyncio.create_task(self.watch_loop()))
+        print(f"Chatbot server on http://{host}:{port} ({len(chatbot.RULES)} intents from {chatbot.RULES.source})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--idle_timeout", type=float, default=300.0, help="Seconds before an idle session is evicted")
+    parser.add_argument("--max_sessions", type=int, default=100_000, help="Least recently used sessions beyond this are evicted")
+    parser.add_argument("--seed", type=int, default=None, help="Make each session's replies reproducible")
+    parser.add_argument("--intents", type=str, default=None, help="Intent file (default: intents.json)")
+    parser.add_argument("--watch", type=float, default=2.0, metavar="SECONDS",
+                        help="Check the intent file for changes every SECONDS (0 = only on POST /reload)")
+    args = parser.parse_args()
+
+    if args.intents:
+        chatbot.reload_rules(args.intents)
+    server = ChatServer(args.idle_timeout, args.max_sessions, args.seed, args.watch)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
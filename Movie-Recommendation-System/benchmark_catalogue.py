@@ -0,0 +1,300 @@
+# benchmark_catalogue.py - Load, memory, index and query benchmarks on synthetic catalogues
+# Run with:  python3 benchmark_catalogue.py --sizes 10000 100000 1000000 5000000 --out results.json
+#            python3 benchmark_catalogue.py --sizes 100000 --compare results.json
+#
+# Synthetic catalogues follow the shape of real ones rather than a uniform draw:
+#   - mood, genre and language popularity is Zipf-skewed (--skew)
+#   - each mood only co-occurs with a few genres (MOOD_GENRES), and anime
+#     titles are the only ones in anime-jp, so every relaxation level of
+#     recommend() is reachable at every size
+#   - 1-3 genres per movie, ratings roughly normal around 6.6, years skewed recent
+#
+# For each size the benchmark reports:
+#   load:    CSV parse and binary-cache load time (catalogue.load_catalogue)
+#   memory:  retained bytes per movie for the catalogue and for the index (tracemalloc)
+#   index:   CatalogueIndex build time
+#   queries: p50/p99 latency of filter_movies and of recommend() for each
+#            relaxation path (exact, relax language, relax genre, mood only)
+# and writes everything as JSON so runs from different versions can be compared.
+
+import os
+import sys
+import csv
+import json
+import time
+import platform
+import argparse
+import itertools
+import tempfile
+import tracemalloc
+import subprocess
+
+import numpy as np
+
+from catalogue import CACHE_SUFFIX, Catalogue, Interner, load_catalogue
+from index import CatalogueIndex
+from recommend import MOOD_OPTIONS, GENRE_OPTIONS, LANG_OPTIONS
+
+# Most to least common
+MOODS = ["intense", "happy", "emotional", "thoughtful", "excited", "chill", "romantic", "sad", "wholesome"]
+GENRES = ["drama", "action", "comedy", "thriller", "romance", "sci-fi", "crime", "family", "fantasy",
+          "anime", "horror", "documentary"]
+LANGUAGES = ["english", "hindi", "korean", "spanish", "french"]  # plus anime-jp for anime titles
+ANIME_LANGUAGE = "anime-jp"
+
+# Genres each mood co-occurs with, most common first
+MOOD_GENRES = {
+    "intense": ["action", "thriller", "crime", "sci-fi", "horror", "drama"],
+    "happy": ["comedy", "family", "action", "romance", "anime", "sci-fi"],
+    "emotional": ["drama", "romance", "family", "anime"],
+    "thoughtful": ["drama", "sci-fi", "documentary", "crime"],
+    "excited": ["action", "sci-fi", "fantasy", "anime", "thriller"],
+    "chill": ["comedy", "romance", "family", "anime", "drama"],
+    "romantic": ["romance", "drama", "comedy"],
+    "sad": ["drama", "romance"],
+    "wholesome": ["family", "comedy", "anime", "fantasy"],
+}
+
+PATHS = ["exact", "relax_language", "relax_genre", "mood_only"]  # recommend() relaxation levels 0-3
+WORDS = [f"w{i}" for i in range(5000)]
+
+
+def zipf_weights(n: int, skew: float) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def synthetic_catalogue(n: int, seed: int = 0, skew: float = 1.0) -> Catalogue:
+    rng = np.random.default_rng(seed)
+    moods, genres = Interner(MOODS), Interner(GENRES)
+    languages = Interner(LANGUAGES + [ANIME_LANGUAGE])
+
+    mood_codes = rng.choice(len(MOODS), size=n, p=zipf_weights(len(MOODS), skew)).astype(np.int32)
+    n_genres = 1 + rng.binomial(2, 0.3, size=n)
+    slots = np.full((n, 3), -1, dtype=np.int32)  # up to 3 genre codes per movie, -1 = unused
+    for code, mood in enumerate(MOODS):
+        rows = np.flatnonzero(mood_codes == code)
+        allowed = np.array([genres.get(g) for g in MOOD_GENRES[mood]], dtype=np.int32)
+        # Weighted sampling without replacement: top of log(weight) + Gumbel noise
+        keys = np.log(zipf_weights(len(allowed), skew)) + rng.gumbel(size=(len(rows), len(allowed)))
+        picked = allowed[np.argsort(-keys, axis=1)[:, :3]]
+        width = picked.shape[1]
+        keep = np.arange(width) < n_genres[rows, None]
+        slots[rows, :width] = np.where(keep, picked, -1)
+
+    valid = slots >= 0
+    genre_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(valid.sum(axis=1), out=genre_indptr[1:])
+    genre_codes = slots[valid]  # row-major, so each movie's genres stay together
+
+    is_anime = (slots == genres.get("anime")).any(axis=1)
+    language_codes = rng.choice(len(LANGUAGES), size=n, p=zipf_weights(len(LANGUAGES), 2 * skew)).astype(np.int32)
+    language_codes[is_anime] = languages.get(ANIME_LANGUAGE)
+
+    words = rng.choice(len(WORDS), size=(n, 8), p=zipf_weights(len(WORDS), skew))
+    return Catalogue(
+        movie_ids=np.arange(1, n + 1, dtype=np.int64),
+        titles=[f"Synthetic Movie {i}" for i in range(1, n + 1)],
+        descriptions=[" ".join(WORDS[w] for w in row) for row in words.tolist()],
+        moods=moods,
+        languages=languages,
+        genres=genres,
+        mood_codes=mood_codes,
+        language_codes=language_codes,
+        genre_indptr=genre_indptr,
+        genre_codes=genre_codes,
+        ratings=np.round(np.clip(rng.normal(6.6, 1.0, size=n), 1.0, 9.8), 1).astype(np.float32),
+        years=(2025 - np.minimum(rng.exponential(15.0, size=n), 105)).astype(np.int16),
+    )
+
+
+def write_csv(catalogue: Catalogue, path: str):
+    """Writes the catalogue in the movies.csv format."""
+    indptr = catalogue.genre_indptr.tolist()
+    genre_names = [catalogue.genres.names[c] for c in catalogue.genre_codes.tolist()]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["movie_id", "title", "genre", "language", "mood", "rating", "year", "description"])
+        writer.writerows(zip(
+            catalogue.movie_ids.tolist(),
+            catalogue.titles,
+            ("|".join(genre_names[lo:hi]) for lo, hi in zip(indptr, indptr[1:])),
+            (catalogue.languages.names[c] for c in catalogue.language_codes.tolist()),
+            (catalogue.moods.names[c] for c in catalogue.mood_codes.tolist()),
+            (f"{r:.1f}" for r in catalogue.ratings.tolist()),
+            catalogue.years.tolist(),
+            catalogue.descriptions,
+        ))
+
+
+def retained_bytes(fn):
+    """(result of fn(), bytes still allocated after it returns)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def latency_us(fn, queries) -> dict:
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(*q)
+        times.append(time.perf_counter() - start)
+    times = 1e6 * np.array(times)
+    return {"queries": len(queries), "p50_us": round(float(np.percentile(times, 50)), 2),
+            "p99_us": round(float(np.percentile(times, 99)), 2)}
+
+
+def queries_by_path(index: CatalogueIndex, n_queries: int, skew: float, top_k: int, seed: int) -> dict:
+    """n_queries per relaxation path, drawn from the query combinations that take that path."""
+    combos = list(itertools.product(MOOD_OPTIONS, GENRE_OPTIONS, LANG_OPTIONS))
+    by_path = {path: [] for path in PATHS}
+    for combo in combos:
+        level, _ = index.recommend(*combo, top_k=top_k)
+        by_path[PATHS[level]].append(combo)
+
+    rng = np.random.default_rng(seed)
+    out = {}
+    for path, pool in by_path.items():
+        if pool:
+            # Popular combinations are asked more often
+            picks = rng.choice(len(pool), size=n_queries, p=zipf_weights(len(pool), skew))
+            out[path] = [pool[i] for i in picks]
+        else:
+            out[path] = []
+    return out
+
+
+def benchmark(n: int, args, workdir: str) -> dict:
+    result = {"movies": n}
+
+    start = time.perf_counter()
+    catalogue = synthetic_catalogue(n, seed=args.seed, skew=args.skew)
+    result["generate_s"] = round(time.perf_counter() - start, 3)
+
+    if not args.skip_load:
+        csv_path = os.path.join(workdir, f"movies_{n}.csv")
+        write_csv(catalogue, csv_path)
+        del catalogue
+        result["csv_bytes"] = os.path.getsize(csv_path)
+
+        start = time.perf_counter()
+        catalogue = load_catalogue(csv_path)  # parses the CSV and writes the binary cache
+        result["load_csv_s"] = round(time.perf_counter() - start, 3)
+        del catalogue
+        start = time.perf_counter()
+        catalogue = load_catalogue(csv_path)
+        result["load_cache_s"] = round(time.perf_counter() - start, 3)
+        del catalogue
+        catalogue, catalogue_bytes = retained_bytes(lambda: load_catalogue(csv_path))
+        os.remove(csv_path)
+        os.remove(csv_path + CACHE_SUFFIX)
+    else:
+        catalogue_bytes = None
+
+    start = time.perf_counter()
+    index = CatalogueIndex(catalogue)
+    result["index_build_s"] = round(time.perf_counter() - start, 3)
+    del index
+    index, index_bytes = retained_bytes(lambda: CatalogueIndex(catalogue))
+
+    result["bytes_per_movie"] = {
+        "catalogue": round(catalogue_bytes / n, 1) if catalogue_bytes is not None else None,
+        "index": round(index_bytes / n, 1),
+    }
+
+    queries = queries_by_path(index, args.queries, args.skew, args.top_k, args.seed)
+    result["queries"] = {
+        "filter_movies": latency_us(index.filter, queries["exact"]) if queries["exact"] else None,
+    }
+    for path in PATHS:
+        result["queries"][path] = (
+            latency_us(lambda m, g, lang: index.recommend(m, g, lang, top_k=args.top_k), queries[path])
+            if queries[path] else None
+        )
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(r: dict):
+    mem = r["bytes_per_movie"]
+    print(f"{r['movies']:>9} movies | generate {r['generate_s']:.2f}s", end="")
+    if "load_csv_s" in r:
+        print(f" | load csv {r['load_csv_s']:.2f}s, cache {r['load_cache_s']:.2f}s | "
+              f"{mem['catalogue']:.0f} B/movie", end="")
+    print(f" | index {r['index_build_s']:.2f}s, {mem['index']:.0f} B/movie")
+    for path, q in r["queries"].items():
+        if q is None:
+            print(f"{'':>12}{path:<16} (no query takes this path)")
+        else:
+            print(f"{'':>12}{path:<16} p50 {q['p50_us']:>8.1f} us   p99 {q['p99_us']:>8.1f} us")
+
+
+def compare(baseline: dict, results: list):
+    """Prints current / baseline ratios for every timing and memory metric both runs measured."""
+    old = {r["movies"]: r for r in baseline["results"]}
+    for r in results:
+        b = old.get(r["movies"])
+        if b is None:
+            continue
+        print(f"{r['movies']:>9} movies vs {baseline.get('revision') or 'baseline'} (ratio, <1 is better)")
+        metrics = [(k, r.get(k), b.get(k)) for k in ("load_csv_s", "load_cache_s", "index_build_s")]
+        metrics += [(f"bytes/{k}", v, b["bytes_per_movie"].get(k)) for k, v in r["bytes_per_movie"].items()]
+        for path, q in r["queries"].items():
+            bq = b["queries"].get(path)
+            if q and bq:
+                metrics += [(f"{path} p50", q["p50_us"], bq["p50_us"]), (f"{path} p99", q["p99_us"], bq["p99_us"])]
+        for name, new, base in metrics:
+            if new is not None and base:
+                print(f"{'':>12}{name:<24} {new / base:>6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=500, help="Queries per relaxation path")
+    parser.add_argument("--top_k", type=int, default=3)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for categories and queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip_load", action="store_true", help="Skip the CSV round trip (faster at 5M)")
+    parser.add_argument("--out", type=str, default=None, help="Write results as JSON")
+    parser.add_argument("--compare", type=str, default=None, help="Earlier --out file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            results.append(benchmark(n, args, workdir))
+            print_result(results[-1])
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "settings": {k: getattr(args, k) for k in ("queries", "top_k", "skew", "seed")},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    if not args.out and not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
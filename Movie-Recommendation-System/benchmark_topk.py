@@ -0,0 +1,90 @@
+# benchmark_topk.py - Query latency vs catalogue size for recommend()'s top-k paths
+# Run with:  python3 benchmark_topk.py --sizes 10000 100000 1000000
+#
+# Builds random catalogues with the moods/genres/languages of movies.csv and
+# times, per query:
+#   full-sort:  intersect complete posting lists, sort all matches by rating
+#   pre-ranked: early-stopping intersection over rating-ordered postings
+#   recency:    full intersection + argpartition top-k on a custom key
+
+import time
+import argparse
+
+import numpy as np
+
+from catalogue import Catalogue, Interner
+from index import CatalogueIndex
+from recommend import MOOD_OPTIONS, GENRE_OPTIONS, LANG_OPTIONS
+
+GENRES = ["sci-fi", "action", "drama", "comedy", "romance", "anime", "thriller", "family", "crime", "fantasy"]
+
+
+def random_catalogue(n: int, seed: int = 0) -> Catalogue:
+    rng = np.random.default_rng(seed)
+    n_genres = rng.integers(1, 4, size=n)
+    genre_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(n_genres, out=genre_indptr[1:])
+    # First n_genres[i] entries of a random permutation of the genres, per movie
+    shuffled = np.argsort(rng.random((n, len(GENRES))), axis=1)
+    genre_codes = shuffled[np.arange(len(GENRES)) < n_genres[:, None]].astype(np.int32)
+    return Catalogue(
+        movie_ids=np.arange(n, dtype=np.int64),
+        titles=[f"Movie {i}" for i in range(n)],
+        descriptions=[""] * n,
+        moods=Interner(MOOD_OPTIONS),
+        languages=Interner([lang for lang in LANG_OPTIONS if lang != "any"]),
+        genres=Interner(GENRES),
+        mood_codes=rng.integers(0, len(MOOD_OPTIONS), size=n, dtype=np.int32),
+        language_codes=rng.integers(0, len(LANG_OPTIONS) - 1, size=n, dtype=np.int32),
+        genre_indptr=genre_indptr,
+        genre_codes=genre_codes,
+        ratings=np.round(rng.uniform(5.0, 9.5, size=n), 1).astype(np.float32),
+        years=rng.integers(1950, 2025, size=n, dtype=np.int16),
+    )
+
+
+def full_sort(index: CatalogueIndex, mood, genre, language, k):
+    rows = index.rows(index.relaxed(mood, genre, language)[0])
+    return rows[np.argsort(-index.catalogue.ratings[rows], kind="stable")][:k]
+
+
+def pre_ranked(index: CatalogueIndex, mood, genre, language, k):
+    return index.rows(index.relaxed(mood, genre, language, k=k)[0])
+
+
+def recency(index: CatalogueIndex, mood, genre, language, k):
+    return index.rows(index.top_k(index.relaxed(mood, genre, language)[0], k, "recency"))
+
+
+def median_us(fn, index, queries, k):
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(index, *q, k)
+        times.append(time.perf_counter() - start)
+    return 1e6 * float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top_k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    queries = [(rng.choice(MOOD_OPTIONS), rng.choice(GENRE_OPTIONS), rng.choice(LANG_OPTIONS))
+               for _ in range(args.queries)]
+
+    print(f"top_k={args.top_k}, median over {args.queries} random queries (us)")
+    print(f"{'movies':>10} | {'full-sort':>10} | {'pre-ranked':>10} | {'recency':>10}")
+    for n in args.sizes:
+        index = CatalogueIndex(random_catalogue(n))
+        for q in queries[:20]:
+            assert np.array_equal(full_sort(index, *q, args.top_k), pre_ranked(index, *q, args.top_k))
+        row = [median_us(fn, index, queries, args.top_k) for fn in (full_sort, pre_ranked, recency)]
+        print(f"{n:>10} | {row[0]:>10.1f} | {row[1]:>10.1f} | {row[2]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
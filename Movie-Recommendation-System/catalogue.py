@@ -0,0 +1,230 @@
+# catalogue.py - Columnar movie catalogue loaded from movies.csv
+#
+# The CSV is streamed row by row into:
+#   - interned category codes for mood and language (one small int per movie)
+#   - genres as a CSR list of codes (genre_indptr / genre_codes)
+#   - NumPy arrays for movie_id, rating and year
+#   - titles and descriptions kept as Python strings
+# Display records (Movie, with __slots__) are only built for the rows a
+# query returns. A binary .npz cache next to the CSV lets later startups skip
+# CSV parsing; it is rebuilt whenever the CSV's size or mtime changes.
+
+import os
+import csv
+import json
+from array import array
+from typing import Dict, List, Optional
+
+import numpy as np
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".cache.npz"
+
+
+def normalize(value: str) -> str:
+    # "Sci-Fi" / "sci-fi" and "English" / "english" are the same category
+    return value.strip().lower()
+
+
+def split_genres(value: str) -> List[str]:
+    genres = []
+    for g in value.split("|"):
+        g = normalize(g)
+        if g and g not in genres:
+            genres.append(g)
+    return genres
+
+
+class Interner:
+    """Maps category strings to dense int codes and back."""
+
+    def __init__(self, names: Optional[List[str]] = None):
+        self.names: List[str] = list(names or [])
+        self.codes: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+    def intern(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def get(self, name: str) -> Optional[int]:
+        return self.codes.get(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Movie:
+    __slots__ = ("movie_id", "title", "genre", "language", "mood", "rating", "year", "description")
+
+    def __init__(self, movie_id, title, genre, language, mood, rating, year, description):
+        self.movie_id = movie_id
+        self.title = title
+        self.genre = genre
+        self.language = language
+        self.mood = mood
+        self.rating = rating
+        self.year = year
+        self.description = description
+
+    def __repr__(self):
+        return f"Movie({self.title!r}, {self.year}, {self.rating})"
+
+
+class Catalogue:
+    def __init__(self, movie_ids, titles, descriptions, moods, languages, genres,
+                 mood_codes, language_codes, genre_indptr, genre_codes, ratings, years):
+        self.movie_ids = movie_ids            # int64 (n,)
+        self.titles = titles                  # list of str
+        self.descriptions = descriptions      # list of str
+        self.moods = moods                    # Interner
+        self.languages = languages            # Interner
+        self.genres = genres                  # Interner
+        self.mood_codes = mood_codes          # int32 (n,)
+        self.language_codes = language_codes  # int32 (n,)
+        self.genre_indptr = genre_indptr      # int64 (n + 1,), genres of row i: genre_codes[indptr[i]:indptr[i+1]]
+        self.genre_codes = genre_codes        # int32 (nnz,)
+        self.ratings = ratings                # float32 (n,)
+        self.years = years                    # int16 (n,)
+        self._title_rows = None
+
+    def __len__(self):
+        return len(self.titles)
+
+    def genres_of(self, i: int) -> List[str]:
+        codes = self.genre_codes[self.genre_indptr[i]:self.genre_indptr[i + 1]]
+        return [self.genres.names[c] for c in codes]
+
+    def record(self, i: int) -> Movie:
+        i = int(i)
+        return Movie(
+            movie_id=int(self.movie_ids[i]),
+            title=self.titles[i],
+            genre="|".join(self.genres_of(i)),
+            language=self.languages.names[self.language_codes[i]],
+            mood=self.moods.names[self.mood_codes[i]],
+            rating=round(float(self.ratings[i]), 1),
+            year=int(self.years[i]),
+            description=self.descriptions[i],
+        )
+
+    def records(self, rows) -> List[Movie]:
+        return [self.record(i) for i in rows]
+
+    def find(self, title: str) -> Optional[int]:
+        """Row of a title (case-insensitive), or None."""
+        if self._title_rows is None:
+            self._title_rows = {}
+            for i, t in enumerate(self.titles):
+                self._title_rows.setdefault(normalize(t), i)
+        return self._title_rows.get(normalize(title))
+
+    # ---- CSV ----
+
+    @classmethod
+    def from_csv(cls, path: str) -> "Catalogue":
+        moods, languages, genres = Interner(), Interner(), Interner()
+        movie_ids, ratings, years = array("q"), array("f"), array("h")
+        mood_codes, language_codes = array("i"), array("i")
+        genre_indptr, genre_codes = array("q", [0]), array("i")
+        titles, descriptions = [], []
+
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movie_ids.append(int(row["movie_id"]))
+                titles.append(row["title"].strip())
+                descriptions.append(row["description"].strip())
+                mood_codes.append(moods.intern(normalize(row["mood"])))
+                language_codes.append(languages.intern(normalize(row["language"])))
+                genre_codes.extend(genres.intern(g) for g in split_genres(row["genre"]))
+                genre_indptr.append(len(genre_codes))
+                ratings.append(float(row["rating"]))
+                years.append(int(row["year"]))
+
+        return cls(
+            np.frombuffer(movie_ids, dtype=np.int64).copy(), titles, descriptions, moods, languages, genres,
+            np.frombuffer(mood_codes, dtype=np.int32).copy(), np.frombuffer(language_codes, dtype=np.int32).copy(),
+            np.frombuffer(genre_indptr, dtype=np.int64).copy(), np.frombuffer(genre_codes, dtype=np.int32).copy(),
+            np.frombuffer(ratings, dtype=np.float32).copy(), np.frombuffer(years, dtype=np.int16).copy(),
+        )
+
+    # ---- binary cache ----
+
+    @staticmethod
+    def _pack_strings(strings: List[str]):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @staticmethod
+    def _unpack_strings(blob, offsets) -> List[str]:
+        data = blob.tobytes()
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    def save_cache(self, path: str, source_stat=None):
+        titles, title_offsets = self._pack_strings(self.titles)
+        descriptions, description_offsets = self._pack_strings(self.descriptions)
+        meta = {
+            "version": CACHE_VERSION,
+            "source": [source_stat.st_size, source_stat.st_mtime_ns] if source_stat else None,
+            "moods": self.moods.names,
+            "languages": self.languages.names,
+            "genres": self.genres.names,
+        }
+        # Write to a temp file first so a crash never leaves a truncated cache
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+                movie_ids=self.movie_ids, ratings=self.ratings, years=self.years,
+                mood_codes=self.mood_codes, language_codes=self.language_codes,
+                genre_indptr=self.genre_indptr, genre_codes=self.genre_codes,
+                titles=titles, title_offsets=title_offsets,
+                descriptions=descriptions, description_offsets=description_offsets,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_cache(cls, path: str, source_stat=None) -> Optional["Catalogue"]:
+        """Returns None if the cache is missing, from another version or for a different CSV."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+                if meta["version"] != CACHE_VERSION:
+                    return None
+                if source_stat is not None and meta["source"] != [source_stat.st_size, source_stat.st_mtime_ns]:
+                    return None
+                return cls(
+                    data["movie_ids"],
+                    cls._unpack_strings(data["titles"], data["title_offsets"]),
+                    cls._unpack_strings(data["descriptions"], data["description_offsets"]),
+                    Interner(meta["moods"]), Interner(meta["languages"]), Interner(meta["genres"]),
+                    data["mood_codes"], data["language_codes"], data["genre_indptr"], data["genre_codes"],
+                    data["ratings"], data["years"],
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def load_catalogue(csv_path: str, cache_path: Optional[str] = None, use_cache: bool = True) -> Catalogue:
+    """Loads csv_path, through its binary cache (csv_path + CACHE_SUFFIX by default) when fresh."""
+    cache_path = cache_path or csv_path + CACHE_SUFFIX
+    source_stat = os.stat(csv_path)
+    if use_cache:
+        catalogue = Catalogue.from_cache(cache_path, source_stat)
+        if catalogue is not None:
+            return catalogue
+
+    catalogue = Catalogue.from_csv(csv_path)
+    if use_cache:
+        try:
+            catalogue.save_cache(cache_path, source_stat)
+        except OSError:
+            pass  # read-only checkout: keep serving from the CSV
+    return catalogue
@@ -0,0 +1,166 @@
+# index.py - Inverted indexes over a Catalogue (see catalogue.py)
+#
+# Every mood, genre token and language maps to a sorted NumPy array of
+# ranks (a posting list). Rank r is the r-th best-rated movie, fixed once at
+# load time, so every posting list - and every intersection of them - is
+# already in rating order. Filters become intersections done by
+# binary-searching the shorter list in the longer one, and top-k queries
+# stop as soon as k common ranks are found.
+#
+# Other orderings (recency, blended score) take the full candidate list and
+# select the top k with np.argpartition instead of sorting everything.
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from catalogue import Catalogue
+
+ANY = "any"
+EMPTY = np.zeros(0, dtype=np.int32)
+SORT_KEYS = ("rating", "recency", "blended")
+BLEND_RATING_WEIGHT = 0.7  # blended = 0.7 * rating / 10 + 0.3 * normalized year
+
+
+def postings_by_code(codes: np.ndarray, ids: np.ndarray, n_codes: int) -> List[np.ndarray]:
+    """Groups ids by code; each group is sorted ascending."""
+    order = np.lexsort((ids, codes))
+    bounds = np.cumsum(np.bincount(codes, minlength=n_codes))[:-1]
+    return np.split(ids[order].astype(np.int32), bounds)
+
+
+def intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersection of two sorted, duplicate-free posting lists."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return EMPTY
+    pos = np.searchsorted(b, a)
+    pos[pos == len(b)] = 0
+    return a[b[pos] == a]
+
+
+def intersect_first_k(lists: List[np.ndarray], k: int) -> np.ndarray:
+    """
+    The k smallest ids common to all sorted posting lists. Walks the
+    shortest list in growing chunks and stops once k matches are found, so
+    the work depends on k and the match density, not on the list lengths.
+    """
+    lists = sorted(lists, key=len)
+    base, others = lists[0], lists[1:]
+    if not others:
+        return base[:k]
+    found, start, chunk = [], 0, max(4 * k, 64)
+    n_found = 0
+    while start < len(base) and n_found < k:
+        candidates = base[start:start + chunk]
+        for other in others:
+            candidates = intersect(candidates, other)
+        found.append(candidates)
+        n_found += len(candidates)
+        start += chunk
+        chunk *= 2
+    return np.concatenate(found)[:k] if found else EMPTY
+
+
+class CatalogueIndex:
+    def __init__(self, catalogue: Catalogue):
+        self.catalogue = catalogue
+        n = len(catalogue)
+        # Best rating first; ties keep catalogue order
+        self.order = np.argsort(-catalogue.ratings, kind="stable").astype(np.int32)  # rank -> row
+        self.rank_of = np.empty(n, dtype=np.int32)                                  # row -> rank
+        self.rank_of[self.order] = np.arange(n, dtype=np.int32)
+        self.all_ranks = np.arange(n, dtype=np.int32)
+        self._scores = {}
+
+        self.moods = self._by_name(
+            catalogue.moods.names, postings_by_code(catalogue.mood_codes, self.rank_of, len(catalogue.moods)))
+        self.languages = self._by_name(
+            catalogue.languages.names, postings_by_code(catalogue.language_codes, self.rank_of, len(catalogue.languages)))
+        # One entry per (movie, genre) pair
+        entry_ranks = np.repeat(self.rank_of, np.diff(catalogue.genre_indptr))
+        self.genres = self._by_name(
+            catalogue.genres.names, postings_by_code(catalogue.genre_codes, entry_ranks, len(catalogue.genres)))
+
+    @staticmethod
+    def _by_name(names: List[str], postings: List[np.ndarray]) -> Dict[str, np.ndarray]:
+        return dict(zip(names, postings))
+
+    def postings(self, field: str, value: str) -> Optional[np.ndarray]:
+        """Posting list of mood/genre/language == value; None means no filter ("any")."""
+        if value == ANY:
+            return None
+        return getattr(self, field).get(value, EMPTY)
+
+    def relaxed(self, mood: str, genre: str, language: str, k: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """
+        Ranks (best-rated first) for the four relaxation levels of recommend(),
+        from one lookup per field: (mood+genre+language, mood+genre,
+        mood+language, mood). With k, each level holds at most its top k.
+        """
+        m = self.postings("moods", mood)
+        if m is None:
+            m = self.all_ranks
+        g = self.postings("genres", genre)
+        lang = self.postings("languages", language)
+
+        def match(*lists):
+            lists = [p for p in lists if p is not None]
+            if k is not None:
+                return intersect_first_k(lists, k)
+            out = lists[0]
+            for p in lists[1:]:
+                out = intersect(out, p)
+            return out
+
+        return match(m, g, lang), match(m, g), match(m, lang), match(m)
+
+    def recommend(self, mood: str, genre: str, language: str, top_k: int = 3,
+                  sort_by: str = "rating") -> Tuple[int, np.ndarray]:
+        """(relaxation level 0-3, row ids of the top_k) for the first non-empty relaxation level."""
+        # Postings are already in rating order, so for the default order each level stops after top_k hits
+        levels = self.relaxed(mood, genre, language, k=top_k if sort_by == "rating" else None)
+        level = next((i for i, ranks in enumerate(levels) if len(ranks)), len(levels) - 1)
+        return level, self.rows(self.top_k(levels[level], top_k, sort_by))
+
+    def filter(self, mood: str, genre: str, language: str) -> np.ndarray:
+        """Row ids matching all three filters, best-rated first."""
+        return self.rows(self.relaxed(mood, genre, language)[0])
+
+    def rows(self, ranks: np.ndarray) -> np.ndarray:
+        return self.order[ranks]
+
+    def scores(self, key: str) -> np.ndarray:
+        """Per-rank score for a sort key; higher is better."""
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {key}. Choose from {list(SORT_KEYS)}.")
+        if key not in self._scores:
+            ratings = self.catalogue.ratings[self.order].astype(np.float64)
+            years = self.catalogue.years[self.order].astype(np.float64)
+            if key == "rating":
+                score = ratings
+            elif key == "recency":
+                score = years
+            else:
+                span = max(years.max() - years.min(), 1.0) if len(years) else 1.0
+                recency = (years - years.min()) / span if len(years) else years
+                score = BLEND_RATING_WEIGHT * ratings / 10.0 + (1 - BLEND_RATING_WEIGHT) * recency
+            self._scores[key] = score
+        return self._scores[key]
+
+    def top_k(self, ranks: np.ndarray, k: int, key: str = "rating") -> np.ndarray:
+        """
+        The k best of the given ranks under a sort key, best first. Rating
+        order is the rank order itself; other keys use np.argpartition over
+        the candidates and only sort the winners (ties: better rating first).
+        """
+        if key == "rating" or len(ranks) == 0:
+            return np.sort(ranks)[:k]
+        score = self.scores(key)[ranks]
+        if len(ranks) > k:
+            # Keep everything tied with the k-th score so ties resolve by rank, not partition order
+            kth = np.partition(score, len(score) - k)[len(score) - k]
+            keep = score >= kth
+            ranks, score = ranks[keep], score[keep]
+        return ranks[np.lexsort((ranks, -score))][:k]
@@ -0,0 +1,77 @@
+# loadgen.py - Load generator for recommend_batch / serve.py
+#
+#   python3 loadgen.py                              # in-process recommend_batch
+#   python3 loadgen.py --url http://127.0.0.1:8080  # against serve.py --http
+#
+# Queries are drawn with a Zipf-like skew over all mood/genre/language
+# combinations (a few popular combinations, a long tail), sent in batches,
+# and the tool reports queries/sec, batch latency percentiles and, in
+# process, the query cache hit rate.
+
+import json
+import time
+import argparse
+import itertools
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import recommend
+from recommend import MOOD_OPTIONS, GENRE_OPTIONS, LANG_OPTIONS
+
+
+def make_queries(n: int, skew: float, seed: int = 0) -> list:
+    combos = list(itertools.product(MOOD_OPTIONS, GENRE_OPTIONS, LANG_OPTIONS))
+    rng = np.random.default_rng(seed)
+    rng.shuffle(combos)
+    weights = 1.0 / np.arange(1, len(combos) + 1) ** skew
+    picks = rng.choice(len(combos), size=n, p=weights / weights.sum())
+    return [dict(zip(("mood", "genre", "language"), combos[i])) for i in picks]
+
+
+def post_batch(url: str, batch: list) -> list:
+    req = urllib.request.Request(url + "/recommend", data=json.dumps({"queries": batch}).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as res:
+        return json.loads(res.read())["results"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--batch_size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight (HTTP mode)")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of query popularity")
+    parser.add_argument("--url", type=str, default=None)
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries, args.skew)
+    batches = [queries[i:i + args.batch_size] for i in range(0, len(queries), args.batch_size)]
+    send = (lambda b: post_batch(args.url, b)) if args.url else recommend.recommend_batch
+
+    def timed(batch):
+        start = time.perf_counter()
+        results = send(batch)
+        assert len(results) == len(batch)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if args.url:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            latencies = list(pool.map(timed, batches))
+    else:
+        latencies = [timed(b) for b in batches]
+    wall = time.perf_counter() - start
+
+    lat_ms = 1000 * np.array(latencies)
+    print(f"{'HTTP ' + args.url if args.url else 'in-process'}: {len(queries)} queries in batches of {args.batch_size}")
+    print(f"  {len(queries) / wall:,.0f} queries/s | batch p50 {np.percentile(lat_ms, 50):.2f} ms | "
+          f"p99 {np.percentile(lat_ms, 99):.2f} ms")
+    if not args.url:
+        info = recommend.query_cache_info()
+        print(f"  query cache: {info.hits / max(info.hits + info.misses, 1):.1%} hits, {info.currsize} entries")
+
+
+if __name__ == "__main__":
+    main()
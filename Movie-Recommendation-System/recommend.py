@@ -1,38 +1,65 @@
-# recommend.py - Mood + Genre + Language based Movie Recommender (no external libs)
+# recommend.py - Mood + Genre + Language based Movie Recommender (catalogue from movies.csv, needs numpy)
 # Run with:  python3 recommend.py
 
-from typing import List, Dict
-
-MOVIES: List[Dict] = [
-    {"title": "The Matrix", "genre": "sci-fi|action", "language": "english", "mood": "intense", "rating": 8.7, "year": 1999, "description": "A hacker discovers reality is a simulation."},
-    {"title": "Inception", "genre": "sci-fi|thriller", "language": "english", "mood": "intense", "rating": 8.8, "year": 2010, "description": "A thief enters dreams to steal secrets."},
-    {"title": "Interstellar", "genre": "sci-fi|drama", "language": "english", "mood": "thoughtful", "rating": 8.6, "year": 2014, "description": "A team travels through a wormhole searching for a new home."},
-    {"title": "The Dark Knight", "genre": "action|crime", "language": "english", "mood": "intense", "rating": 9.0, "year": 2008, "description": "Batman faces the Joker in Gotham."},
-    {"title": "The Avengers", "genre": "action|adventure", "language": "english", "mood": "excited", "rating": 8.0, "year": 2012, "description": "Superheroes team up to save Earth."},
-    {"title": "Guardians of the Galaxy", "genre": "action|comedy", "language": "english", "mood": "happy", "rating": 8.0, "year": 2014, "description": "A group of misfits protect the galaxy."},
-    {"title": "Forrest Gump", "genre": "drama|romance", "language": "english", "mood": "emotional", "rating": 8.8, "year": 1994, "description": "A simple man lives an extraordinary life."},
-    {"title": "The Shawshank Redemption", "genre": "drama", "language": "english", "mood": "thoughtful", "rating": 9.3, "year": 1994, "description": "Two prisoners build a deep friendship and plan escape."},
-    {"title": "La La Land", "genre": "musical|romance", "language": "english", "mood": "romantic", "rating": 8.0, "year": 2016, "description": "Two artists chase dreams and love in Los Angeles."},
-    {"title": "Whiplash", "genre": "drama", "language": "english", "mood": "intense", "rating": 8.5, "year": 2014, "description": "A drummer faces a brutal music teacher."},
-    {"title": "3 Idiots", "genre": "comedy|drama", "language": "hindi", "mood": "happy", "rating": 8.4, "year": 2009, "description": "Three engineering students question the education system."},
-    {"title": "Taare Zameen Par", "genre": "drama", "language": "hindi", "mood": "emotional", "rating": 8.3, "year": 2007, "description": "A teacher helps a dyslexic child discover his talent."},
-    {"title": "Chhichhore", "genre": "comedy|drama", "language": "hindi", "mood": "happy", "rating": 8.0, "year": 2019, "description": "A father recalls college days to inspire his son."},
-    {"title": "ZNMD", "genre": "comedy|adventure", "language": "hindi", "mood": "chill", "rating": 8.1, "year": 2011, "description": "Three friends go on a road trip in Spain."},
-    {"title": "Andhadhun", "genre": "thriller|dark", "language": "hindi", "mood": "intense", "rating": 8.2, "year": 2018, "description": "A blind pianist gets stuck in a murder mystery."},
-    {"title": "Your Name", "genre": "anime|romance", "language": "anime-jp", "mood": "romantic", "rating": 8.4, "year": 2016, "description": "Two strangers mysteriously swap bodies."},
-    {"title": "Spirited Away", "genre": "anime|fantasy", "language": "anime-jp", "mood": "wholesome", "rating": 8.6, "year": 2001, "description": "A girl enters a magical spirit world."},
-    {"title": "Attack on Titan: Chronicle", "genre": "anime|action", "language": "anime-jp", "mood": "intense", "rating": 8.7, "year": 2020, "description": "Humanity fights against giant titans."},
-    {"title": "Demon Slayer: Mugen Train", "genre": "anime|action", "language": "anime-jp", "mood": "intense", "rating": 8.3, "year": 2020, "description": "Demon slayers guard passengers on a haunted train."},
-    {"title": "Inside Out", "genre": "animation|family", "language": "english", "mood": "wholesome", "rating": 8.1, "year": 2015, "description": "Emotions inside a girl's mind deal with change."},
-    {"title": "Coco", "genre": "animation|family", "language": "english", "mood": "wholesome", "rating": 8.4, "year": 2017, "description": "A boy travels to the Land of the Dead to find his ancestor."},
-    {"title": "The Pursuit of Happyness", "genre": "drama", "language": "english", "mood": "emotional", "rating": 8.0, "year": 2006, "description": "A struggling father never gives up on his dream."},
-    {"title": "DDLJ", "genre": "romance", "language": "hindi", "mood": "romantic", "rating": 8.0, "year": 1995, "description": "A love story across Europe and India."},
-    {"title": "Barfi!", "genre": "romance|drama", "language": "hindi", "mood": "wholesome", "rating": 8.1, "year": 2012, "description": "A mute and deaf man finds love and friendship."},
-    {"title": "Edge of Tomorrow", "genre": "sci-fi|action", "language": "english", "mood": "excited", "rating": 7.9, "year": 2014, "description": "A soldier relives the same battle day repeatedly."},
-    {"title": "The Martian", "genre": "sci-fi|drama", "language": "english", "mood": "thoughtful", "rating": 8.0, "year": 2015, "description": "A stranded astronaut survives alone on Mars."},
-    {"title": "Joker", "genre": "drama|thriller", "language": "english", "mood": "emotional", "rating": 8.4, "year": 2019, "description": "The story of a lonely man turning into the Joker."},
-    {"title": "Dear Zindagi", "genre": "drama", "language": "hindi", "mood": "thoughtful", "rating": 7.5, "year": 2016, "description": "A young woman talks to a therapist to heal."},
-]
+import os
+import argparse
+import threading
+from functools import lru_cache, partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from catalogue import Catalogue, Movie, load_catalogue, normalize
+from index import SORT_KEYS, CatalogueIndex
+from similarity import SimilarityIndex, load_similarity
+
+MOVIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "movies.csv")
+QUERY_CACHE_SIZE = 4096
+MAX_TOP_K = 100
+
+
+def _check_top_k(top_k) -> int:
+    """top_k as an int in 1..MAX_TOP_K; ValueError otherwise."""
+    try:
+        k = int(top_k)
+    except (TypeError, ValueError):
+        raise ValueError(f"top_k must be an integer, got {top_k!r}.") from None
+    if not 1 <= k <= MAX_TOP_K:
+        raise ValueError(f"top_k must be between 1 and {MAX_TOP_K}, got {k}.")
+    return k
+
+
+def _recommend_rows(index: CatalogueIndex, mood: str, genre: str, language: str, top_k: int,
+                    sort_by: str) -> Tuple[int, Tuple[int, ...]]:
+    """(relaxation level 0-3, row ids) for the first non-empty relaxation level."""
+    # All four relaxation levels come from one pass over the indexes
+    level, rows = index.recommend(mood, genre, language, top_k, sort_by)
+    return level, tuple(int(r) for r in rows)
+
+
+class CatalogueState:
+    """Everything derived from one version of the CSV; replaced as a whole on reload."""
+
+    def __init__(self, csv_path: str, generation: int = 0):
+        self.csv_path = csv_path
+        self.source_stat = os.stat(csv_path)
+        self.generation = generation
+        self.catalogue: Catalogue = load_catalogue(csv_path)
+        self.index = CatalogueIndex(self.catalogue)
+        # Each version has its own query cache, so old results (and the old catalogue they
+        # would keep alive) go away with the old state, even if a query finishes after the swap
+        self.cached_rows = lru_cache(maxsize=QUERY_CACHE_SIZE)(partial(_recommend_rows, self.index))
+        self._similarity: Optional[SimilarityIndex] = None  # built or loaded on first use
+        self._lock = threading.Lock()
+
+    @property
+    def similarity(self) -> SimilarityIndex:
+        with self._lock:
+            if self._similarity is None:
+                self._similarity = load_similarity(self.catalogue, self.csv_path)
+            return self._similarity
+
+
+_STATE = CatalogueState(MOVIES_CSV)
+_RELOAD_LOCK = threading.Lock()
 
 MOOD_OPTIONS = ["happy", "sad", "chill", "intense", "romantic", "thoughtful", "wholesome", "emotional", "excited"]
 GENRE_OPTIONS = ["sci-fi", "action", "drama", "comedy", "romance", "anime", "thriller", "family", "any"]
@@ -49,44 +76,126 @@ def ask_choice(prompt: str, options: list) -> str:
         print("Please type one of:", ", ".join(options))
 
 
-def filter_movies(mood: str, genre: str, language: str) -> List[Dict]:
-    result = []
-    for m in MOVIES:
-        if m["mood"] != mood:
-            continue
-        if genre != "any" and genre not in m["genre"]:
-            continue
-        if language != "any" and m["language"] != language:
-            continue
-        result.append(m)
-    return result
-
-
-def recommend(mood: str, genre: str, language: str, top_k: int = 3) -> List[Dict]:
-    print("\n[1] Trying exact match: mood + genre + language...")
-    movies = filter_movies(mood, genre, language)
+RELAX_MESSAGES = [
+    "   No exact match. Relaxing language filter...",
+    "   Still empty. Relaxing genre filter...",
+    "   Still empty. Only using mood...",
+]
 
-    if not movies:
-        print("   No exact match. Relaxing language filter...")
-        movies = filter_movies(mood, genre, "any")
 
-    if not movies:
-        print("   Still empty. Relaxing genre filter...")
-        movies = filter_movies(mood, "any", language)
+def filter_movies(mood: str, genre: str, language: str) -> List[Movie]:
+    state = _STATE
+    return state.catalogue.records(state.index.filter(mood, genre, language))
 
-    if not movies:
-        print("   Still empty. Only using mood...")
-        movies = filter_movies(mood, "any", "any")
 
-    movies.sort(key=lambda x: x["rating"], reverse=True)
-    return movies[:top_k]
+def recommend(mood: str, genre: str, language: str, top_k: int = 3, sort_by: str = "rating") -> List[Movie]:
+    """
+    Best top_k movies for the first non-empty relaxation level. sort_by is
+    "rating" (default), "recency" or "blended" (see index.SORT_KEYS).
+    """
+    top_k = _check_top_k(top_k)
+    state = _STATE
+    print("\n[1] Trying exact match: mood + genre + language...")
+    level, rows = _recommend_rows(state.index, mood, genre, language, top_k, sort_by)
+    for message in RELAX_MESSAGES[:level]:
+        print(message)
+    return state.catalogue.records(rows)
+
+
+def movie_dict(m: Movie) -> Dict:
+    return {k: getattr(m, k) for k in Movie.__slots__}
+
+
+def _query_key(q, top_k: int, sort_by: str) -> Tuple:
+    """Normalized cache key of one recommend_batch query. Raises ValueError for a malformed query."""
+    if isinstance(q, dict):
+        if "mood" not in q:
+            raise ValueError(f"Query {q} has no mood.")
+        top_k, sort_by = q.get("top_k", top_k), q.get("sort_by", sort_by)
+        q = (q["mood"], q.get("genre"), q.get("language"))
+    elif not isinstance(q, (tuple, list)) or len(q) != 3:
+        raise ValueError(f"Query {q!r} is not a (mood, genre, language) tuple or a dict.")
+    mood, genre, language = q
+    if not isinstance(mood, str):
+        raise ValueError(f"mood must be a string, got {mood!r}.")
+    for name, value in (("genre", genre), ("language", language)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{name} must be a string, got {value!r}.")
+    if not isinstance(sort_by, str) or sort_by not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key {sort_by!r}. Choose from {list(SORT_KEYS)}.")
+    top_k = _check_top_k(top_k)
+    return (normalize(mood), normalize("any" if genre is None else genre),
+            normalize("any" if language is None else language), top_k, sort_by)
+
+
+def recommend_batch(queries: Iterable, top_k: int = 3, sort_by: str = "rating") -> List[Dict]:
+    """
+    Non-interactive recommend() for many queries. Each query is a
+    (mood, genre, language) tuple or a dict with those keys (genre and
+    language are strings, default "any" when missing or None; a dict may
+    also set top_k and sort_by). Raises ValueError for a malformed query.
+    Identical queries are answered once per batch and memoized across
+    batches until the catalogue reloads. Returns one dict per query:
+    {"query", "relaxation", "movies"}.
+    """
+    state = _STATE
+    keys = [_query_key(q, top_k, sort_by) for q in queries]
+
+    answers = {}
+    for key in dict.fromkeys(keys):  # unique keys, first-seen order
+        level, rows = state.cached_rows(*key)
+        answers[key] = {
+            "relaxation": level,
+            "movies": [movie_dict(m) for m in state.catalogue.records(rows)],
+        }
+
+    return [{"query": {"mood": k[0], "genre": k[1], "language": k[2]}, **answers[k]} for k in keys]
+
+
+def query_cache_info():
+    """Hit/miss counters of the current catalogue's query cache (reset by a reload)."""
+    return _STATE.cached_rows.cache_info()
+
+
+def reload_catalogue(force: bool = False) -> bool:
+    """
+    Reloads movies.csv if it changed on disk (or when forced), swaps in the
+    new catalogue/indexes and, with them, an empty query cache. Returns True
+    if a reload happened. Queries in flight finish on the old catalogue.
+    """
+    global _STATE
+    with _RELOAD_LOCK:
+        old = _STATE
+        st = os.stat(old.csv_path)
+        if not force and (st.st_size, st.st_mtime_ns) == (old.source_stat.st_size, old.source_stat.st_mtime_ns):
+            return False
+        new = CatalogueState(old.csv_path, generation=old.generation + 1)
+        _STATE = new
+        return True
+
+
+def more_like_this(titles: List[str], top_k: int = 3) -> List[List[Movie]]:
+    """Movies with the most similar description/genres for each title; unknown titles get []."""
+    top_k = _check_top_k(top_k)
+    state = _STATE
+    rows = [state.catalogue.find(t) for t in titles]
+    known = [r for r in rows if r is not None]
+    similar = iter(state.similarity.similar_batch(known, k=top_k))
+    return [state.catalogue.records([r for r, _ in next(similar)]) if row is not None else [] for row in rows]
+
+
+def print_movies(movies: List[Movie]):
+    for m in movies:
+        print(f"- {m.title} ({m.year})  ⭐ {m.rating}")
+        print(f"  Genre: {m.genre} | Language: {m.language} | Mood: {m.mood}")
+        print(f"  {m.description}\n")
 
 
 def main():
     print("=" * 60)
     print("MOVIE RECOMMENDATION SYSTEM (Mood + Genre + Language)")
     print("=" * 60)
-    print(f"Total movies in catalogue: {len(MOVIES)}\n")
+    print(f"Total movies in catalogue: {len(_STATE.catalogue)}\n")
 
     mood = ask_choice("1) How are you feeling right now? (mood)", MOOD_OPTIONS)
     genre = ask_choice("2) What genre do you feel like watching? ('any' = no preference)", GENRE_OPTIONS)
@@ -100,12 +209,28 @@ def main():
         return
 
     print("Here are your recommendations:\n")
-    for m in recs:
-        print(f"- {m['title']} ({m['year']})  ⭐ {m['rating']}")
-        print(f"  Genre: {m['genre']} | Language: {m['language']} | Mood: {m['mood']}")
-        print(f"  {m['description']}\n")
+    print_movies(recs)
+
+
+def main_like(titles: List[str], top_k: int):
+    for title, movies in zip(titles, more_like_this(titles, top_k=top_k)):
+        if not movies:
+            print(f"No movies like '{title}' (unknown title or no shared words/genres).\n")
+            continue
+        print(f"More like '{title}':\n")
+        print_movies(movies)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Mood + Genre + Language movie recommender")
+    parser.add_argument("--like", type=str, nargs="+", metavar="TITLE",
+                        help="Show movies similar to these titles instead of asking questions")
+    parser.add_argument("--top_k", type=int, default=3)
+    args = parser.parse_args()
+    if not 1 <= args.top_k <= MAX_TOP_K:
+        parser.error(f"--top_k must be between 1 and {MAX_TOP_K}")
+    if args.like:
+        main_like(args.like, args.top_k)
+    else:
+        main()
 
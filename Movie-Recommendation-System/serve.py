@@ -0,0 +1,178 @@
+# serve.py - Non-interactive front ends for the recommender
+#
+#   python3 serve.py --http 8080          # local HTTP endpoint
+#   python3 serve.py --jsonl < in.jsonl   # one JSON query per line in, one result per line out
+#
+# HTTP:
+#   GET  /health                                   catalogue size, generation, query cache stats
+#   GET  /recommend?mood=happy&genre=any&language=english[&top_k=3&sort_by=rating]
+#   POST /recommend  {"queries": [{"mood": ..., "genre": ..., "language": ...}, ...], "top_k": 3}
+#   POST /like       {"titles": ["Inception"], "top_k": 3}
+#   POST /reload     re-read movies.csv if it changed ({"force": true} to always reload)
+#
+# Both modes go through recommend.recommend_batch, so repeated queries are
+# served from its LRU cache until the catalogue reloads.
+
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import recommend
+
+
+def health() -> dict:
+    info = recommend.query_cache_info()
+    state = recommend._STATE
+    return {
+        "movies": len(state.catalogue),
+        "generation": state.generation,
+        "cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize},
+    }
+
+
+def like(titles, top_k=3) -> list:
+    return [
+        {"title": t, "movies": [recommend.movie_dict(m) for m in movies]}
+        for t, movies in zip(titles, recommend.more_like_this(titles, top_k=top_k))
+    ]
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("request body must be a JSON object")
+        return body
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == "/health":
+                return self._send(200, health())
+            if url.path == "/recommend":
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if "mood" not in params:
+                    return self._send(400, {"error": "mood is required"})
+                return self._send(200, recommend.recommend_batch([params])[0])
+            self._send(404, {"error": "not found"})
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send(400, {"error": str(exc)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            body = self._body()
+            if url.path == "/recommend":
+                queries = body.get("queries", [body])
+                results = recommend.recommend_batch(queries, top_k=body.get("top_k", 3),
+                                                    sort_by=body.get("sort_by", "rating"))
+                return self._send(200, {"results": results})
+            if url.path == "/like":
+                return self._send(200, {"results": like(body.get("titles", []), int(body.get("top_k", 3)))})
+            if url.path == "/reload":
+                reloaded = recommend.reload_catalogue(force=bool(body.get("force")))
+                return self._send(200, {"reloaded": reloaded, **health()})
+            self._send(404, {"error": "not found"})
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send(400, {"error": str(exc)})
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate the load test
+
+
+def watch_catalogue(interval_s: float):
+    """Polls movies.csv and reloads it when it changes."""
+    def loop():
+        while True:
+            time.sleep(interval_s)
+            if recommend.reload_catalogue():
+                print(f"Reloaded catalogue: {health()['movies']} movies", file=sys.stderr)
+
+    threading.Thread(target=loop, name="catalogue-watch", daemon=True).start()
+
+
+def serve_http(port: int):
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Serving on http://127.0.0.1:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def serve_jsonl(batch_size: int, top_k: int, sort_by: str):
+    """Reads queries from stdin in batches of batch_size lines; writes one JSON result per line."""
+    def flush(lines):
+        parsed = []
+        for line in lines:
+            try:
+                parsed.append(json.loads(line))
+            except ValueError as exc:
+                parsed.append(exc)
+        good = [q for q in parsed if not isinstance(q, Exception)]
+        try:
+            results = iter(recommend.recommend_batch(good, top_k=top_k, sort_by=sort_by))
+        except (ValueError, KeyError, TypeError):
+            # Answer this batch one query at a time so one bad line doesn't fail the rest
+            results = iter(_one_by_one(good, top_k, sort_by))
+        for q in parsed:
+            out = {"error": f"invalid JSON: {q}"} if isinstance(q, Exception) else next(results)
+            sys.stdout.write(json.dumps(out) + "\n")
+        sys.stdout.flush()
+
+    lines = []
+    for line in sys.stdin:
+        if line.strip():
+            lines.append(line)
+        if len(lines) >= batch_size:
+            flush(lines)
+            lines = []
+    if lines:
+        flush(lines)
+
+
+def _one_by_one(queries, top_k, sort_by):
+    for q in queries:
+        try:
+            yield recommend.recommend_batch([q], top_k=top_k, sort_by=sort_by)[0]
+        except (ValueError, KeyError, TypeError) as exc:
+            yield {"error": str(exc)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--http", type=int, metavar="PORT")
+    mode.add_argument("--jsonl", action="store_true")
+    parser.add_argument("--batch_size", type=int, default=1024, help="JSONL lines per recommend_batch call")
+    parser.add_argument("--top_k", type=int, default=3)
+    parser.add_argument("--sort_by", type=str, default="rating")
+    parser.add_argument("--watch", type=float, default=0, metavar="SECONDS",
+                        help="Reload movies.csv when it changes, checking every SECONDS (HTTP mode)")
+    args = parser.parse_args()
+
+    if args.jsonl:
+        serve_jsonl(args.batch_size, args.top_k, args.sort_by)
+    else:
+        if args.watch:
+            watch_catalogue(args.watch)
+        serve_http(args.http)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# similarity.py - "More like this" over movie descriptions and genres
+#
+# Each movie becomes a sparse TF-IDF vector (sublinear tf) of hashed features:
+#   - word unigrams and bigrams of the description
+#   - one "genre:<name>" feature per genre (weighted by GENRE_WEIGHT)
+# Features are hashed with crc32 into N_FEATURES columns, so no vocabulary
+# has to be stored, and rows are L2-normalized so a dot product is the
+# cosine similarity. Description terms found in more than MAX_DF of all
+# movies ("the", "a", ...) are dropped: they say little about similarity and
+# would make every movie a candidate for every query. A query is one sparse
+# matrix-vector product followed by np.argpartition; batched queries multiply
+# by blocks of seed rows, sized so a block's score matrix holds at most
+# MAX_BLOCK_SCORES entries however large the catalogue is.
+# The matrix is persisted next to the CSV and reused while the CSV is unchanged.
+
+import os
+import re
+import zlib
+import json
+from typing import List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from catalogue import Catalogue
+
+N_FEATURES = 1 << 18
+GENRE_WEIGHT = 2.0
+MAX_DF = 0.5                 # drop description terms in more than this fraction of movies
+MAX_BLOCK_SCORES = 1 << 22   # seed-by-movie scores per block in similar_batch (~32 MB with indices)
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".similarity.npz"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def features(description: str, genres: List[str]) -> List[str]:
+    words = TOKEN_RE.findall(description.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])] + [f"genre:{g}" for g in genres]
+
+
+def feature_column(feature: str, n_features: int = N_FEATURES) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(feature.encode("utf-8")) % n_features
+
+
+class SimilarityIndex:
+    def __init__(self, matrix: sp.csr_matrix):
+        self.matrix = matrix  # (n_movies, n_features) float32, rows L2-normalized
+
+    @classmethod
+    def build(cls, catalogue: Catalogue, n_features: int = N_FEATURES, max_df: float = MAX_DF) -> "SimilarityIndex":
+        indptr, indices, values = [0], [], []
+        genre_cols = set()
+        for i in range(len(catalogue)):
+            genres = catalogue.genres_of(i)
+            counts = {}
+            for f in features(catalogue.descriptions[i], genres):
+                col = feature_column(f, n_features)
+                if f.startswith("genre:"):
+                    genre_cols.add(col)
+                    counts[col] = counts.get(col, 0.0) + GENRE_WEIGHT
+                else:
+                    counts[col] = counts.get(col, 0.0) + 1.0
+            indices.extend(counts)
+            values.extend(counts.values())
+            indptr.append(len(indices))
+
+        tf = sp.csr_matrix(
+            (np.array(values, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(catalogue), n_features),
+        )
+        # Sublinear tf times smoothed idf, as in scikit-learn: log((1 + n) / (1 + df)) + 1
+        df = np.bincount(tf.indices, minlength=n_features)
+        idf = (np.log((1.0 + len(catalogue)) / (1.0 + df)) + 1.0).astype(np.float32)
+        tf.data = (1.0 + np.log(tf.data)) * idf[tf.indices]
+
+        # Near-universal description terms (not genres, which are few and meant to be shared)
+        common = df > max_df * len(catalogue)
+        common[list(genre_cols)] = False
+        if common.any():
+            tf.data[common[tf.indices]] = 0.0
+            tf.eliminate_zeros()
+
+        norms = np.sqrt(np.asarray(tf.multiply(tf).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix = sp.diags((1.0 / norms).astype(np.float32)) @ tf
+        return cls(matrix.tocsr())
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def _top_k(cols: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k best scores, best first, ties by column."""
+        if len(scores) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            cols, scores = cols[part], scores[part]
+            order = np.lexsort((cols, -scores))
+            return part[order]
+        return np.lexsort((cols, -scores))
+
+    def similar(self, row: int, k: int = 5) -> List[tuple]:
+        """[(row, cosine similarity)] of up to k movies closest to row, excluding itself."""
+        return self.similar_batch([row], k)[0]
+
+    def similar_batch(self, rows: List[int], k: int = 5, batch_size: int = 256) -> List[List[tuple]]:
+        """
+        similar() for many seed rows; each block of up to batch_size seeds is
+        one sparse matrix product. The product stays sparse, so only movies
+        sharing at least one feature with a seed are ranked, and blocks shrink
+        with the catalogue so a dense block still fits MAX_BLOCK_SCORES.
+        """
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}.")
+        batch_size = max(1, min(batch_size, MAX_BLOCK_SCORES // max(len(self), 1)))
+        results = []
+        for start in range(0, len(rows), batch_size):
+            seeds = np.asarray(rows[start:start + batch_size])
+            # (seeds, n_features) x (n_features, n_movies) -> sparse (seeds, n_movies)
+            scores = (self.matrix[seeds] @ self.matrix.T).tocsr()
+            for j, seed in enumerate(seeds):
+                lo, hi = scores.indptr[j], scores.indptr[j + 1]
+                cols, vals = scores.indices[lo:hi], scores.data[lo:hi]
+                keep = cols != seed
+                cols, vals = cols[keep], vals[keep]
+                top = self._top_k(cols, vals, k)
+                results.append([(int(cols[t]), float(vals[t])) for t in top])
+        return results
+
+    # ---- persistence ----
+
+    def save(self, path: str, source_stat=None):
+        meta = {
+            "version": CACHE_VERSION,
+            "source": [source_stat.st_size, source_stat.st_mtime_ns] if source_stat else None,
+            "shape": list(self.matrix.shape),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+                data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, source_stat=None, n_features: int = N_FEATURES) -> Optional["SimilarityIndex"]:
+        """Returns None if the file is missing, stale or built with other settings."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+                if meta["version"] != CACHE_VERSION or meta["shape"][1] != n_features:
+                    return None
+                if source_stat is not None and meta["source"] != [source_stat.st_size, source_stat.st_mtime_ns]:
+                    return None
+                matrix = sp.csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(meta["shape"]))
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(matrix)
+
+
+def load_similarity(catalogue: Catalogue, csv_path: str, cache_path: Optional[str] = None,
+                    use_cache: bool = True) -> SimilarityIndex:
+    """Similarity index for the catalogue loaded from csv_path, reusing the persisted matrix when fresh."""
+    cache_path = cache_path or csv_path + CACHE_SUFFIX
+    source_stat = os.stat(csv_path)
+    if use_cache:
+        index = SimilarityIndex.load(cache_path, source_stat)
+        if index is not None and len(index) == len(catalogue):
+            return index
+
+    index = SimilarityIndex.build(catalogue)
+    if use_cache:
+        try:
+            index.save(cache_path, source_stat)
+        except OSError:
+            pass
+    return index
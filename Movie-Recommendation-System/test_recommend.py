@@ -0,0 +1,39 @@
+# test_recommend.py - top_k validation of the recommender entry points
+# Run with:  python3 -m unittest test_recommend
+
+import unittest
+
+import recommend
+
+
+class TopKTest(unittest.TestCase):
+    BAD_TOP_K = [0, -1, -5, recommend.MAX_TOP_K + 1]
+
+    def test_recommend_batch_rejects_out_of_range_top_k(self):
+        for top_k in self.BAD_TOP_K:
+            with self.subTest(top_k=top_k):
+                with self.assertRaises(ValueError):
+                    recommend.recommend_batch([("intense", "action", "any")], top_k=top_k)
+                with self.assertRaises(ValueError):
+                    recommend.recommend_batch([{"mood": "intense", "genre": "action", "top_k": top_k}])
+
+    def test_recommend_rejects_out_of_range_top_k(self):
+        for top_k in self.BAD_TOP_K:
+            with self.subTest(top_k=top_k), self.assertRaises(ValueError):
+                recommend.recommend("intense", "action", "any", top_k=top_k)
+
+    def test_more_like_this_rejects_out_of_range_top_k(self):
+        for top_k in self.BAD_TOP_K:
+            with self.subTest(top_k=top_k), self.assertRaises(ValueError):
+                recommend.more_like_this(["Inception"], top_k=top_k)
+
+    def test_valid_top_k_limits_results(self):
+        for top_k in (1, 3, recommend.MAX_TOP_K):
+            with self.subTest(top_k=top_k):
+                result = recommend.recommend_batch([("intense", "action", "any")], top_k=top_k)[0]
+                self.assertTrue(1 <= len(result["movies"]) <= top_k)
+                self.assertLessEqual(len(recommend.more_like_this(["Inception"], top_k=top_k)[0]), top_k)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,58 +1,31 @@
 import os
+import io
+import shutil
 import tempfile
-import glob
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
-import numpy as np
-import torch
 
-from src.config import Config
-from models.unet3d import UNet3D
-from utils.transforms import load_nii, resample_volume, normalize_intensity, center_crop_or_pad
-from src.reconstruct_3d import mask_to_mesh, save_as_obj
-from utils.io_utils import ensure_dir
+from api.pipeline import (cfg, MODALITIES, get_model, get_store, process_case_dir, process_case_stages,
+                          sse_event, artifact_paths, result_urls, choose_mask_format, mask_payload, mask_etag,
+                          file_etag, MASK_MIMETYPES)
 
 app = Flask(__name__)
 CORS(app)
 
-cfg = Config()
-device = torch.device(cfg.DEVICE if torch.cuda.is_available() else "cpu")
-
 # Load model once at startup
-CHECKPOINT_PATH = os.path.join(cfg.CHECKPOINT_DIR, "unet3d_best.pth")
-model = UNet3D(in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES)
-if os.path.exists(CHECKPOINT_PATH):
-    ckpt = torch.load(CHECKPOINT_PATH, map_location=device)
-    model.load_state_dict(ckpt["model_state"])
-model.to(device)
-model.eval()
-
-
-def preprocess_api_case(case_dir):
-    modalities = ["t1", "t1ce", "t2", "flair"]
-    images = []
-    spacing_ref = None
-    for m in modalities:
-        path = glob.glob(os.path.join(case_dir, f"*_{m}.nii*"))
-        if len(path) != 1:
-            raise ValueError(f"Expected one file for modality {m}, got {len(path)}.")
-        vol, spacing = load_nii(path[0])
-        spacing_ref = spacing if spacing_ref is None else spacing_ref
-        vol = resample_volume(vol, spacing, cfg.TARGET_SPACING)
-        vol = normalize_intensity(vol, cfg.INTENSITY_CLIP)
-        images.append(vol)
-    vol_stack = np.stack(images, axis=0)
-    vol_stack = center_crop_or_pad(vol_stack, cfg.PATCH_SIZE)
-    return vol_stack, spacing_ref
-
-
-def run_model(image_vol):
-    x = torch.from_numpy(image_vol[None]).float().to(device)
-    with torch.no_grad():
-        logits = model(x)
-        probs = torch.sigmoid(logits)
-        preds = (probs > 0.5).float().cpu().numpy()[0]
-    return preds
+get_model()
+get_store().start_sweeper(cfg.RESULT_SWEEP_INTERVAL_S)
+
+
+def job_paths(job_id):
+    """Artifact paths of a live job, or None if the id is unknown or expired."""
+    job_dir = get_store().get(job_id)
+    return artifact_paths(job_dir) if job_dir is not None else None
+
+
+def send_artifact(job_id, path_or_file, **kwargs):
+    """send_file with ETag, Range and caching until the job expires."""
+    return send_file(path_or_file, conditional=True, max_age=get_store().remaining_s(job_id), **kwargs)
 
 
 @app.route("/health", methods=["GET"])
@@ -66,56 +39,118 @@ def predict():
     Expects multipart/form-data with four files:
     - t1, t1ce, t2, flair (NIfTI .nii or .nii.gz)
     Returns:
-    - JSON with dice placeholder and URLs for mask .npy and mesh .obj.
+    - JSON with the job id, dice placeholder and URLs for mask, mesh .obj and
+      overlay .png. The mask is stored bit-packed; see download_mask for
+      available formats. Results are kept for Config.RESULT_TTL_S.
     """
     if "t1" not in request.files:
         return jsonify({"error": "Upload four files named t1, t1ce, t2, flair"}), 400
 
     with tempfile.TemporaryDirectory() as tmpdir:
         # Save uploaded files with BraTS-like names
-        for key in ["t1", "t1ce", "t2", "flair"]:
+        for key in MODALITIES:
             f = request.files[key]
             if f.filename == "":
                 return jsonify({"error": f"Empty filename for {key}"}), 400
             out_path = os.path.join(tmpdir, f"case_{key}.nii.gz")
             f.save(out_path)
 
-        image_vol, spacing_ref = preprocess_api_case(tmpdir)
-        preds = run_model(image_vol)
-        wt_mask = preds[0] > 0.5
-
-        # Save mask and 3D mesh
-        ensure_dir(cfg.RESULTS_DIR)
-        mask_path = os.path.join(cfg.RESULTS_DIR, "api_mask.npy")
-        np.save(mask_path, preds)
-
-        verts, faces = mask_to_mesh(wt_mask)
-        mesh_path = os.path.join(cfg.RESULTS_DIR, "api_mesh.obj")
-        save_as_obj(verts, faces, mesh_path)
+        job_id, job_dir = get_store().create()
+        try:
+            process_case_dir(tmpdir, job_dir, job_id)
+        except Exception:
+            get_store().delete(job_id)
+            raise
 
+    urls = result_urls(job_id)
     return jsonify({
-        "mask_path": "/download/mask",
-        "mesh_path": "/download/mesh",
+        "job_id": job_id,
+        "mask_path": urls["mask"],
+        "mesh_path": urls["mesh"],
+        "overlay_path": urls["overlay"],
         "dice_estimate": None
     })
 
 
-@app.route("/download/mask", methods=["GET"])
-def download_mask():
-    path = os.path.join(cfg.RESULTS_DIR, "api_mask.npy")
-    if not os.path.exists(path):
+@app.route("/predict/stream", methods=["POST"])
+def predict_stream():
+    """
+    Same upload as /predict, but answers with a text/event-stream of stage
+    events (uploaded, preprocessed, segmented, mask_ready, coarse_mesh_ready,
+    full_mesh_ready, or error) so the overlay can be shown before meshing ends.
+    """
+    if "t1" not in request.files:
+        return jsonify({"error": "Upload four files named t1, t1ce, t2, flair"}), 400
+
+    tmpdir = tempfile.mkdtemp()
+    for key in MODALITIES:
+        f = request.files[key]
+        if f.filename == "":
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            return jsonify({"error": f"Empty filename for {key}"}), 400
+        f.save(os.path.join(tmpdir, f"case_{key}.nii.gz"))
+
+    job_id, job_dir = get_store().create()
+
+    def events():
+        try:
+            yield sse_event({"stage": "uploaded", "job_id": job_id})
+            for event in process_case_stages(tmpdir, job_dir, job_id):
+                yield sse_event(event)
+        except Exception as exc:
+            get_store().delete(job_id)
+            yield sse_event({"stage": "error", "error": str(exc)})
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/download/<job_id>/mask", methods=["GET"])
+def download_mask(job_id):
+    """
+    Serves the job's mask as ?format=npy (default, float32), packbits, labels,
+    rle or nifti. The format can also be chosen with the Accept header.
+    NIfTI is served on the original scan grid written by /predict.
+    """
+    paths = job_paths(job_id)
+    if paths is None or not os.path.exists(paths["mask"]):
         return jsonify({"error": "Mask not found"}), 404
-    return send_file(path, as_attachment=True, download_name="mask.npy")
+    fmt = choose_mask_format(request.args.get("format"), request.headers.get("Accept"))
+    if fmt is None:
+        return jsonify({"error": f"Unknown mask format. Choose from {list(MASK_MIMETYPES)}"}), 406
+
+    etag = mask_etag(paths, fmt)
+    if etag in request.if_none_match:
+        # Skip the format conversion for revalidations
+        return "", 304, {"ETag": f'"{etag}"'}
+    kind, payload, mimetype, name = mask_payload(paths, fmt)
+    if kind == "bytes":
+        payload = io.BytesIO(payload)
+    return send_artifact(job_id, payload, mimetype=mimetype, as_attachment=True, download_name=name,
+                         etag=etag)
+
+
+@app.route("/download/<job_id>/mesh", methods=["GET"])
+def download_mesh(job_id):
+    """?quality=coarse serves the preview mesh streamed by /predict/stream."""
+    paths = job_paths(job_id)
+    key = "mesh_coarse" if request.args.get("quality") == "coarse" else "mesh"
+    if paths is None or not os.path.exists(paths[key]):
+        return jsonify({"error": "Mesh not found"}), 404
+    return send_artifact(job_id, paths[key], as_attachment=True, download_name="tumor.obj",
+                         etag=file_etag(paths[key]))
 
 
-@app.route("/download/mesh", methods=["GET"])
-def download_mesh():
-    path = os.path.join(cfg.RESULTS_DIR, "api_mesh.obj")
-    if not os.path.exists(path):
-        return jsonify({"error": "Mesh not found"}), 404
-    return send_file(path, as_attachment=True, download_name="tumor.obj")
+@app.route("/download/<job_id>/overlay", methods=["GET"])
+def download_overlay(job_id):
+    paths = job_paths(job_id)
+    if paths is None or not os.path.exists(paths["overlay"]):
+        return jsonify({"error": "Overlay not found"}), 404
+    return send_artifact(job_id, paths["overlay"], mimetype="image/png",
+                         etag=file_etag(paths["overlay"]))
 
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=False)
-
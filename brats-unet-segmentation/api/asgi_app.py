@@ -0,0 +1,268 @@
+import os
+import queue
+import asyncio
+import shutil
+import tempfile
+import contextlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, FileResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from api.pipeline import (cfg, MODALITIES, init_worker, worker_ready, get_store, process_case_dir, stream_case_events,
+                          sse_event, artifact_paths, result_urls, choose_mask_format, mask_payload, mask_etag,
+                          file_etag, cache_headers, MASK_MIMETYPES)
+
+
+"""
+ASGI variant of api/app.py with the same routes, for uvicorn:
+
+    uvicorn api.asgi_app:app --host 0.0.0.0 --port 8000
+
+- Uploads are read asynchronously in chunks, so slow clients don't hold a worker.
+- Preprocessing, inference and meshing run in a process pool
+  (Config.API_WORKERS), each worker holding its own copy of the model.
+- At most Config.API_MAX_CONCURRENCY cases are in the pool at once; further
+  requests wait on a semaphore instead of piling up work.
+- /predict/stream sends stage events as server-sent events; the worker
+  pushes them through a Manager queue that the event loop drains. If the
+  worker dies without its end marker, the stream ends with an error event.
+- Results live in the per-job store (api/result_store.py); downloads carry
+  ETags and FileResponse answers Range requests.
+"""
+
+UPLOAD_CHUNK = 1 << 20
+STREAM_POLL_S = 1.0  # how often /predict/stream checks whether its worker died
+
+_pool = None
+_slots = None
+_manager = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=cfg.API_WORKERS,
+            mp_context=mp.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(cfg.API_THREADS_PER_WORKER,),
+        )
+    return _pool
+
+
+def get_slots():
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(cfg.API_MAX_CONCURRENCY)
+    return _slots
+
+
+def get_manager():
+    global _manager
+    if _manager is None:
+        _manager = mp.get_context("spawn").Manager()
+    return _manager
+
+
+def error(message, status):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+def attachment(name):
+    return {"Content-Disposition": f'attachment; filename="{name}"'}
+
+
+def job_paths(job_id):
+    """Artifact paths of a live job, or None if the id is unknown or expired."""
+    job_dir = get_store().get(job_id)
+    return artifact_paths(job_dir) if job_dir is not None else None
+
+
+def validators(request, job_id, etag):
+    """Returns (headers, not_modified) for a download with the given unquoted ETag."""
+    headers = {"ETag": f'"{etag}"', **cache_headers(job_id)}
+    tags = [t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")]
+    return headers, headers["ETag"] in tags or "*" in tags
+
+
+def send_artifact(request, job_id, path, **kwargs):
+    headers, not_modified = validators(request, job_id, file_etag(path))
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers, **kwargs)
+
+
+async def save_upload(upload, path):
+    with open(path, "wb") as f:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK)
+            if not chunk:
+                break
+            f.write(chunk)
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def receive_case(request, tmpdir):
+    """Saves the four uploads into tmpdir; returns an error response or None."""
+    form = await request.form()
+    try:
+        if "t1" not in form:
+            return error("Upload four files named t1, t1ce, t2, flair", 400)
+        for key in MODALITIES:
+            upload = form.get(key)
+            if upload is None or isinstance(upload, str) or not upload.filename:
+                return error(f"Empty filename for {key}", 400)
+            await save_upload(upload, os.path.join(tmpdir, f"case_{key}.nii.gz"))
+    finally:
+        await form.close()
+    return None
+
+
+async def predict(request):
+    """Same contract as the Flask /predict: four NIfTI files t1, t1ce, t2, flair."""
+    tmpdir = tempfile.mkdtemp()
+    try:
+        failed = await receive_case(request, tmpdir)
+        if failed is not None:
+            return failed
+        job_id, job_dir = get_store().create()
+        try:
+            async with get_slots():
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(get_pool(), process_case_dir, tmpdir, job_dir, job_id)
+        except Exception:
+            get_store().delete(job_id)
+            raise
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    urls = result_urls(job_id)
+    return JSONResponse({
+        "job_id": job_id,
+        "mask_path": urls["mask"],
+        "mesh_path": urls["mesh"],
+        "overlay_path": urls["overlay"],
+        "dice_estimate": None
+    })
+
+
+async def predict_stream(request):
+    """Same upload as /predict, answered with a text/event-stream of stage events."""
+    tmpdir = tempfile.mkdtemp()
+    failed = await receive_case(request, tmpdir)
+    if failed is not None:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return failed
+
+    job_id, job_dir = get_store().create()
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        try:
+            yield sse_event({"stage": "uploaded", "job_id": job_id})
+            events_queue = get_manager().Queue()
+            async with get_slots():
+                job = loop.run_in_executor(get_pool(), stream_case_events, tmpdir, job_dir, job_id, events_queue)
+                while True:
+                    try:
+                        event = await loop.run_in_executor(None, events_queue.get, True, STREAM_POLL_S)
+                    except queue.Empty:
+                        if not job.done():
+                            continue
+                        # A crashed worker (e.g. BrokenProcessPool) never sends None; surface its error
+                        await job
+                        break
+                    if event is None:
+                        break
+                    if event["stage"] == "error":
+                        get_store().delete(job_id)
+                    yield sse_event(event)
+                await job
+        except Exception as exc:
+            get_store().delete(job_id)
+            yield sse_event({"stage": "error", "error": str(exc)})
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def download_mask(request):
+    job_id = request.path_params["job_id"]
+    paths = job_paths(job_id)
+    if paths is None or not os.path.exists(paths["mask"]):
+        return error("Mask not found", 404)
+    fmt = choose_mask_format(request.query_params.get("format"), request.headers.get("accept"))
+    if fmt is None:
+        return error(f"Unknown mask format. Choose from {list(MASK_MIMETYPES)}", 406)
+
+    headers, not_modified = validators(request, job_id, mask_etag(paths, fmt))
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    # Format conversion is CPU work; keep it off the event loop
+    loop = asyncio.get_running_loop()
+    kind, payload, mimetype, name = await loop.run_in_executor(None, mask_payload, paths, fmt)
+    if kind == "file":
+        return FileResponse(payload, media_type=mimetype, filename=name, headers=headers)
+    return Response(payload, media_type=mimetype, headers={**headers, **attachment(name)})
+
+
+async def download_mesh(request):
+    job_id = request.path_params["job_id"]
+    paths = job_paths(job_id)
+    key = "mesh_coarse" if request.query_params.get("quality") == "coarse" else "mesh"
+    if paths is None or not os.path.exists(paths[key]):
+        return error("Mesh not found", 404)
+    return send_artifact(request, job_id, paths[key], filename="tumor.obj")
+
+
+async def download_overlay(request):
+    job_id = request.path_params["job_id"]
+    paths = job_paths(job_id)
+    if paths is None or not os.path.exists(paths["overlay"]):
+        return error("Overlay not found", 404)
+    return send_artifact(request, job_id, paths["overlay"], media_type="image/png")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # ProcessPoolExecutor spawns workers on demand; submit one task per worker so every
+    # process is started and has loaded its model before the first request
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(get_pool(), worker_ready) for _ in range(cfg.API_WORKERS)))
+    get_manager()
+    get_store().start_sweeper(cfg.RESULT_SWEEP_INTERVAL_S)
+    yield
+    get_store().stop_sweeper()
+    get_pool().shutdown(wait=True)
+    if _manager is not None:
+        _manager.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/predict", predict, methods=["POST"]),
+        Route("/predict/stream", predict_stream, methods=["POST"]),
+        Route("/download/{job_id}/mask", download_mask, methods=["GET"]),
+        Route("/download/{job_id}/mesh", download_mesh, methods=["GET"]),
+        Route("/download/{job_id}/overlay", download_overlay, methods=["GET"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,146 @@
+import os
+import time
+import json
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+import httpx
+import SimpleITK as sitk
+
+
+"""
+Load test for the segmentation API (Flask vs. ASGI).
+
+A stand-in client builds a small synthetic BraTS-like case and posts it to
+/predict with a fixed number of requests in flight. By default both apps
+run in-process (no network or server needed):
+- flask: the WSGI app behind httpx.WSGITransport, requests run in threads.
+- asgi:  the Starlette app behind httpx.ASGITransport, run inside its
+  lifespan (process pool, result-store sweeper) as uvicorn would.
+Pass --flask_url / --asgi_url to hit running servers over HTTP instead.
+
+A round of --concurrency untimed /predict calls warms each target (pool
+workers, model load) before requests/sec and p50/p95/p99 latency are
+measured.
+
+    python -m api.load_test --requests 20 --concurrency 4
+"""
+
+
+def make_case(size):
+    rng = np.random.default_rng(0)
+    files = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for key in ["t1", "t1ce", "t2", "flair"]:
+            vol = (rng.random((size, size, size)) * 1000).astype(np.float32)
+            path = os.path.join(tmpdir, f"case_{key}.nii.gz")
+            sitk.WriteImage(sitk.GetImageFromArray(vol), path)
+            with open(path, "rb") as f:
+                files[key] = (f"case_{key}.nii.gz", f.read(), "application/gzip")
+    return files
+
+
+@contextlib.asynccontextmanager
+async def make_client(target, url):
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+            yield client
+    elif target == "flask":
+        from api.app import app as flask_app
+        transport = _ThreadedWSGITransport(flask_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            yield client
+    else:
+        from api.asgi_app import app as asgi_app
+        # ASGITransport doesn't send lifespan events; run start-up and shutdown around the test ourselves
+        transport = httpx.ASGITransport(app=asgi_app, raise_app_exceptions=False)
+        async with asgi_app.router.lifespan_context(asgi_app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+                yield client
+
+
+class _ThreadedWSGITransport(httpx.AsyncBaseTransport):
+    """Runs the synchronous WSGI app in a thread per request, like a threaded WSGI server."""
+
+    def __init__(self, wsgi_app):
+        self._sync = httpx.WSGITransport(app=wsgi_app)
+
+    async def handle_async_request(self, request):
+        body = await request.aread()
+        sync_request = httpx.Request(request.method, request.url, headers=request.headers, content=body)
+        response = await asyncio.to_thread(self._call, sync_request)
+        return httpx.Response(response.status_code, headers=response.headers, content=response.content)
+
+    def _call(self, request):
+        response = self._sync.handle_request(request)
+        response.read()
+        return response
+
+
+async def run_target(target, url, files, n_requests, concurrency):
+    latencies, errors = [], 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async with make_client(target, url) as client:
+        # Warm-up, not timed: starts as many pool workers as the test keeps busy and loads their models
+        for warm in await asyncio.gather(*[client.post("/predict", files=files) for _ in range(concurrency)]):
+            if warm.status_code != 200:
+                raise RuntimeError(f"Warm-up /predict failed with {warm.status_code}: {warm.text[:200]}")
+
+        async def one():
+            nonlocal errors
+            async with slots:
+                start = time.perf_counter()
+                res = await client.post("/predict", files=files)
+                latencies.append(time.perf_counter() - start)
+                if res.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(n_requests)])
+        wall = time.perf_counter() - start
+
+    lat = np.array(latencies) * 1000
+    return {
+        "target": target,
+        "url": url or "in-process",
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_s": n_requests / wall,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", type=str, nargs="+", default=["flask", "asgi"], choices=["flask", "asgi"])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--size", type=int, default=64, help="Edge length of the synthetic volumes")
+    parser.add_argument("--flask_url", type=str, default=None)
+    parser.add_argument("--asgi_url", type=str, default=None)
+    parser.add_argument("--out", type=str, default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    files = make_case(args.size)
+    results = []
+    for target in args.targets:
+        url = args.flask_url if target == "flask" else args.asgi_url
+        r = asyncio.run(run_target(target, url, files, args.requests, args.concurrency))
+        results.append(r)
+        print(f"{target:>5}: {r['requests_per_s']:6.2f} req/s | p50 {r['p50_ms']:8.1f} ms | "
+              f"p95 {r['p95_ms']:8.1f} ms | p99 {r['p99_ms']:8.1f} ms | errors {r['errors']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import os
+import json
+
+import numpy as np
+import torch
+
+from src.config import Config
+from models.unet3d import UNet3D, checkpoint_spec, unet_spec
+from utils.case_loader import find_case_files, load_case
+from src.reconstruct_3d import mask_to_mesh_chunked, save_as_obj
+from utils.visualization import overlay_png_bytes
+from utils.io_utils import ensure_dir
+from utils.tta import flip_tta
+from utils.mask_io import load_mask, save_mask, mask_to_bytes, export_mask_nii, export_mask_native_nii
+from api.result_store import ResultStore, file_etag
+
+
+"""
+Framework-free segmentation pipeline shared by the Flask app (api/app.py)
+and the ASGI app (api/asgi_app.py). The ASGI app runs process_case_dir in
+worker processes, so everything here must be importable without a web
+framework and the model is loaded lazily once per process.
+"""
+
+cfg = Config()
+device = torch.device(cfg.DEVICE if torch.cuda.is_available() else "cpu")
+CHECKPOINT_PATH = os.path.join(cfg.CHECKPOINT_DIR, "unet3d_best.pth")
+MODALITIES = ["t1", "t1ce", "t2", "flair"]
+
+# Formats clients can request from /download/<job_id>/mask, via ?format= or Accept
+MASK_MIMETYPES = {
+    "npy": "application/x-npy",
+    "packbits": "application/x-mask-packbits",
+    "labels": "application/x-mask-labels",
+    "rle": "application/x-mask-rle",
+    "nifti": "application/x-nifti",
+}
+
+_model = None
+_store = None
+
+
+def get_model():
+    global _model
+    if _model is None:
+        spec = unet_spec(cfg.MODEL_VARIANT, **cfg.MODEL_OVERRIDES)
+        ckpt = torch.load(CHECKPOINT_PATH, map_location=device) if os.path.exists(CHECKPOINT_PATH) else None
+        if ckpt is not None:
+            spec = checkpoint_spec(ckpt)
+        model = UNet3D(in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES, **spec)
+        if ckpt is not None:
+            model.load_state_dict(ckpt["model_state"])
+        model.to(device)
+        model.eval()
+        _model = model
+    return _model
+
+
+def init_worker(num_threads=None):
+    """Process-pool initializer: bound torch threads and warm the model."""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    get_model()
+
+
+def worker_ready():
+    """No-op pool task; by the time it runs, init_worker has loaded the model."""
+    return os.getpid()
+
+
+def get_store():
+    """Result store of the serving process; pool workers only get job directories."""
+    global _store
+    if _store is None:
+        _store = ResultStore(
+            os.path.join(cfg.RESULTS_DIR, "jobs"),
+            ttl_s=cfg.RESULT_TTL_S,
+            max_bytes=int(cfg.RESULT_MAX_GB * 1024 ** 3),
+        )
+    return _store
+
+
+def preprocess_api_case(case_dir):
+    modality_paths, _ = find_case_files(case_dir)
+    vol_stack, geometry, _ = load_case(modality_paths, cfg)
+    return vol_stack, geometry
+
+
+def run_model(image_vol):
+    model = get_model()
+    x = torch.from_numpy(image_vol[None]).float().to(device)
+    with torch.no_grad():
+        if cfg.TTA_VARIANTS > 1:
+            logits, _ = flip_tta(model, x, n_variants=cfg.TTA_VARIANTS, batch_size=cfg.TTA_BATCH_SIZE)
+        else:
+            logits = model(x)
+        probs = torch.sigmoid(logits)
+        preds = (probs > 0.5).float().cpu().numpy()[0]
+    return preds
+
+
+def artifact_paths(out_dir):
+    return {
+        "mask": os.path.join(out_dir, "api_mask.npz"),
+        "mask_nii": os.path.join(out_dir, "api_mask.nii.gz"),
+        "mesh": os.path.join(out_dir, "api_mesh.obj"),
+        "mesh_coarse": os.path.join(out_dir, "api_mesh_coarse.obj"),
+        "overlay": os.path.join(out_dir, "api_overlay.png"),
+    }
+
+
+def result_urls(job_id):
+    base = f"/download/{job_id}"
+    return {
+        "mask": f"{base}/mask",
+        "mesh": f"{base}/mesh",
+        "mesh_coarse": f"{base}/mesh?quality=coarse",
+        "overlay": f"{base}/overlay",
+    }
+
+
+def coarse_mesh(mask, factor):
+    """Marching cubes on a strided copy of the mask, scaled back to voxel units."""
+    verts, faces = mask_to_mesh_chunked(mask[::factor, ::factor, ::factor])
+    return verts * factor, faces
+
+
+def process_case_stages(case_dir, out_dir, job_id):
+    """
+    Same work as process_case_dir, yielding an event dict after each stage so
+    callers can report progress: preprocessed, segmented, mask_ready (mask,
+    native-grid NIfTI and overlay written), coarse_mesh_ready, full_mesh_ready.
+    """
+    paths, urls = artifact_paths(out_dir), result_urls(job_id)
+    image_vol, geometry = preprocess_api_case(case_dir)
+    yield {"stage": "preprocessed", "shape": list(image_vol.shape)}
+
+    preds = run_model(image_vol)
+    wt_mask = preds[0] > 0.5
+    yield {"stage": "segmented", "wt_voxels": int(wt_mask.sum())}
+
+    ensure_dir(out_dir)
+    # The mask download only checks that the stored mask exists, so the native-grid NIfTI has to be
+    # in place first; otherwise a ?format=nifti request would cache a model-grid fallback under its ETag
+    export_mask_native_nii(preds, geometry, paths["mask_nii"])
+    save_mask(paths["mask"], preds, fmt="packbits", spacing=cfg.TARGET_SPACING)
+    with open(paths["overlay"], "wb") as f:
+        f.write(overlay_png_bytes(image_vol[0], preds))
+    yield {"stage": "mask_ready", "mask_path": urls["mask"], "overlay_path": urls["overlay"]}
+
+    verts, faces = coarse_mesh(wt_mask, cfg.API_COARSE_MESH_FACTOR)
+    save_as_obj(verts, faces, paths["mesh_coarse"])
+    yield {"stage": "coarse_mesh_ready", "mesh_path": urls["mesh_coarse"], "faces": len(faces)}
+
+    verts, faces = mask_to_mesh_chunked(wt_mask)
+    save_as_obj(verts, faces, paths["mesh"])
+    yield {"stage": "full_mesh_ready", "mesh_path": urls["mesh"], "faces": len(faces)}
+
+
+def process_case_dir(case_dir, out_dir, job_id):
+    """Preprocess, segment and mesh the uploaded case; returns the artifact paths."""
+    for _ in process_case_stages(case_dir, out_dir, job_id):
+        pass
+    return artifact_paths(out_dir)
+
+
+def stream_case_events(case_dir, out_dir, job_id, queue):
+    """
+    Runs process_case_stages in a pool worker and forwards each event to
+    queue (a multiprocessing Manager queue). An error becomes a final
+    {"stage": "error"} event; None marks the end of the stream.
+    """
+    try:
+        for event in process_case_stages(case_dir, out_dir, job_id):
+            queue.put(event)
+    except Exception as exc:
+        queue.put({"stage": "error", "error": str(exc)})
+    finally:
+        queue.put(None)
+
+
+def sse_event(event):
+    """Formats an event dict as a text/event-stream message."""
+    return f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+
+def choose_mask_format(fmt=None, accept=None):
+    """
+    Picks a key of MASK_MIMETYPES from ?format= or the Accept header.
+    Returns None for an unknown explicit format; defaults to legacy npy.
+    """
+    if fmt is not None:
+        return fmt if fmt in MASK_MIMETYPES else None
+    best, best_q = None, 0.0
+    for part in (accept or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        for key, mimetype in MASK_MIMETYPES.items():
+            if fields[0] == mimetype and q > best_q:
+                best, best_q = key, q
+    return best or "npy"
+
+
+def mask_etag(paths, fmt):
+    """ETag of a converted mask: the stored mask's validator plus the format."""
+    return f"{file_etag(paths['mask'])}-{fmt}"
+
+
+def mask_payload(paths, fmt):
+    """
+    Returns (kind, payload, mimetype, download_name) for a stored mask, where
+    kind is "file" (payload is a path) or "bytes".
+    """
+    mimetype = MASK_MIMETYPES[fmt]
+    if fmt == "packbits":
+        return "file", paths["mask"], mimetype, "mask_packbits.npz"
+
+    mask = load_mask(paths["mask"])
+    if fmt == "nifti":
+        if not os.path.exists(paths["mask_nii"]):
+            export_mask_nii(mask, mask.spacing, paths["mask_nii"])
+        return "file", paths["mask_nii"], mimetype, "mask.nii.gz"
+
+    data = mask_to_bytes(mask.to_array(np.float32), fmt, spacing=mask.spacing)
+    name = "mask.npy" if fmt == "npy" else f"mask_{fmt}.npz"
+    return "bytes", data, mimetype, name
+
+
+def cache_headers(job_id):
+    """Artifacts never change under a job id, so they may be cached until the job expires."""
+    return {"Cache-Control": f"public, max-age={get_store().remaining_s(job_id)}"}
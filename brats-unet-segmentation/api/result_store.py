@@ -0,0 +1,155 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import threading
+
+from utils.io_utils import ensure_dir, save_json, load_json
+
+
+"""
+Per-job result storage for the API.
+
+Every /predict call gets its own job id and directory, so concurrent users
+no longer overwrite each other's artifacts:
+
+    RESULTS_DIR/jobs/<id[:2]>/<id>/meta.json, api_mask.npz, api_mesh.obj, ...
+
+The two-character shard keeps directories small with many jobs. Each entry
+carries its own expiry in meta.json; a background sweeper deletes expired
+jobs and, if the store is still over its byte cap, the oldest remaining ones.
+"""
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+META_FILE = "meta.json"
+
+
+def file_etag(path):
+    """Unquoted strong validator from size and mtime; changes whenever the file is rewritten."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+class ResultStore:
+    def __init__(self, root, ttl_s=3600, max_bytes=None, shard_chars=2):
+        self.root = root
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.shard_chars = shard_chars
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper = None
+        ensure_dir(root)
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id[:self.shard_chars], job_id)
+
+    def create(self, ttl_s=None):
+        """Allocates a new job directory; returns (job_id, path)."""
+        job_id = uuid.uuid4().hex
+        path = self._job_dir(job_id)
+        now = time.time()
+        with self._lock:  # sweep() may be removing the (empty) shard directory
+            ensure_dir(path)
+            save_json({"created": now, "expires": now + (ttl_s or self.ttl_s)}, os.path.join(path, META_FILE))
+        return job_id, path
+
+    def get(self, job_id):
+        """Returns the job directory, or None for unknown, malformed or expired ids."""
+        if not JOB_ID_RE.match(job_id or ""):
+            return None
+        path = self._job_dir(job_id)
+        meta = self._meta(path)
+        if meta is None or meta["expires"] < time.time():
+            return None
+        return path
+
+    def remaining_s(self, job_id):
+        meta = self._meta(self._job_dir(job_id))
+        return max(0, int(meta["expires"] - time.time())) if meta else 0
+
+    def delete(self, job_id):
+        if JOB_ID_RE.match(job_id or ""):
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    @staticmethod
+    def _meta(path):
+        try:
+            return load_json(os.path.join(path, META_FILE))
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _dir_bytes(path):
+        total = 0
+        for entry in os.scandir(path):
+            if entry.is_file(follow_symlinks=False):
+                total += entry.stat().st_size
+        return total
+
+    def entries(self):
+        """Yields (job_id, path, meta, bytes) for every job on disk."""
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for job in os.scandir(shard.path):
+                if not (job.is_dir() and JOB_ID_RE.match(job.name)):
+                    continue
+                meta = self._meta(job.path)
+                if meta is None:
+                    # Half-created job or a foreign directory; age it by mtime
+                    mtime = job.stat().st_mtime
+                    meta = {"created": mtime, "expires": mtime + self.ttl_s}
+                yield job.name, job.path, meta, self._dir_bytes(job.path)
+
+    def size_bytes(self):
+        return sum(nbytes for *_, nbytes in self.entries())
+
+    def sweep(self):
+        """Deletes expired jobs, then the oldest ones while over max_bytes. Returns the number removed."""
+        with self._lock:
+            now = time.time()
+            live, removed = [], 0
+            for job_id, path, meta, nbytes in self.entries():
+                if meta["expires"] < now:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+                else:
+                    live.append((meta["created"], path, nbytes))
+
+            if self.max_bytes is not None:
+                total = sum(nbytes for _, _, nbytes in live)
+                for _, path, nbytes in sorted(live):
+                    if total <= self.max_bytes:
+                        break
+                    shutil.rmtree(path, ignore_errors=True)
+                    total -= nbytes
+                    removed += 1
+
+            for shard in os.scandir(self.root):
+                if shard.is_dir() and not any(os.scandir(shard.path)):
+                    os.rmdir(shard.path)
+            return removed
+
+    def start_sweeper(self, interval_s=60):
+        """Runs sweep() every interval_s seconds in a daemon thread."""
+        if self._sweeper is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval_s):
+                try:
+                    self.sweep()
+                except OSError as exc:
+                    print(f"Result sweep failed: {exc}")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=loop, name="result-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
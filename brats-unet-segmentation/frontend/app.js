@@ -4,6 +4,7 @@ const form = document.getElementById("upload-form");
 const statusDiv = document.getElementById("status");
 const overlayImg = document.getElementById("overlay-img");
 const meshCanvas = document.getElementById("mesh-canvas");
+const meshLink = document.getElementById("mesh-link");
 const gl = meshCanvas.getContext("webgl") || meshCanvas.getContext("experimental-webgl");
 
 // Minimalistic rotating mesh placeholder (client-side) – real mesh is downloadable as .obj.
@@ -22,13 +23,60 @@ setInterval(() => {
   drawPlaceholderMesh();
 }, 50);
 
+const STAGE_MESSAGES = {
+  uploaded: "Uploaded. Preprocessing...",
+  preprocessed: "Preprocessed. Running segmentation...",
+  segmented: "Segmented. Writing mask...",
+  mask_ready: "Mask ready. Building 3D mesh...",
+  coarse_mesh_ready: "Preview mesh ready. Refining mesh...",
+  full_mesh_ready: "Done. You can also download 3D mesh and mask from the API."
+};
+
+function handleStageEvent(event) {
+  if (event.stage === "error") {
+    statusDiv.textContent = `Error: ${event.error}`;
+    return;
+  }
+  statusDiv.textContent = STAGE_MESSAGES[event.stage] || event.stage;
+
+  if (event.stage === "mask_ready") {
+    // Overlay mosaic rendered by the API (WT green, TC yellow, ET red).
+    overlayImg.src = `${API_BASE}${event.overlay_path}?t=${Date.now()}`;
+  }
+  if (event.mesh_path) {
+    meshLink.href = `${API_BASE}${event.mesh_path}`;
+    meshLink.textContent = event.stage === "full_mesh_ready" ? "Download mesh (.obj)" : "Download preview mesh (.obj)";
+  }
+}
+
+// /predict/stream answers with server-sent events; EventSource can't POST, so parse the fetch body.
+async function readEventStream(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const message = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const data = message.split("\n").filter((l) => l.startsWith("data: ")).map((l) => l.slice(6)).join("\n");
+      if (data) onEvent(JSON.parse(data));
+    }
+  }
+}
+
 form.addEventListener("submit", async (e) => {
   e.preventDefault();
-  statusDiv.textContent = "Uploading and running segmentation...";
+  statusDiv.textContent = "Uploading...";
+  meshLink.removeAttribute("href");
+  meshLink.textContent = "";
   const formData = new FormData(form);
 
   try {
-    const res = await fetch(`${API_BASE}/predict`, {
+    const res = await fetch(`${API_BASE}/predict/stream`, {
       method: "POST",
       body: formData
     });
@@ -39,12 +87,7 @@ form.addEventListener("submit", async (e) => {
       return;
     }
 
-    const data = await res.json();
-    statusDiv.textContent = "Segmentation complete. Downloading artifacts...";
-
-    // Fetch overlay PNG if you expose it via API; here we simply point to placeholder.
-    overlayImg.src = "https://dummyimage.com/512x512/111827/ff004c&text=Segmentation+Overlay";
-    statusDiv.textContent = "Done. You can also download 3D mesh and mask from the API.";
+    await readEventStream(res, handleStageEvent);
   } catch (err) {
     console.error(err);
     statusDiv.textContent = "Unexpected error. Check console.";
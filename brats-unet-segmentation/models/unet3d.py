@@ -3,73 +3,127 @@ import torch.nn as nn
 import torch.nn.functional as F
 
 
+"""
+Configurable 3D U-Net.
+
+Variants trade accuracy for CPU cost along four axes:
+- base_filters / depth: width of the first level and number of poolings.
+- conv: "standard" Conv3d or "separable" (depthwise 3x3x3 + pointwise 1x1x1,
+  roughly 1/k^3 of the multiply-adds for wide layers).
+- norm: "batch", "group" or "instance"; group/instance do not depend on the
+  batch size, which matters for batch-1 training and inference.
+- residual: adds a (projected) skip around each conv block.
+
+Named presets live in UNET_VARIANTS and are selected with Config.MODEL_VARIANT
+(plus Config.MODEL_OVERRIDES). Checkpoints store model.spec so they can be
+rebuilt without the config that trained them. Checkpoints saved before the
+network was configurable have no spec and different layer names and shapes;
+they can't be loaded and have to be retrained.
+"""
+
+UNET_VARIANTS = {
+    "baseline": dict(base_filters=32, depth=4, conv="standard", norm="batch", residual=False),
+    "small": dict(base_filters=16, depth=4, conv="standard", norm="instance", residual=False),
+    "lite": dict(base_filters=16, depth=4, conv="separable", norm="group", residual=True),
+    "tiny": dict(base_filters=8, depth=3, conv="separable", norm="instance", residual=True),
+}
+
+
+def unet_spec(variant="baseline", **overrides):
+    """Constructor kwargs of a named variant, with overrides applied."""
+    if variant not in UNET_VARIANTS:
+        raise ValueError(f"Unknown UNet3D variant {variant}. Choose from {list(UNET_VARIANTS)}.")
+    return {**UNET_VARIANTS[variant], **overrides}
+
+
+def checkpoint_spec(ckpt):
+    """Constructor kwargs saved in a checkpoint by train.py / cross_validate.py."""
+    if "model_spec" not in ckpt:
+        raise ValueError("Checkpoint has no model_spec: it predates the configurable UNet3D and its weights "
+                         "don't match the current layers. Retrain it with src/train.py.")
+    return ckpt["model_spec"]
+
+
+def make_norm(norm, channels, norm_groups=8):
+    if norm == "batch":
+        return nn.BatchNorm3d(channels)
+    if norm == "group":
+        groups = next(g for g in range(min(norm_groups, channels), 0, -1) if channels % g == 0)
+        return nn.GroupNorm(groups, channels)
+    if norm == "instance":
+        return nn.InstanceNorm3d(channels, affine=True)
+    raise ValueError(f"Unknown norm {norm}. Choose from batch, group, instance.")
+
+
+def make_conv(conv, in_channels, out_channels):
+    if conv == "standard":
+        return nn.Conv3d(in_channels, out_channels, kernel_size=3, padding=1, bias=False)
+    if conv == "separable":
+        return nn.Sequential(
+            nn.Conv3d(in_channels, in_channels, kernel_size=3, padding=1, groups=in_channels, bias=False),
+            nn.Conv3d(in_channels, out_channels, kernel_size=1, bias=False),
+        )
+    raise ValueError(f"Unknown conv {conv}. Choose from standard, separable.")
+
+
 class DoubleConv(nn.Module):
-    def __init__(self, in_channels, out_channels):
+    def __init__(self, in_channels, out_channels, conv="standard", norm="batch", residual=False, norm_groups=8):
         super().__init__()
         self.block = nn.Sequential(
-            nn.Conv3d(in_channels, out_channels, kernel_size=3, padding=1, bias=False),
-            nn.BatchNorm3d(out_channels),
-            nn.ReLU(inplace=True),
-            nn.Conv3d(out_channels, out_channels, kernel_size=3, padding=1, bias=False),
-            nn.BatchNorm3d(out_channels),
+            make_conv(conv, in_channels, out_channels),
+            make_norm(norm, out_channels, norm_groups),
             nn.ReLU(inplace=True),
+            make_conv(conv, out_channels, out_channels),
+            make_norm(norm, out_channels, norm_groups),
         )
+        self.skip = None
+        if residual:
+            self.skip = nn.Identity() if in_channels == out_channels else nn.Sequential(
+                nn.Conv3d(in_channels, out_channels, kernel_size=1, bias=False),
+                make_norm(norm, out_channels, norm_groups),
+            )
 
     def forward(self, x):
-        return self.block(x)
+        out = self.block(x)
+        if self.skip is not None:
+            out = out + self.skip(x)
+        return F.relu(out, inplace=True)
 
 
 class UNet3D(nn.Module):
-    def __init__(self, in_channels=4, num_classes=1, base_filters=32):
+    def __init__(self, in_channels=4, num_classes=1, base_filters=32, depth=4, conv="standard", norm="batch",
+                 residual=False, norm_groups=8):
         super().__init__()
-
-        self.inc = DoubleConv(in_channels, base_filters)
-
-        self.down1 = nn.Sequential(
-            nn.MaxPool3d(2),
-            DoubleConv(base_filters, base_filters * 2)
+        self.spec = dict(base_filters=base_filters, depth=depth, conv=conv, norm=norm, residual=residual,
+                         norm_groups=norm_groups)
+        block = dict(conv=conv, norm=norm, residual=residual, norm_groups=norm_groups)
+        channels = [base_filters * 2 ** i for i in range(depth + 1)]
+
+        # The input has few channels; a depthwise conv on it saves nothing
+        self.inc = DoubleConv(in_channels, channels[0], **{**block, "conv": "standard"})
+        self.downs = nn.ModuleList(
+            nn.Sequential(nn.MaxPool3d(2), DoubleConv(channels[i], channels[i + 1], **block))
+            for i in range(depth)
         )
-        self.down2 = nn.Sequential(
-            nn.MaxPool3d(2),
-            DoubleConv(base_filters * 2, base_filters * 4)
+        self.ups = nn.ModuleList(
+            nn.ConvTranspose3d(channels[i + 1], channels[i], kernel_size=2, stride=2)
+            for i in reversed(range(depth))
         )
-        self.down3 = nn.Sequential(
-            nn.MaxPool3d(2),
-            DoubleConv(base_filters * 4, base_filters * 8)
+        self.decoders = nn.ModuleList(
+            DoubleConv(channels[i] * 2, channels[i], **block)
+            for i in reversed(range(depth))
         )
-
-        self.bottom = DoubleConv(base_filters * 8, base_filters * 16)
-
-        self.up3 = nn.ConvTranspose3d(base_filters * 16, base_filters * 8, kernel_size=2, stride=2)
-        self.conv3 = DoubleConv(base_filters * 16, base_filters * 8)
-
-        self.up2 = nn.ConvTranspose3d(base_filters * 8, base_filters * 4, kernel_size=2, stride=2)
-        self.conv2 = DoubleConv(base_filters * 8, base_filters * 4)
-
-        self.up1 = nn.ConvTranspose3d(base_filters * 4, base_filters * 2, kernel_size=2, stride=2)
-        self.conv1 = DoubleConv(base_filters * 4, base_filters * 2)
-
-        self.outc = nn.Conv3d(base_filters * 2, num_classes, kernel_size=1)
+        self.outc = nn.Conv3d(channels[0], num_classes, kernel_size=1)
 
     def forward(self, x):
-        x1 = self.inc(x)
-        x2 = self.down1(x1)
-        x3 = self.down2(x2)
-        x4 = self.down3(x3)
-
-        xb = self.bottom(x4)
-
-        xu3 = self.up3(xb)
-        x = torch.cat([xu3, x4], dim=1)
-        x = self.conv3(x)
-
-        xu2 = self.up2(x)
-        x = torch.cat([xu2, x3], dim=1)
-        x = self.conv2(x)
-
-        xu1 = self.up1(x)
-        x = torch.cat([xu1, x2], dim=1)
-        x = self.conv1(x)
+        # Spatial size must be divisible by 2 ** depth
+        skips = [self.inc(x)]
+        for down in self.downs:
+            skips.append(down(skips[-1]))
+
+        x = skips.pop()
+        for up, decoder in zip(self.ups, self.decoders):
+            x = decoder(torch.cat([up(x), skips.pop()], dim=1))
 
         logits = self.outc(x)
         return logits
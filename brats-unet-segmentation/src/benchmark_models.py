@@ -0,0 +1,117 @@
+import os
+import time
+import argparse
+
+import torch
+import torch.nn as nn
+
+from config import Config
+from models.unet3d import UNet3D, UNET_VARIANTS, checkpoint_spec, unet_spec
+from train import eval_epoch
+from utils.dataset import get_train_val_loaders
+from utils.io_utils import load_checkpoint, save_json
+from utils.losses import BCEDiceLoss
+
+
+"""
+Speed/accuracy table of the UNet3D variants (models/unet3d.py):
+
+- FLOPs of one forward pass (2 x multiply-adds of every conv, counted with
+  forward hooks at the benchmark input size).
+- Parameter count.
+- CPU latency: median of --repeats batch-1 forward passes after a warm-up.
+- Validation Dice, if --checkpoint_dir holds <variant>/unet3d_best.pth
+  (e.g. from train.py --model_variant <variant> --checkpoint_dir <dir>/<variant>).
+"""
+
+
+def count_flops(model, x):
+    flops = 0
+
+    def hook(module, inputs, output):
+        nonlocal flops
+        k = module.weight[0].numel()  # (in_channels / groups) * kernel volume
+        if isinstance(module, nn.ConvTranspose3d):
+            # Every input voxel is scattered through the kernel to out_channels / groups outputs
+            flops += 2 * inputs[0].numel() * module.out_channels // module.groups * module.kernel_size[0] ** 3
+        else:
+            flops += 2 * output.numel() * k
+
+    handles = [m.register_forward_hook(hook) for m in model.modules()
+               if isinstance(m, (nn.Conv3d, nn.ConvTranspose3d))]
+    with torch.no_grad():
+        model(x)
+    for h in handles:
+        h.remove()
+    return flops
+
+
+def cpu_latency(model, x, repeats):
+    times = []
+    with torch.no_grad():
+        model(x)  # warm-up
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(x)
+            times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def variant_dice(variant, checkpoint_dir, val_loader, cfg):
+    path = os.path.join(checkpoint_dir, variant, "unet3d_best.pth")
+    if not os.path.exists(path):
+        return None
+    ckpt = load_checkpoint(path, map_location="cpu")
+    model = UNet3D(in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES, **checkpoint_spec(ckpt))
+    model.load_state_dict(ckpt["model_state"])
+    _, dice = eval_epoch(model, val_loader, BCEDiceLoss(), torch.device("cpu"))
+    return dice
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variants", type=str, nargs="+", default=list(UNET_VARIANTS), choices=list(UNET_VARIANTS))
+    parser.add_argument("--input_size", type=int, nargs=3, default=list(Config.PATCH_SIZE))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads, default torch's choice")
+    parser.add_argument("--checkpoint_dir", type=str, default=None)
+    parser.add_argument("--processed_dir", type=str, default=Config.PROCESSED_DIR)
+    parser.add_argument("--out", type=str, default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    cfg = Config()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    val_loader = None
+    if args.checkpoint_dir:
+        _, val_loader = get_train_val_loaders(args.processed_dir, batch_size=1, val_split=cfg.VALIDATION_SPLIT,
+                                              num_workers=0, seed=cfg.RANDOM_SEED)
+
+    x = torch.randn(1, cfg.IN_CHANNELS, *args.input_size)
+    rows = []
+    for variant in args.variants:
+        model = UNet3D(in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES, **unet_spec(variant)).eval()
+        rows.append({
+            "variant": variant,
+            "spec": model.spec,
+            "gflops": count_flops(model, x) / 1e9,
+            "params_m": sum(p.numel() for p in model.parameters()) / 1e6,
+            "cpu_latency_ms": 1000 * cpu_latency(model, x, args.repeats),
+            "val_dice": variant_dice(variant, args.checkpoint_dir, val_loader, cfg) if val_loader else None,
+        })
+
+    print(f"Input {tuple(args.input_size)}, batch 1, {torch.get_num_threads()} threads, median of {args.repeats}")
+    print(f"| {'variant':<10} | {'GFLOPs':>8} | {'params (M)':>10} | {'CPU ms':>9} | {'val Dice':>8} |")
+    print(f"|{'-' * 12}|{'-' * 10}|{'-' * 12}|{'-' * 11}|{'-' * 10}|")
+    for r in rows:
+        dice = f"{r['val_dice']:.4f}" if r["val_dice"] is not None else "-"
+        print(f"| {r['variant']:<10} | {r['gflops']:8.1f} | {r['params_m']:10.2f} | "
+              f"{r['cpu_latency_ms']:9.1f} | {dice:>8} |")
+
+    if args.out:
+        save_json({"input_size": args.input_size, "threads": torch.get_num_threads(), "variants": rows}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import time
+import argparse
+import numpy as np
+
+from utils.regions import REGION_DEFINITIONS, build_region_lut, encode_regions
+
+
+"""
+Microbenchmark: label map -> WT/TC/ET channels.
+
+Compares the previous three-pass float32 construction with the LUT encoder
+writing into a preallocated uint8 buffer, on a synthetic BraTS-sized volume.
+"""
+
+
+def legacy_regions(seg):
+    wt = (seg > 0).astype(np.float32)
+    tc = np.isin(seg, [1, 4]).astype(np.float32)
+    et = (seg == 4).astype(np.float32)
+    return np.stack([wt, tc, et], axis=0)
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", type=int, nargs=3, default=[155, 240, 240])
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    seg = rng.choice(np.array([0, 1, 2, 4], dtype=np.uint8), size=args.shape, p=[0.9, 0.03, 0.04, 0.03])
+
+    lut = build_region_lut(REGION_DEFINITIONS["brats2021"])
+    out = np.empty((lut.shape[0],) + seg.shape, dtype=np.uint8)
+    assert np.array_equal(encode_regions(seg, lut, out=out), legacy_regions(seg).astype(np.uint8))
+
+    t_legacy = best_of(lambda: legacy_regions(seg), args.repeats)
+    t_lut = best_of(lambda: encode_regions(seg, lut, out=out), args.repeats)
+    print(f"Volume {tuple(args.shape)}, best of {args.repeats}")
+    print(f"three-pass float32: {1000 * t_legacy:8.1f} ms  ({legacy_regions(seg).nbytes / 1024 ** 2:.0f} MB output)")
+    print(f"LUT uint8:          {1000 * t_lut:8.1f} ms  ({out.nbytes / 1024 ** 2:.0f} MB output)")
+    print(f"speed-up:           {t_legacy / t_lut:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,9 @@ class Config:
     TARGET_SPACING = (1.0, 1.0, 1.0)  # mm
     PATCH_SIZE = (128, 128, 128)
     INTENSITY_CLIP = (-1000, 4000)
+    REGION_SET = "brats2021"  # label -> WT/TC/ET mapping, see utils/regions.py
+    STORAGE_IMAGE_DTYPE = "float16"  # float32, float16 or int16 (per-channel scaled)
+    STORAGE_MASK = "packbits"        # float32, uint8 or packbits
 
     # Training
     NUM_EPOCHS = 150
@@ -21,8 +24,30 @@ class Config:
     WEIGHT_DECAY = 1e-5
     VALIDATION_SPLIT = 0.2
     RANDOM_SEED = 42
+    USE_CASE_CACHE = False                 # decode each case once into shared memory
+    CASE_CACHE_DIR = "/dev/shm/brats_cache"
+    CASE_CACHE_MAX_GB = 16
+    NUM_FOLDS = 5
+    FOLD_MANIFEST = os.path.join(RESULTS_DIR, "folds", "manifest.json")
     NUM_CLASSES = 4  # e.g., WT, TC, ET; adapt as needed
     IN_CHANNELS = 4  # BraTS modalities: T1, T1ce, T2, FLAIR
+    MODEL_VARIANT = "baseline"  # baseline, small, lite or tiny, see models/unet3d.py
+    MODEL_OVERRIDES = {}        # e.g. {"base_filters": 24, "norm": "group"}
+
+    # Inference
+    TTA_VARIANTS = 1    # flip test-time augmentation variants, 1 = off, up to 8
+    TTA_BATCH_SIZE = 8  # variants per forward pass; lower to save GPU memory
+    ENSEMBLE_STRATEGY = "mean"  # mean, weighted, vote or max over fold checkpoints
+    ENSEMBLE_WORKERS = 2        # models run concurrently; bounds peak activation memory
+
+    # API
+    API_WORKERS = 2                # inference worker processes
+    API_THREADS_PER_WORKER = None  # torch threads per worker, None = torch default
+    API_MAX_CONCURRENCY = 2        # cases in the pool at once; others wait
+    API_COARSE_MESH_FACTOR = 2     # stride of the preview mesh streamed before the full one
+    RESULT_TTL_S = 3600            # lifetime of each job's artifacts
+    RESULT_MAX_GB = 5              # oldest jobs are swept first above this
+    RESULT_SWEEP_INTERVAL_S = 60
 
     # Hardware
     DEVICE = "cuda"
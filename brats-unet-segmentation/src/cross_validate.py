@@ -0,0 +1,172 @@
+import os
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+"""
+K-fold cross-validation:
+
+- Writes a deterministic fold manifest stratified by tumour volume once
+  (Config.FOLD_MANIFEST) and reuses it on later runs.
+- Trains folds in parallel worker processes. Each process gets its own
+  CPU-thread budget (torch + OpenMP/MKL/OpenBLAS) so P folds share a
+  many-core node instead of oversubscribing it; GPUs, if present, are
+  assigned round-robin. The OpenMP/BLAS limits are environment variables
+  read once when numpy/torch load, so they are set before the pool starts
+  and each spawned interpreter inherits them.
+- Each fold saves CHECKPOINT_DIR/fold_<k>/unet3d_best.pth and its metrics;
+  all folds are collected into one cv_report.json.
+"""
+
+
+def train_fold(fold, manifest_path, processed_dir, out_dir, epochs, batch_size, lr,
+               threads, loader_workers, use_amp, cache_dir=None, cache_max_gb=16):
+    # OMP/MKL/OPENBLAS_NUM_THREADS come from the parent's environment (see main)
+    import torch
+    import torch.optim as optim
+    from torch.cuda.amp import GradScaler
+
+    from config import Config
+    from models.unet3d import UNet3D, unet_spec
+    from train import train_epoch, eval_epoch
+    from utils.case_cache import SharedCaseCache
+    from utils.dataset import get_fold_loaders
+    from utils.io_utils import ensure_dir, save_checkpoint, save_json, load_json
+    from utils.losses import BCEDiceLoss
+
+    torch.set_num_threads(threads)
+    cfg = Config()
+    torch.manual_seed(cfg.RANDOM_SEED + fold)
+
+    if torch.cuda.is_available():
+        device = torch.device(f"cuda:{fold % torch.cuda.device_count()}")
+    else:
+        device = torch.device("cpu")
+
+    fold_dir = os.path.join(out_dir, f"fold_{fold}")
+    ensure_dir(fold_dir)
+
+    manifest = load_json(manifest_path)
+    # Every fold process shares the same cache directory, so a case decoded by one fold serves all others
+    cache = SharedCaseCache(cache_dir, cache_max_gb * 1024 ** 3) if cache_dir else None
+    train_loader, val_loader = get_fold_loaders(manifest, fold, processed_dir, batch_size, loader_workers, cache=cache)
+
+    model = UNet3D(in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES,
+                   **unet_spec(cfg.MODEL_VARIANT, **cfg.MODEL_OVERRIDES)).to(device)
+    optimizer = optim.AdamW(model.parameters(), lr=lr, weight_decay=cfg.WEIGHT_DECAY)
+    criterion = BCEDiceLoss()
+    scaler = GradScaler() if use_amp and device.type == "cuda" else None
+
+    start = time.time()
+    best_val_dice, best_epoch = 0.0, 0
+    history = []
+    for epoch in range(1, epochs + 1):
+        train_loss, train_dice = train_epoch(model, train_loader, optimizer, criterion, device, scaler)
+        val_loss, val_dice = eval_epoch(model, val_loader, criterion, device)
+        history.append({"epoch": epoch, "train_loss": train_loss, "train_dice": train_dice,
+                        "val_loss": val_loss, "val_dice": val_dice})
+        if cache is not None:
+            history[-1]["cache_hit_rate"] = cache.epoch_stats()["hit_rate"]
+
+        if val_dice > best_val_dice:
+            best_val_dice, best_epoch = val_dice, epoch
+            save_checkpoint(
+                {
+                    "epoch": epoch,
+                    "fold": fold,
+                    "model_state": model.state_dict(),
+                    "model_spec": model.spec,
+                    "optimizer_state": optimizer.state_dict(),
+                    "val_dice": val_dice,
+                },
+                os.path.join(fold_dir, "unet3d_best.pth"),
+            )
+
+    metrics = {
+        "fold": fold,
+        "device": str(device),
+        "threads": threads,
+        "n_train": len(train_loader.dataset),
+        "n_val": len(val_loader.dataset),
+        "best_val_dice": best_val_dice,
+        "best_epoch": best_epoch,
+        "train_time_s": time.time() - start,
+        "history": history,
+    }
+    save_json(metrics, os.path.join(fold_dir, "metrics.json"))
+    return metrics
+
+
+def main():
+    from config import Config
+    from utils.dataset import load_or_create_fold_manifest
+    from utils.io_utils import ensure_dir, save_json
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folds", type=int, default=Config.NUM_FOLDS)
+    parser.add_argument("--only", type=int, nargs="+", default=None, help="Train only these fold indices")
+    parser.add_argument("--parallel", type=int, default=None, help="Folds trained at the same time")
+    parser.add_argument("--threads_per_fold", type=int, default=None)
+    parser.add_argument("--loader_workers", type=int, default=None)
+    parser.add_argument("--epochs", type=int, default=Config.NUM_EPOCHS)
+    parser.add_argument("--batch_size", type=int, default=Config.BATCH_SIZE)
+    parser.add_argument("--lr", type=float, default=Config.LR)
+    parser.add_argument("--manifest", type=str, default=Config.FOLD_MANIFEST)
+    parser.add_argument("--processed_dir", type=str, default=Config.PROCESSED_DIR)
+    parser.add_argument("--out_dir", type=str, default=Config.CHECKPOINT_DIR)
+    parser.add_argument("--use_amp", action="store_true")
+    parser.add_argument("--cache", action="store_true", default=Config.USE_CASE_CACHE)
+    parser.add_argument("--cache_dir", type=str, default=Config.CASE_CACHE_DIR)
+    parser.add_argument("--cache_max_gb", type=float, default=Config.CASE_CACHE_MAX_GB)
+    args = parser.parse_args()
+
+    ensure_dir(args.out_dir)
+    manifest = load_or_create_fold_manifest(args.processed_dir, args.manifest, args.folds, Config.RANDOM_SEED)
+    folds = args.only if args.only is not None else list(range(args.folds))
+
+    cpus = os.cpu_count() or 1
+    parallel = args.parallel or max(1, min(len(folds), cpus // 4))
+    threads = args.threads_per_fold or max(1, cpus // parallel)
+    # DataLoader workers come out of the same budget as the compute threads
+    loader_workers = args.loader_workers if args.loader_workers is not None else min(Config.NUM_WORKERS, threads // 2)
+    print(f"Training folds {folds}: {parallel} at a time, {threads} threads and {loader_workers} loader workers each")
+
+    # Spawned fold interpreters copy this environment at start-up, before they import anything
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    results = []
+    ctx = mp.get_context("spawn")  # fresh interpreter per fold, no inherited torch thread pools
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=ctx) as pool:
+        futures = {
+            pool.submit(train_fold, k, args.manifest, args.processed_dir, args.out_dir, args.epochs,
+                        args.batch_size, args.lr, threads, loader_workers, args.use_amp,
+                        args.cache_dir if args.cache else None, args.cache_max_gb): k
+            for k in folds
+        }
+        for fut in as_completed(futures):
+            metrics = fut.result()
+            results.append(metrics)
+            print(f"Fold {metrics['fold']}: best val Dice {metrics['best_val_dice']:.4f} "
+                  f"(epoch {metrics['best_epoch']}, {metrics['train_time_s']:.0f}s)")
+
+    results.sort(key=lambda m: m["fold"])
+    dices = [m["best_val_dice"] for m in results]
+    report = {
+        "n_folds": manifest["n_folds"],
+        "seed": manifest["seed"],
+        "manifest": args.manifest,
+        "mean_val_dice": float(np.mean(dices)),
+        "std_val_dice": float(np.std(dices)),
+        "folds": [{k: v for k, v in m.items() if k != "history"} for m in results],
+    }
+    report_path = os.path.join(args.out_dir, "cv_report.json")
+    save_json(report, report_path)
+    print(f"Mean val Dice {report['mean_val_dice']:.4f} ± {report['std_val_dice']:.4f}. Report: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
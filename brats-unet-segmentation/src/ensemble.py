@@ -0,0 +1,168 @@
+import os
+import glob
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from config import Config
+from inference import load_model, find_modality_paths, preprocess_single_case
+from utils.io_utils import ensure_dir, save_json
+from utils.mask_io import MASK_FORMATS, mask_filename, save_mask, export_mask_native_nii
+
+
+"""
+Multi-checkpoint (e.g. cross-validation fold) ensemble inference.
+
+- Loads every checkpoint once and keeps the models resident.
+- Preprocesses the case once; all models read the same input tensor.
+- Runs up to `max_workers` models at a time in threads (PyTorch releases
+  the GIL inside ops) and folds each output into one running accumulator,
+  so at most `max_workers` probability maps exist at any moment.
+- Records per-model forward times.
+"""
+
+ENSEMBLE_STRATEGIES = ("mean", "weighted", "vote", "max")
+
+
+class EnsembleRunner:
+    def __init__(self, checkpoint_paths, device, in_channels, num_classes,
+                 strategy="mean", weights=None, max_workers=2, threshold=0.5):
+        if strategy not in ENSEMBLE_STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'. Choose from {ENSEMBLE_STRATEGIES}.")
+        if strategy == "weighted":
+            if weights is None or len(weights) != len(checkpoint_paths):
+                raise ValueError(f"The weighted strategy needs one weight per checkpoint: got "
+                                 f"{0 if weights is None else len(weights)} weights for {len(checkpoint_paths)} "
+                                 f"checkpoints.")
+        elif weights is not None:
+            raise ValueError(f"Weights only apply to the weighted strategy, not '{strategy}'.")
+
+        self.device = device
+        self.strategy = strategy
+        self.threshold = threshold
+        self.max_workers = max(1, max_workers)
+        self.names = [os.path.basename(p) for p in checkpoint_paths]
+        self.weights = list(weights) if weights is not None else [1.0] * len(checkpoint_paths)
+        self.models = [load_model(p, device, in_channels, num_classes) for p in checkpoint_paths]
+        self.timings = {name: [] for name in self.names}
+
+    def _contribution(self, i, probs):
+        if self.strategy == "weighted":
+            return probs * self.weights[i]
+        if self.strategy == "vote":
+            return (probs > self.threshold).float()
+        return probs
+
+    def predict_proba(self, image_vol):
+        """Returns the ensembled (C, D, H, W) probability (or vote fraction) map."""
+        x = torch.from_numpy(image_vol[None]).float().to(self.device)
+        lock = threading.Lock()
+        state = {"acc": None}
+
+        def run(i):
+            start = time.perf_counter()
+            with torch.no_grad():
+                contrib = self._contribution(i, torch.sigmoid(self.models[i](x)))
+            if self.device.type == "cuda":
+                torch.cuda.synchronize(self.device)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if state["acc"] is None:
+                    state["acc"] = contrib
+                elif self.strategy == "max":
+                    torch.maximum(state["acc"], contrib, out=state["acc"])
+                else:
+                    state["acc"] += contrib
+                self.timings[self.names[i]].append(elapsed)
+
+        if self.max_workers == 1:
+            for i in range(len(self.models)):
+                run(i)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(run, range(len(self.models))))
+
+        acc = state["acc"]
+        if self.strategy == "weighted":
+            acc = acc / sum(self.weights)
+        elif self.strategy in ("mean", "vote"):
+            acc = acc / len(self.models)
+        return acc.cpu().numpy()[0]
+
+    def predict(self, image_vol):
+        # Majority vote keeps voxels chosen by more than half of the models
+        cutoff = 0.5 if self.strategy == "vote" else self.threshold
+        return (self.predict_proba(image_vol) > cutoff).astype(np.float32)
+
+    def timing_summary(self):
+        return {
+            name: {"runs": len(t), "mean_s": float(np.mean(t)) if t else None, "last_s": t[-1] if t else None}
+            for name, t in self.timings.items()
+        }
+
+
+def expand_checkpoints(patterns):
+    """
+    Checkpoint files for the given paths/glob patterns, in command-line order
+    (sorted only within one pattern), so --weights line up with --checkpoints.
+    """
+    checkpoints = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise ValueError(f"No checkpoints matched '{pattern}'.")
+        checkpoints.extend(matches)
+    return checkpoints
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--case_dir", type=str, required=True)
+    parser.add_argument("--checkpoints", type=str, nargs="+", required=True,
+                        help="Checkpoint files or glob patterns, e.g. results/checkpoints/fold*/unet3d_best.pth")
+    parser.add_argument("--strategy", type=str, default=Config.ENSEMBLE_STRATEGY, choices=ENSEMBLE_STRATEGIES)
+    parser.add_argument("--weights", type=float, nargs="+", default=None,
+                        help="One weight per checkpoint, in --checkpoints order (weighted strategy only)")
+    parser.add_argument("--workers", type=int, default=Config.ENSEMBLE_WORKERS)
+    parser.add_argument("--out_dir", type=str, default=os.path.join(Config.RESULTS_DIR, "ensemble"))
+    parser.add_argument("--mask_format", type=str, default="packbits", choices=MASK_FORMATS)
+    args = parser.parse_args()
+
+    if args.weights is not None and args.strategy != "weighted":
+        parser.error(f"--weights only applies to --strategy weighted, not {args.strategy}")
+    try:
+        checkpoints = expand_checkpoints(args.checkpoints)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.weights is not None and len(args.weights) != len(checkpoints):
+        parser.error(f"--weights has {len(args.weights)} values for {len(checkpoints)} checkpoints: {checkpoints}")
+
+    cfg = Config()
+    device = torch.device(cfg.DEVICE if torch.cuda.is_available() else "cpu")
+    ensure_dir(args.out_dir)
+
+    image_vol, geometry = preprocess_single_case(find_modality_paths(args.case_dir), cfg=cfg)
+
+    runner = EnsembleRunner(checkpoints, device, cfg.IN_CHANNELS, cfg.NUM_CLASSES,
+                            strategy=args.strategy, weights=args.weights, max_workers=args.workers)
+    start = time.perf_counter()
+    pred_mask = runner.predict(image_vol)
+    total = time.perf_counter() - start
+
+    case_id = os.path.basename(args.case_dir.rstrip("/"))
+    mask_path = os.path.join(args.out_dir, mask_filename(f"{case_id}_mask", args.mask_format))
+    save_mask(mask_path, pred_mask, fmt=args.mask_format, spacing=cfg.TARGET_SPACING)
+    export_mask_native_nii(pred_mask, geometry, os.path.join(args.out_dir, f"{case_id}_mask.nii.gz"))
+
+    save_json({"checkpoints": checkpoints, "strategy": args.strategy, "weights": runner.weights, "total_s": total,
+               "models": runner.timing_summary()},
+              os.path.join(args.out_dir, f"{case_id}_timings.json"))
+    print(f"Ensembled {len(checkpoints)} models in {total:.2f}s, saved mask to {mask_path}")
+
+
+if __name__ == "__main__":
+    main()
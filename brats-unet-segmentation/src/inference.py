@@ -4,34 +4,34 @@ import numpy as np
 import torch
 
 from config import Config
-from models.unet3d import UNet3D
-from utils.transforms import load_nii, resample_volume, normalize_intensity, center_crop_or_pad
-from utils.visualization import save_overlay_grid
+from models.unet3d import UNet3D, checkpoint_spec
+from utils.case_loader import find_case_files, load_case
+from utils.visualization import save_overlay_mosaic
 from utils.io_utils import ensure_dir, load_checkpoint
+from utils.tta import flip_tta
+from utils.mask_io import MASK_FORMATS, mask_filename, save_mask, export_mask_native_nii
 
 
 def load_model(checkpoint_path, device, in_channels, num_classes):
-    model = UNet3D(in_channels=in_channels, num_classes=num_classes)
     ckpt = load_checkpoint(checkpoint_path, map_location=device)
+    model = UNet3D(in_channels=in_channels, num_classes=num_classes, **checkpoint_spec(ckpt))
     model.load_state_dict(ckpt["model_state"])
     model.to(device)
     model.eval()
     return model
 
 
-def preprocess_single_case(modality_paths, seg_spacing=None, cfg: Config = Config()):
-    images = []
-    spacing_ref = None
-    for p in modality_paths:
-        vol, spacing = load_nii(p)
-        spacing_ref = spacing if spacing_ref is None else spacing_ref
-        vol = resample_volume(vol, spacing, cfg.TARGET_SPACING)
-        vol = normalize_intensity(vol, cfg.INTENSITY_CLIP)
-        images.append(vol)
+def find_modality_paths(case_dir):
+    return find_case_files(case_dir)[0]
+
 
-    image_vol = np.stack(images, axis=0)
-    image_vol = center_crop_or_pad(image_vol, cfg.PATCH_SIZE)
-    return image_vol, spacing_ref
+def preprocess_single_case(modality_paths, seg_spacing=None, cfg: Config = Config()):
+    """
+    Returns the model input (C, *PATCH_SIZE) and the geometry of the first
+    modality, which utils.transforms.invert_to_native uses to map predictions back.
+    """
+    image_vol, geometry, _ = load_case(modality_paths, cfg)
+    return image_vol, geometry
 
 
 def run_inference(model, image_vol, device, threshold=0.5):
@@ -43,40 +43,55 @@ def run_inference(model, image_vol, device, threshold=0.5):
     return preds.cpu().numpy()[0]  # (C, D, H, W)
 
 
+def run_inference_tta(model, image_vol, device, n_variants=8, batch_size=None, threshold=0.5):
+    """
+    Flip test-time augmentation: averages the un-flipped logits of up to 8
+    variants on device. Returns (preds, uncertainty), both (C, D, H, W).
+    """
+    x = torch.from_numpy(image_vol[None]).float().to(device)
+    logits, prob_std = flip_tta(model, x, n_variants=n_variants, batch_size=batch_size)
+    preds = (torch.sigmoid(logits) > threshold).float()
+    return preds.cpu().numpy()[0], prob_std.cpu().numpy()[0]
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--case_dir", type=str, required=True)
     parser.add_argument("--checkpoint", type=str, required=True)
     parser.add_argument("--out_dir", type=str, default=os.path.join(Config.RESULTS_DIR, "inference"))
+    parser.add_argument("--mask_format", type=str, default="packbits", choices=MASK_FORMATS)
+    parser.add_argument("--tta", type=int, default=Config.TTA_VARIANTS, help="Flip TTA variants (1 = off, max 8)")
+    parser.add_argument("--tta_batch_size", type=int, default=Config.TTA_BATCH_SIZE)
     args = parser.parse_args()
 
     cfg = Config()
     device = torch.device(cfg.DEVICE if torch.cuda.is_available() else "cpu")
     ensure_dir(args.out_dir)
 
-    import glob
-    modalities = ["t1", "t1ce", "t2", "flair"]
-    modality_paths = []
-    for m in modalities:
-        p = glob.glob(os.path.join(args.case_dir, f"*_{m}.nii*"))
-        assert len(p) == 1, f"Missing modality {m}"
-        modality_paths.append(p[0])
-
-    image_vol, spacing_ref = preprocess_single_case(modality_paths, cfg=cfg)
+    modality_paths = find_modality_paths(args.case_dir)
+    image_vol, geometry = preprocess_single_case(modality_paths, cfg=cfg)
 
     model = load_model(args.checkpoint, device, in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES)
-    pred_mask = run_inference(model, image_vol, device)
-
-    # For visualization, use first channel as whole tumor
-    wt_pred = pred_mask[0]
-    d, h, w = wt_pred.shape
     case_id = os.path.basename(args.case_dir.rstrip("/"))
+    if args.tta > 1:
+        pred_mask, uncertainty = run_inference_tta(model, image_vol, device, n_variants=args.tta,
+                                                   batch_size=args.tta_batch_size)
+        np.save(os.path.join(args.out_dir, f"{case_id}_uncertainty.npy"), uncertainty.astype(np.float16))
+    else:
+        pred_mask = run_inference(model, image_vol, device)
+
+    # WT/TC/ET channels are drawn in separate colours over one modality
     overlay_path = os.path.join(args.out_dir, f"{case_id}_overlay.png")
-    save_overlay_grid(image_vol[0], wt_pred, overlay_path)  # use one modality as background
+    save_overlay_mosaic(image_vol[0], pred_mask, overlay_path)
+
+    # Save mask (bit-packed by default, 'npy' keeps the legacy float32 array)
+    mask_path = os.path.join(args.out_dir, mask_filename(f"{case_id}_mask", args.mask_format))
+    save_mask(mask_path, pred_mask, fmt=args.mask_format, spacing=cfg.TARGET_SPACING)
 
-    # Save raw mask
-    np.save(os.path.join(args.out_dir, f"{case_id}_mask.npy"), pred_mask)
-    print(f"Saved overlay to {overlay_path} and mask .npy to {args.out_dir}")
+    # Same mask on the original scan grid, for viewers and downstream tools
+    native_path = os.path.join(args.out_dir, f"{case_id}_mask.nii.gz")
+    export_mask_native_nii(pred_mask, geometry, native_path)
+    print(f"Saved overlay to {overlay_path}, mask to {mask_path} and native-space NIfTI to {native_path}")
 
 
 if __name__ == "__main__":
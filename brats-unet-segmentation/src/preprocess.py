@@ -5,8 +5,11 @@ import numpy as np
 from tqdm import tqdm
 
 from config import Config
-from utils.transforms import load_nii, resample_volume, normalize_intensity, center_crop_or_pad
+from utils.transforms import center_crop_or_pad
+from utils.case_loader import find_case_files, load_case
+from utils.regions import REGION_DEFINITIONS, build_region_lut, encode_regions
 from utils.io_utils import ensure_dir
+from utils.case_storage import IMAGE_DTYPES, MASK_STORAGE, encode_case
 
 
 """
@@ -14,11 +17,12 @@ Preprocessing pipeline:
 
 - Expects BraTS-like directory with cases, each containing:
   *_t1.nii.gz, *_t1ce.nii.gz, *_t2.nii.gz, *_flair.nii.gz, *_seg.nii.gz
-- Loads modalities and segmentation.
+- Loads modalities and segmentation concurrently (utils/case_loader).
 - Resamples to target spacing.
 - Normalizes each modality independently.
 - Stacks into (C, D, H, W) and center-crops/pads.
-- Saves .npz to data/processed.
+- Saves compact .npz to data/processed (float16/int16 images, bit-packed
+  masks by default; see utils/case_storage).
 BraTS data reference.[web:5][web:18]
 """
 
@@ -29,35 +33,16 @@ def find_cases(raw_dir):
 
 
 def process_case(case_dir, cfg: Config):
-    modalities = ["t1", "t1ce", "t2", "flair"]
-    images = []
-    spacing_ref = None
-
-    for m in modalities:
-        path = glob.glob(os.path.join(case_dir, f"*_{m}.nii*"))
-        assert len(path) == 1, f"Missing modality {m} in {case_dir}"
-        vol, spacing = load_nii(path[0])
-        spacing_ref = spacing if spacing_ref is None else spacing_ref
-        vol = resample_volume(vol, spacing, cfg.TARGET_SPACING)
-        vol = normalize_intensity(vol, cfg.INTENSITY_CLIP)
-        images.append(vol)
-
-    image_vol = np.stack(images, axis=0)  # (C, D, H, W)
-
-    seg_path = glob.glob(os.path.join(case_dir, "*_seg.nii*"))
-    assert len(seg_path) == 1, f"Missing seg in {case_dir}"
-    seg, seg_spacing = load_nii(seg_path[0])
-    seg = resample_volume(seg, seg_spacing, cfg.TARGET_SPACING)
+    modality_paths, seg_path = find_case_files(case_dir, with_seg=True)
+    image_vol, _, seg = load_case(modality_paths, cfg, seg_path=seg_path)  # image_vol is already cropped
 
     # Convert multi-class labels to multi-channel binary (WT, TC, ET example)
-    # BraTS uses labels {0, 1, 2, 4}[web:7][web:12]
-    wt = (seg > 0).astype(np.float32)
-    tc = np.isin(seg, [1, 4]).astype(np.float32)
-    et = (seg == 4).astype(np.float32)
-    mask_vol = np.stack([wt, tc, et], axis=0)
-
-    image_vol = center_crop_or_pad(image_vol, cfg.PATCH_SIZE)
-    mask_vol = center_crop_or_pad(mask_vol, cfg.PATCH_SIZE)
+    # BraTS uses labels {0, 1, 2, 4}[web:7][web:12]; BraTS 2023 uses 3 for ET.
+    # Crop the single-channel label map first, then fill all region channels in one LUT pass.
+    regions = REGION_DEFINITIONS[cfg.REGION_SET]
+    seg = center_crop_or_pad(seg[None], cfg.PATCH_SIZE)[0]
+    mask_vol = np.empty((len(regions),) + seg.shape, dtype=np.uint8)
+    encode_regions(seg, build_region_lut(regions), out=mask_vol)
 
     return image_vol, mask_vol
 
@@ -66,6 +51,8 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--raw_dir", type=str, default=Config.RAW_DIR)
     parser.add_argument("--out_dir", type=str, default=Config.PROCESSED_DIR)
+    parser.add_argument("--image_dtype", type=str, default=Config.STORAGE_IMAGE_DTYPE, choices=IMAGE_DTYPES)
+    parser.add_argument("--mask_storage", type=str, default=Config.STORAGE_MASK, choices=MASK_STORAGE)
     args = parser.parse_args()
 
     ensure_dir(args.out_dir)
@@ -77,7 +64,7 @@ def main():
         case_id = os.path.basename(case_dir)
         img, msk = process_case(case_dir, cfg)
         out_path = os.path.join(args.out_dir, f"{case_id}.npz")
-        np.savez_compressed(out_path, image=img, mask=msk)
+        np.savez_compressed(out_path, **encode_case(img, msk, args.image_dtype, args.mask_storage))
 
     print(f"Saved processed cases to {args.out_dir}")
 
@@ -1,27 +1,142 @@
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from skimage import measure
 from tqdm import tqdm
 
+from utils.mask_io import load_mask
+
 
 """
 3D reconstruction:
 
-- Loads prediction mask .npy (C, D, H, W).
+- Loads prediction mask .npy/.npz (C, D, H, W), see utils/mask_io.
 - Selects whole tumor channel (0).
 - Uses marching cubes to extract surface mesh.[web:11][web:14]
+  mask_to_mesh_chunked / IncrementalMesher split the volume into blocks that
+  overlap by one voxel, mesh them in threads and weld the shared vertices.
 - Saves as .obj and .stl.
 """
 
 
+def _mesh_input(mask):
+    # marching_cubes converts to float32 itself; avoid an extra float64 copy
+    return mask.view(np.uint8) if mask.dtype == bool else mask
+
+
 def mask_to_mesh(mask, level=0.5):
     verts, faces, normals, values = measure.marching_cubes(
-        mask.astype(float), level=level, spacing=(1.0, 1.0, 1.0)
+        _mesh_input(mask), level=level, spacing=(1.0, 1.0, 1.0)
     )
     return verts, faces
 
 
+def _blocks_per_axis(shape, block_size):
+    return [max(1, -(-(n - 1) // block_size)) for n in shape]
+
+
+def _block_indices(shape, block_size):
+    # Block k covers voxels [k * block_size, (k + 1) * block_size] (one voxel
+    # overlap), so every marching-cubes cell belongs to exactly one block.
+    return list(np.ndindex(*_blocks_per_axis(shape, block_size)))
+
+
+def _block_slices(index, shape, block_size):
+    return tuple(slice(i * block_size, min((i + 1) * block_size + 1, n)) for i, n in zip(index, shape))
+
+
+def _mesh_block(mask, slices, level):
+    block = _mesh_input(mask[slices])
+    if min(block.shape) < 2:
+        return None
+    lo, hi = block.min(), block.max()
+    if lo == hi or not lo <= level <= hi:
+        return None  # uniform block, no surface
+    verts, faces, _, _ = measure.marching_cubes(block, level=level)
+    verts += np.array([s.start for s in slices], dtype=verts.dtype)
+    return verts, faces
+
+
+def stitch_meshes(pieces):
+    """Concatenate block meshes and weld the duplicated vertices on shared block faces."""
+    pieces = [p for p in pieces if p is not None]
+    if not pieces:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.int64)
+    offsets = np.cumsum([0] + [len(v) for v, _ in pieces[:-1]])
+    verts = np.concatenate([v for v, _ in pieces])
+    faces = np.concatenate([f + o for (_, f), o in zip(pieces, offsets)])
+    verts, inverse = np.unique(verts, axis=0, return_inverse=True)
+    return verts, inverse.reshape(-1)[faces]
+
+
+def mask_to_mesh_chunked(mask, level=0.5, block_size=32, max_workers=None):
+    """
+    Block-parallel marching cubes over a bool/uint8 (or float) mask.
+    Uniform blocks are skipped, so cost scales with the tumour surface.
+    """
+    shape = mask.shape
+    jobs = [_block_slices(i, shape, block_size) for i in _block_indices(shape, block_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pieces = list(pool.map(lambda sl: _mesh_block(mask, sl, level), jobs))
+    return stitch_meshes(pieces)
+
+
+class IncrementalMesher:
+    """
+    Keeps per-block meshes for a volume that is filled in over time (e.g.
+    patch-wise inference) and re-meshes only blocks whose voxels changed.
+
+        mesher = IncrementalMesher(mask.shape)
+        mesher.update_patch(patch_pred, origin=(z, y, x))
+        verts, faces = mesher.mesh()
+    """
+
+    def __init__(self, shape, level=0.5, block_size=32, max_workers=None, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.level = level
+        self.block_size = block_size
+        self.max_workers = max_workers
+        self.mask = np.zeros(self.shape, dtype=dtype)
+        self.blocks = {i: None for i in _block_indices(self.shape, block_size)}
+        self._dirty = set()
+
+    def _blocks_touching(self, region):
+        # Block k holds voxels [k*B, (k+1)*B], so voxel v lies in blocks ceil(v/B - 1) .. floor(v/B)
+        b = self.block_size
+        ranges = []
+        for sl, n, nb in zip(region, self.shape, _blocks_per_axis(self.shape, b)):
+            start, stop, _ = sl.indices(n)
+            ranges.append(range(max(0, -(-(start - b) // b)), min(nb - 1, (stop - 1) // b) + 1))
+        return {tuple(r[i] for r, i in zip(ranges, idx)) for idx in np.ndindex(*[len(r) for r in ranges])}
+
+    def update_patch(self, patch, origin):
+        """Write a (D, H, W) patch at origin and mark the affected blocks dirty."""
+        region = tuple(slice(o, o + n) for o, n in zip(origin, patch.shape))
+        if np.array_equal(self.mask[region], patch):
+            return
+        self.mask[region] = patch
+        self._dirty |= self._blocks_touching(region)
+
+    def update(self, mask):
+        """Replace the whole volume; only blocks that differ are re-meshed."""
+        for index in self.blocks:
+            sl = _block_slices(index, self.shape, self.block_size)
+            if not np.array_equal(self.mask[sl], mask[sl]):
+                self._dirty.add(index)
+        self.mask[...] = mask
+
+    def mesh(self):
+        dirty = sorted(self._dirty)
+        jobs = [_block_slices(i, self.shape, self.block_size) for i in dirty]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for index, piece in zip(dirty, pool.map(lambda sl: _mesh_block(self.mask, sl, self.level), jobs)):
+                self.blocks[index] = piece
+        self._dirty.clear()
+        return stitch_meshes(list(self.blocks.values()))
+
+
 def save_as_obj(verts, faces, path):
     with open(path, "w") as f:
         for v in verts:
@@ -47,15 +162,15 @@ def save_as_stl(verts, faces, path):
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mask_path", type=str, required=True, help="Predicted mask .npy")
+    parser.add_argument("--mask_path", type=str, required=True, help="Predicted mask .npy or compact .npz")
     parser.add_argument("--out_dir", type=str, required=True)
     args = parser.parse_args()
 
     os.makedirs(args.out_dir, exist_ok=True)
-    mask = np.load(args.mask_path)  # (C, D, H, W)
-    wt_mask = mask[0] > 0.5
+    mask = load_mask(args.mask_path)  # (C, D, H, W), unpacked per channel
+    wt_mask = mask[0]
 
-    verts, faces = mask_to_mesh(wt_mask)
+    verts, faces = mask_to_mesh_chunked(wt_mask)
     base = os.path.splitext(os.path.basename(args.mask_path))[0]
 
     obj_path = os.path.join(args.out_dir, f"{base}.obj")
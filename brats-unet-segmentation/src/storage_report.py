@@ -0,0 +1,115 @@
+import os
+import glob
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+
+from config import Config
+from inference import load_model
+from utils.case_storage import encode_case, decode_case
+from utils.metrics import dice_score
+from utils.io_utils import ensure_dir, save_json
+
+
+"""
+Storage report for processed cases:
+
+- Re-encodes processed cases with each storage scheme (utils/case_storage).
+- Reports disk size, load + dequantize time, and image reconstruction error.
+- With --checkpoint, also runs the model on original vs. decoded images and
+  reports the Dice change against the ground-truth masks.
+"""
+
+SCHEMES = [
+    ("float32", "float32"),
+    ("float16", "uint8"),
+    ("float16", "packbits"),
+    ("int16", "packbits"),
+]
+
+
+def load_as_training_dtype(path):
+    image, mask = decode_case(np.load(path))
+    return image.astype(np.float32), mask.astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processed_dir", type=str, default=Config.PROCESSED_DIR)
+    parser.add_argument("--max_cases", type=int, default=10)
+    parser.add_argument("--checkpoint", type=str, default=None, help="Also report Dice change per scheme")
+    parser.add_argument("--out", type=str, default=os.path.join(Config.RESULTS_DIR, "storage_report.json"))
+    args = parser.parse_args()
+
+    cfg = Config()
+    device = torch.device(cfg.DEVICE if torch.cuda.is_available() else "cpu")
+    paths = sorted(glob.glob(os.path.join(args.processed_dir, "*.npz")))[:args.max_cases]
+    assert len(paths) > 0, "No processed .npz files found."
+
+    model = None
+    if args.checkpoint:
+        model = load_model(args.checkpoint, device, in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES)
+
+    def case_dice(image, mask):
+        with torch.no_grad():
+            logits = model(torch.from_numpy(image[None]).to(device))
+        return dice_score(logits, torch.from_numpy(mask[None]).to(device))
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for image_dtype, mask_storage in SCHEMES:
+            nbytes, load_s, max_err, sq_err, n_vox, mask_exact, dices = 0, 0.0, 0.0, 0.0, 0, True, []
+            for path in paths:
+                ref_image, ref_mask = load_as_training_dtype(path)
+                out_path = os.path.join(tmpdir, "case.npz")
+                np.savez_compressed(out_path, **encode_case(ref_image, ref_mask, image_dtype, mask_storage))
+                nbytes += os.path.getsize(out_path)
+
+                start = time.perf_counter()
+                image, mask = load_as_training_dtype(out_path)
+                load_s += time.perf_counter() - start
+
+                err = np.abs(image - ref_image)
+                max_err = max(max_err, float(err.max()))
+                sq_err += float((err.astype(np.float64) ** 2).sum())
+                n_vox += err.size
+                mask_exact &= bool(np.array_equal(mask, (ref_mask > 0.5).astype(np.float32)))
+                if model is not None:
+                    dices.append((case_dice(ref_image, ref_mask), case_dice(image, ref_mask)))
+
+            row = {
+                "image_dtype": image_dtype,
+                "mask_storage": mask_storage,
+                "mb_per_case": nbytes / len(paths) / 1024 ** 2,
+                "load_ms_per_case": 1000 * load_s / len(paths),
+                "image_max_abs_err": max_err,
+                "image_rmse": float(np.sqrt(sq_err / n_vox)),
+                "mask_lossless": mask_exact,
+            }
+            if dices:
+                ref_d, new_d = np.mean(dices, axis=0)
+                row["dice"] = float(new_d)
+                row["dice_change"] = float(new_d - ref_d)
+            rows.append(row)
+
+    base = rows[0]
+    for row in rows:
+        row["disk_saving"] = 1 - row["mb_per_case"] / base["mb_per_case"]
+        row["load_speedup"] = base["load_ms_per_case"] / row["load_ms_per_case"]
+
+    print(f"{'image':>8} {'mask':>9} {'MB/case':>8} {'saving':>7} {'load ms':>8} {'speedup':>8} {'max err':>9} {'dDice':>8}")
+    for r in rows:
+        d = f"{r['dice_change']:+.4f}" if "dice_change" in r else "n/a"
+        print(f"{r['image_dtype']:>8} {r['mask_storage']:>9} {r['mb_per_case']:8.2f} {r['disk_saving']:7.1%} "
+              f"{r['load_ms_per_case']:8.1f} {r['load_speedup']:7.2f}x {r['image_max_abs_err']:9.2e} {d:>8}")
+
+    ensure_dir(os.path.dirname(args.out))
+    save_json({"cases": len(paths), "schemes": rows}, args.out)
+    print(f"Saved report to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,12 @@ from torch.cuda.amp import GradScaler, autocast
 from tqdm import tqdm
 
 from config import Config
-from models.unet3d import UNet3D
+from models.unet3d import UNet3D, UNET_VARIANTS, unet_spec
 from utils.dataset import get_train_val_loaders
 from utils.losses import BCEDiceLoss
 from utils.metrics import dice_score
 from utils.io_utils import ensure_dir, save_checkpoint
+from utils.case_cache import SharedCaseCache
 
 
 def train_epoch(model, loader, optimizer, criterion, device, scaler=None):
@@ -70,6 +71,11 @@ def main():
     parser.add_argument("--lr", type=float, default=Config.LR)
     parser.add_argument("--checkpoint_dir", type=str, default=Config.CHECKPOINT_DIR)
     parser.add_argument("--use_amp", action="store_true")
+    parser.add_argument("--model_variant", type=str, default=Config.MODEL_VARIANT, choices=list(UNET_VARIANTS))
+    parser.add_argument("--cache", action="store_true", default=Config.USE_CASE_CACHE,
+                        help="Serve decoded cases from shared memory after the first epoch")
+    parser.add_argument("--cache_dir", type=str, default=Config.CASE_CACHE_DIR)
+    parser.add_argument("--cache_max_gb", type=float, default=Config.CASE_CACHE_MAX_GB)
     args = parser.parse_args()
 
     cfg = Config()
@@ -77,15 +83,18 @@ def main():
 
     ensure_dir(args.checkpoint_dir)
 
+    cache = SharedCaseCache(args.cache_dir, args.cache_max_gb * 1024 ** 3) if args.cache else None
     train_loader, val_loader = get_train_val_loaders(
         cfg.PROCESSED_DIR,
         batch_size=args.batch_size,
         val_split=cfg.VALIDATION_SPLIT,
         num_workers=cfg.NUM_WORKERS,
         seed=cfg.RANDOM_SEED,
+        cache=cache,
     )
 
-    model = UNet3D(in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES).to(device)
+    model = UNet3D(in_channels=cfg.IN_CHANNELS, num_classes=cfg.NUM_CLASSES,
+                   **unet_spec(args.model_variant, **cfg.MODEL_OVERRIDES)).to(device)
     optimizer = optim.AdamW(model.parameters(), lr=args.lr, weight_decay=cfg.WEIGHT_DECAY)
     criterion = BCEDiceLoss()
     scaler = GradScaler() if args.use_amp and device.type == "cuda" else None
@@ -100,6 +109,10 @@ def main():
 
         print(f"Train Loss: {train_loss:.4f} | Train Dice: {train_dice:.4f}")
         print(f"Val   Loss: {val_loss:.4f} | Val   Dice: {val_dice:.4f}")
+        if cache is not None:
+            stats = cache.epoch_stats()
+            print(f"Cache hit rate: {stats['hit_rate']:.1%} ({stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['size_bytes'] / 1024 ** 3:.2f} GB)")
 
         if val_dice > best_val_dice:
             best_val_dice = val_dice
@@ -108,6 +121,7 @@ def main():
                 {
                     "epoch": epoch,
                     "model_state": model.state_dict(),
+                    "model_spec": model.spec,
                     "optimizer_state": optimizer.state_dict(),
                     "val_dice": val_dice,
                 },
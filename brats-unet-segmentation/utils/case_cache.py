@@ -0,0 +1,115 @@
+import os
+import multiprocessing as mp
+
+import numpy as np
+
+
+class SharedCaseCache:
+    """
+    Decoded-case cache on a tmpfs directory (e.g. /dev/shm) shared by all
+    DataLoader workers and epochs.
+
+    The first access to a case decompresses the .npz once and stores the
+    arrays as raw .npy files; later accesses from any worker memory-map them.
+    Total size is capped at max_bytes with least-recently-used eviction.
+    Hit/miss counters live in shared memory so the main process can report
+    per-epoch hit rates.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hits = mp.Value("q", 0)
+        self._misses = mp.Value("q", 0)
+        self._lock = mp.Lock()
+
+    def _key(self, path):
+        # Include the mtime so re-processed cases never hit a stale entry
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return f"{stem}_{os.stat(path).st_mtime_ns:x}"
+
+    def _entry_paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.image.npy", f"{base}.mask.npy"
+
+    def get(self, path, loader):
+        """Return (image, mask) for `path`, calling loader() only on a miss."""
+        image_path, mask_path = self._entry_paths(self._key(path))
+        try:
+            image = np.load(image_path, mmap_mode="r")
+            mask = np.load(mask_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            # ValueError: a concurrent writer's file is not complete yet
+            with self._misses.get_lock():
+                self._misses.value += 1
+            image, mask = loader()
+            self._put(image_path, mask_path, image, mask)
+            return image, mask
+
+        with self._hits.get_lock():
+            self._hits.value += 1
+        try:
+            os.utime(image_path)  # LRU timestamp
+        except FileNotFoundError:
+            pass
+        return image, mask
+
+    def _entries(self):
+        # (mtime, bytes, image path, mask path) per complete entry
+        entries = []
+        for e in os.scandir(self.cache_dir):
+            if not e.name.endswith(".image.npy"):
+                continue
+            mask_path = e.path[:-len(".image.npy")] + ".mask.npy"
+            try:
+                size = e.stat().st_size + os.path.getsize(mask_path)
+                entries.append((e.stat().st_mtime, size, e.path, mask_path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _put(self, image_path, mask_path, image, mask):
+        needed = image.nbytes + mask.nbytes
+        if needed > self.max_bytes:
+            return
+        with self._lock:
+            entries = sorted(self._entries())
+            used = sum(e[1] for e in entries)
+            while entries and used + needed > self.max_bytes:
+                _, size, old_image, old_mask = entries.pop(0)
+                for p in (old_image, old_mask):  # image first: it marks the entry as present
+                    try:
+                        os.remove(p)
+                    except FileNotFoundError:
+                        pass
+                used -= size
+
+            # Mask first, image last, each via rename, so readers never see half an entry
+            for target, arr in ((mask_path, mask), (image_path, image)):
+                tmp = f"{target}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, np.ascontiguousarray(arr))
+                os.replace(tmp, target)
+
+    def size_bytes(self):
+        return sum(e[1] for e in self._entries())
+
+    def epoch_stats(self, reset=True):
+        with self._hits.get_lock(), self._misses.get_lock():
+            hits, misses = self._hits.value, self._misses.value
+            if reset:
+                self._hits.value = 0
+                self._misses.value = 0
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "size_bytes": self.size_bytes(),
+        }
+
+    def clear(self):
+        for e in os.scandir(self.cache_dir):
+            if e.name.endswith(".npy") or e.name.endswith(".tmp"):
+                os.remove(e.path)
@@ -0,0 +1,72 @@
+import os
+import glob
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.transforms import (load_nii, load_nii_with_geometry, resample_volume, normalize_intensity,
+                              center_crop_or_pad, build_geometry)
+
+
+"""
+Shared case loading for preprocessing, CLI inference and the API.
+
+Each modality (and the segmentation) is read, resampled and normalized in
+its own thread. SimpleITK's reader and zlib decompression release the GIL,
+so the four NIfTI files are decoded concurrently instead of one by one.
+"""
+
+MODALITIES = ("t1", "t1ce", "t2", "flair")
+
+
+def find_case_files(case_dir, modalities=MODALITIES, with_seg=False):
+    """Returns (modality_paths, seg_path); seg_path is None unless with_seg."""
+    paths = []
+    for m in modalities:
+        found = glob.glob(os.path.join(case_dir, f"*_{m}.nii*"))
+        if len(found) != 1:
+            raise ValueError(f"Expected one file for modality {m} in {case_dir}, got {len(found)}.")
+        paths.append(found[0])
+
+    seg_path = None
+    if with_seg:
+        found = glob.glob(os.path.join(case_dir, "*_seg.nii*"))
+        if len(found) != 1:
+            raise ValueError(f"Expected one seg file in {case_dir}, got {len(found)}.")
+        seg_path = found[0]
+    return paths, seg_path
+
+
+def _load_modality(path, cfg):
+    vol, geometry = load_nii_with_geometry(path)
+    vol = resample_volume(vol, geometry["spacing"], cfg.TARGET_SPACING)
+    vol = normalize_intensity(vol, cfg.INTENSITY_CLIP)
+    return vol, geometry
+
+
+def _load_seg(path, cfg):
+    seg, spacing = load_nii(path)
+    seg = resample_volume(seg, spacing, cfg.TARGET_SPACING, order=0)
+    return np.clip(np.rint(seg), 0, 255).astype(np.uint8)
+
+
+def load_case(modality_paths, cfg, seg_path=None, max_workers=None):
+    """
+    Returns (image_vol, geometry, seg):
+    - image_vol: (C, *PATCH_SIZE) normalized, cropped/padded model input.
+    - geometry:  native geometry of the first modality plus resample/crop
+                 bookkeeping (see utils.transforms.build_geometry).
+    - seg:       uint8 label map resampled (nearest) to TARGET_SPACING but
+                 not cropped, or None.
+    """
+    n_jobs = len(modality_paths) + (seg_path is not None)
+    with ThreadPoolExecutor(max_workers=max_workers or n_jobs) as pool:
+        futures = [pool.submit(_load_modality, p, cfg) for p in modality_paths]
+        seg_future = pool.submit(_load_seg, seg_path, cfg) if seg_path is not None else None
+        loaded = [f.result() for f in futures]
+        seg = seg_future.result() if seg_future is not None else None
+
+    image_vol = np.stack([vol for vol, _ in loaded], axis=0)  # (C, D, H, W)
+    geometry = build_geometry(loaded[0][1], image_vol.shape[1:], cfg.PATCH_SIZE)
+    image_vol = center_crop_or_pad(image_vol, cfg.PATCH_SIZE)
+    return image_vol, geometry, seg
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+"""
+On-disk schema for processed cases (.npz).
+
+Images:
+- float32: 'image' as written by older versions of preprocess.py.
+- float16: 'image' in half precision (normalized intensities fit easily).
+- int16:   'image_q' quantized per channel with 'image_scale' (C,) so that
+           image = image_q * scale.
+Masks:
+- float32: 'mask' of 0/1 (legacy).
+- uint8:   'mask' of 0/1.
+- packbits: 'mask_bits' (C, ceil(DHW / 8)) and 'mask_shape'.
+
+decode_case reads any combination, so old and new files can be mixed.
+"""
+
+IMAGE_DTYPES = ("float32", "float16", "int16")
+MASK_STORAGE = ("float32", "uint8", "packbits")
+
+
+def encode_case(image, mask, image_dtype="float16", mask_storage="packbits"):
+    if image_dtype not in IMAGE_DTYPES:
+        raise ValueError(f"Unknown image dtype '{image_dtype}'. Choose from {IMAGE_DTYPES}.")
+    if mask_storage not in MASK_STORAGE:
+        raise ValueError(f"Unknown mask storage '{mask_storage}'. Choose from {MASK_STORAGE}.")
+
+    arrays = {}
+    if image_dtype == "int16":
+        peak = np.abs(image).reshape(image.shape[0], -1).max(axis=1)
+        scale = np.where(peak > 0, peak / 32767.0, 1.0).astype(np.float32)
+        arrays["image_q"] = np.rint(image / scale[:, None, None, None]).astype(np.int16)
+        arrays["image_scale"] = scale
+    else:
+        arrays["image"] = image.astype(image_dtype)
+
+    binary = mask > 0.5
+    if mask_storage == "packbits":
+        arrays["mask_bits"] = np.packbits(binary.reshape(binary.shape[0], -1), axis=1)
+        arrays["mask_shape"] = np.array(mask.shape, dtype=np.int64)
+    else:
+        arrays["mask"] = binary.astype(mask_storage)
+    return arrays
+
+
+def decode_case(data):
+    """
+    Returns (image, mask) from an opened .npz. Images stay float16 when stored
+    that way and masks come back as uint8, so callers (and caches) hold the
+    compact arrays; convert to the training dtype at the last moment.
+    """
+    if "image_q" in data:
+        image = data["image_q"].astype(np.float32) * data["image_scale"][:, None, None, None]
+    else:
+        image = data["image"]
+
+    if "mask_bits" in data:
+        shape = tuple(int(s) for s in data["mask_shape"])
+        mask = np.unpackbits(data["mask_bits"], axis=1, count=int(np.prod(shape[1:]))).reshape(shape)
+    else:
+        mask = data["mask"]
+    return image, mask
@@ -1,48 +1,62 @@
 import os
 import glob
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 import torch
 from torch.utils.data import Dataset
 import numpy as np
 
+from utils.io_utils import save_json, load_json
+from utils.case_storage import decode_case
+
 
 class BratsNumpyDataset(Dataset):
     """
-    Expects .npz files with keys:
-    - 'image': (C, D, H, W)
-    - 'mask':  (C, D, H, W) or (1, D, H, W)
+    Expects .npz files with an image (C, D, H, W) and a mask (C, D, H, W)
+    or (1, D, H, W), stored in any schema from utils.case_storage. Compact
+    float16/int16 images and uint8/bit-packed masks are converted to float32 here.
+
+    An optional utils.case_cache.SharedCaseCache serves decoded cases from
+    shared memory after the first read.
     """
 
-    def __init__(self, file_paths: List[str]):
+    def __init__(self, file_paths: List[str], cache=None):
         self.file_paths = file_paths
+        self.cache = cache
 
     def __len__(self):
         return len(self.file_paths)
 
+    @staticmethod
+    def load_case(path: str):
+        return decode_case(np.load(path))
+
     def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
         path = self.file_paths[idx]
-        data = np.load(path)
-        image = data["image"]
-        mask = data["mask"]
-        return torch.from_numpy(image).float(), torch.from_numpy(mask).float()
+        if self.cache is None:
+            image, mask = self.load_case(path)
+            return torch.from_numpy(image).float(), torch.from_numpy(mask).float()
+
+        # Cached arrays are read-only memory maps; copy them out as float32
+        image, mask = self.cache.get(path, lambda: self.load_case(path))
+        return (torch.from_numpy(np.array(image, dtype=np.float32)),
+                torch.from_numpy(np.array(mask, dtype=np.float32)))
 
 
-def get_train_val_loaders(processed_dir, batch_size, val_split, num_workers, seed):
+def get_train_val_loaders(processed_dir, batch_size, val_split, num_workers, seed, cache=None):
     npz_files = sorted(glob.glob(os.path.join(processed_dir, "*.npz")))
     assert len(npz_files) > 0, "No processed .npz files found."
 
-    import numpy as np
-    np.random.seed(seed)
-    np.random.shuffle(npz_files)
+    # Local RNG: same permutation as np.random.seed + shuffle, without touching global state
+    np.random.RandomState(seed).shuffle(npz_files)
 
     n_total = len(npz_files)
     n_val = int(n_total * val_split)
     val_files = npz_files[:n_val]
     train_files = npz_files[n_val:]
 
-    train_ds = BratsNumpyDataset(train_files)
-    val_ds = BratsNumpyDataset(val_files)
+    train_ds = BratsNumpyDataset(train_files, cache=cache)
+    val_ds = BratsNumpyDataset(val_files, cache=cache)
 
     from torch.utils.data import DataLoader
     train_loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True,
@@ -52,3 +66,63 @@ def get_train_val_loaders(processed_dir, batch_size, val_split, num_workers, see
 
     return train_loader, val_loader
 
+
+def case_tumor_volume(path: str) -> int:
+    """Whole-tumour voxel count (mask channel 0) of a processed case."""
+    return int((BratsNumpyDataset.load_case(path)[1][0] > 0.5).sum())
+
+
+def make_stratified_folds(npz_files: List[str], n_folds: int, seed: int) -> Dict:
+    """
+    Deterministic k-fold split stratified by tumour volume: cases are sorted
+    by volume, cut into consecutive groups of n_folds, and each group is
+    spread over all folds in a seeded random order.
+    """
+    rng = np.random.RandomState(seed)
+    volumes = {os.path.basename(p): case_tumor_volume(p) for p in npz_files}
+    ordered = sorted(volumes, key=lambda name: (volumes[name], name))
+
+    fold_of = {}
+    for start in range(0, len(ordered), n_folds):
+        group = ordered[start:start + n_folds]
+        for name, fold in zip(group, rng.permutation(n_folds)):
+            fold_of[name] = int(fold)
+
+    folds = []
+    for k in range(n_folds):
+        folds.append({
+            "fold": k,
+            "train": sorted(n for n, f in fold_of.items() if f != k),
+            "val": sorted(n for n, f in fold_of.items() if f == k),
+        })
+    return {"n_folds": n_folds, "seed": seed, "volumes": volumes, "folds": folds}
+
+
+def load_or_create_fold_manifest(processed_dir, manifest_path, n_folds, seed) -> Dict:
+    """Write the fold manifest once; later runs reuse it so folds never drift."""
+    if os.path.exists(manifest_path):
+        manifest = load_json(manifest_path)
+        assert manifest["n_folds"] == n_folds, \
+            f"{manifest_path} has {manifest['n_folds']} folds; delete it to re-split."
+        return manifest
+
+    npz_files = sorted(glob.glob(os.path.join(processed_dir, "*.npz")))
+    assert len(npz_files) >= n_folds, "Not enough processed .npz files for the requested folds."
+    manifest = make_stratified_folds(npz_files, n_folds, seed)
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    save_json(manifest, manifest_path)
+    return manifest
+
+
+def get_fold_loaders(manifest, fold, processed_dir, batch_size, num_workers, cache=None):
+    split = manifest["folds"][fold]
+    train_ds = BratsNumpyDataset([os.path.join(processed_dir, n) for n in split["train"]], cache=cache)
+    val_ds = BratsNumpyDataset([os.path.join(processed_dir, n) for n in split["val"]], cache=cache)
+
+    from torch.utils.data import DataLoader
+    train_loader = DataLoader(train_ds, batch_size=batch_size, shuffle=True,
+                              num_workers=num_workers, pin_memory=True)
+    val_loader = DataLoader(val_ds, batch_size=batch_size, shuffle=False,
+                            num_workers=num_workers, pin_memory=True)
+    return train_loader, val_loader
+
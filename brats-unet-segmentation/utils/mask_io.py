@@ -0,0 +1,178 @@
+import io
+import os
+
+import numpy as np
+
+from utils.transforms import save_nii, invert_to_native
+
+
+"""
+Compact storage for binary region masks (C, D, H, W).
+
+Formats:
+- npy:      legacy float32 array (np.save), ~25 MB per 3x128^3 case.
+- packbits: one bit per voxel per channel (np.packbits), ~0.8 MB.
+- labels:   single uint8 map where bit c is set if channel c is on.
+- rle:      run-length encoded label map (values + run lengths).
+
+Everything except npy is an .npz holding 'format', 'shape' and optionally
+'spacing' (z, y, x) next to the payload, so readers can unpack lazily.
+"""
+
+MASK_FORMATS = ("npy", "packbits", "labels", "rle")
+
+
+def mask_filename(stem, fmt):
+    return f"{stem}.npy" if fmt == "npy" else f"{stem}.npz"
+
+
+def to_label_map(mask, threshold=0.5):
+    # mask: (C, D, H, W) -> (D, H, W) uint8 bitfield, up to 8 channels
+    assert mask.shape[0] <= 8, "Label map supports at most 8 channels."
+    labels = np.zeros(mask.shape[1:], dtype=np.uint8)
+    for c in range(mask.shape[0]):
+        labels |= (mask[c] > threshold).view(np.uint8) << c
+    return labels
+
+
+def from_label_map(labels, num_channels):
+    bits = (1 << np.arange(num_channels, dtype=np.uint8))[:, None, None, None]
+    return (labels[None] & bits) > 0
+
+
+def rle_encode(labels):
+    flat = labels.ravel()
+    starts = np.concatenate([[0], np.flatnonzero(flat[1:] != flat[:-1]) + 1])
+    lengths = np.diff(np.append(starts, flat.size)).astype(np.uint32)
+    return flat[starts], lengths
+
+
+def rle_decode(values, lengths, shape):
+    return np.repeat(values, lengths).reshape(shape)
+
+
+def encode_mask(mask, fmt="packbits", threshold=0.5, spacing=None):
+    """Return the arrays to store for a (C, D, H, W) mask in the given format."""
+    if fmt not in MASK_FORMATS or fmt == "npy":
+        raise ValueError(f"Unknown compact mask format '{fmt}'. Choose from {MASK_FORMATS[1:]}.")
+    arrays = {"format": np.array(fmt), "shape": np.array(mask.shape, dtype=np.int64)}
+    if spacing is not None:
+        arrays["spacing"] = np.asarray(spacing, dtype=np.float32)
+
+    if fmt == "packbits":
+        binary = mask.reshape(mask.shape[0], -1) > threshold
+        arrays["bits"] = np.packbits(binary, axis=1)
+    elif fmt == "labels":
+        arrays["labels"] = to_label_map(mask, threshold)
+    else:
+        arrays["values"], arrays["lengths"] = rle_encode(to_label_map(mask, threshold))
+    return arrays
+
+
+def save_mask(path, mask, fmt="packbits", compress=True, threshold=0.5, spacing=None):
+    if fmt == "npy":
+        np.save(path, mask.astype(np.float32))
+        return path
+    arrays = encode_mask(mask, fmt, threshold, spacing)
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+    return path
+
+
+def mask_to_bytes(mask, fmt="packbits", compress=True, spacing=None):
+    buf = io.BytesIO()
+    if fmt == "npy":
+        np.save(buf, np.asarray(mask, dtype=np.float32))
+    else:
+        arrays = encode_mask(mask, fmt, spacing=spacing)
+        (np.savez_compressed if compress else np.savez)(buf, **arrays)
+    return buf.getvalue()
+
+
+class LazyMask:
+    """
+    Read-only view over a stored mask. Channels are unpacked on access,
+    so reading only the WT channel never materializes the full stack. The
+    packed bits (1/8 of a bool stack) are decompressed from the .npz once
+    and kept; NpzFile would inflate the whole member again on every access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path.endswith(".npy"):
+            self._npy = np.load(path, mmap_mode="r")
+            self._npz = None
+            self.format = "npy"
+            self.shape = tuple(self._npy.shape)
+            self.spacing = None
+        else:
+            self._npy = None
+            self._npz = np.load(path)
+            self.format = str(self._npz["format"])
+            self.shape = tuple(int(s) for s in self._npz["shape"])
+            self.spacing = self._npz["spacing"] if "spacing" in self._npz.files else None
+        self._labels = None
+        self._bits = None
+
+    @property
+    def num_channels(self):
+        return self.shape[0]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, c):
+        spatial = self.shape[1:]
+        if self.format == "npy":
+            return np.asarray(self._npy[c]) > 0.5
+        if self.format == "packbits":
+            if self._bits is None:
+                self._bits = self._npz["bits"]
+            bits = self._bits[c]
+            return np.unpackbits(bits, count=int(np.prod(spatial))).reshape(spatial).view(bool)
+        return (self.label_map() >> c) & 1 > 0
+
+    def label_map(self):
+        if self._labels is None:
+            if self.format == "labels":
+                self._labels = self._npz["labels"]
+            elif self.format == "rle":
+                self._labels = rle_decode(self._npz["values"], self._npz["lengths"], self.shape[1:])
+            else:
+                self._labels = to_label_map(self.to_array(bool))
+        return self._labels
+
+    def to_array(self, dtype=np.float32):
+        if self.format in ("labels", "rle"):
+            return from_label_map(self.label_map(), self.num_channels).astype(dtype, copy=False)
+        return np.stack([self[c] for c in range(self.num_channels)]).astype(dtype, copy=False)
+
+
+def load_mask(path):
+    return LazyMask(path)
+
+
+def export_mask_nii(mask, spacing, out_path):
+    """
+    Write a (C, D, H, W) mask or LazyMask as a uint8 NIfTI label map
+    (bit c set for channel c) with the given (z, y, x) spacing.
+    """
+    labels = mask.label_map() if isinstance(mask, LazyMask) else to_label_map(mask)
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    save_nii(labels, spacing, out_path, dtype=np.uint8)
+    return out_path
+
+
+def export_mask_native_nii(mask, geometry, out_path):
+    """
+    Write a model-space mask back onto the original scan grid (see
+    utils.transforms.build_geometry) with its spacing, origin and direction.
+    """
+    labels = mask.label_map() if isinstance(mask, LazyMask) else to_label_map(mask)
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    save_nii(invert_to_native(labels, geometry), geometry["spacing"], out_path, dtype=np.uint8,
+             origin=geometry["origin"], direction=geometry["direction"])
+    return out_path
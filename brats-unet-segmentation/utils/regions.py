@@ -0,0 +1,35 @@
+import numpy as np
+
+
+"""
+Label map -> region channels via a lookup table.
+
+A region is a set of integer labels; the LUT has one row per region and one
+column per label value, so every region channel comes out of a single
+np.take over the label volume into a preallocated uint8 buffer.
+"""
+
+REGION_DEFINITIONS = {
+    # BraTS 2018-2021: 1 = necrotic core, 2 = edema, 4 = enhancing tumour
+    "brats2021": (("WT", (1, 2, 4)), ("TC", (1, 4)), ("ET", (4,))),
+    # BraTS 2023: enhancing tumour relabelled from 4 to 3
+    "brats2023": (("WT", (1, 2, 3)), ("TC", (1, 3)), ("ET", (3,))),
+}
+
+
+def build_region_lut(regions, num_labels=256):
+    """regions: sequence of (name, labels). Returns a (C, num_labels) uint8 LUT."""
+    lut = np.zeros((len(regions), num_labels), dtype=np.uint8)
+    for c, (_, labels) in enumerate(regions):
+        lut[c, list(labels)] = 1
+    return lut
+
+
+def encode_regions(seg, lut, out=None):
+    """
+    seg: integer label volume (D, H, W) with values < lut.shape[1].
+    Returns (C, D, H, W) uint8, written into `out` if given.
+    """
+    if out is None:
+        out = np.empty((lut.shape[0],) + seg.shape, dtype=np.uint8)
+    return np.take(lut, seg, axis=1, out=out, mode="clip")
@@ -11,15 +11,33 @@ def load_nii(path: str):
     return arr.astype(np.float32), np.array(spacing, dtype=np.float32)
 
 
-def save_nii(volume: np.ndarray, ref_spacing, out_path: str):
-    img = sitk.GetImageFromArray(volume.astype(np.float32))
-    img.SetSpacing(tuple(ref_spacing[::-1]))
+def load_nii_with_geometry(path: str):
+    """Like load_nii, but also returns the shape, origin and direction needed to write results back."""
+    img = sitk.ReadImage(path)
+    arr = sitk.GetArrayFromImage(img)  # (D, H, W)
+    geometry = {
+        "shape": tuple(arr.shape),
+        "spacing": np.array(img.GetSpacing()[::-1], dtype=np.float32),  # (z, y, x)
+        "origin": img.GetOrigin(),        # SimpleITK (x, y, z) order
+        "direction": img.GetDirection(),  # SimpleITK (x, y, z) order
+    }
+    return arr.astype(np.float32), geometry
+
+
+def save_nii(volume: np.ndarray, ref_spacing, out_path: str, dtype=np.float32, origin=None, direction=None):
+    img = sitk.GetImageFromArray(volume.astype(dtype))
+    img.SetSpacing(tuple(float(s) for s in ref_spacing[::-1]))
+    if origin is not None:
+        img.SetOrigin(tuple(float(o) for o in origin))
+    if direction is not None:
+        img.SetDirection(tuple(float(d) for d in direction))
     sitk.WriteImage(img, out_path)
 
 
-def resample_volume(volume: np.ndarray, original_spacing, target_spacing):
-    zoom_factors = original_spacing / target_spacing
-    return zoom(volume, zoom_factors, order=1)
+def resample_volume(volume: np.ndarray, original_spacing, target_spacing, order=1):
+    # order=0 (nearest) for label maps, so no fractional labels are invented
+    zoom_factors = np.asarray(original_spacing) / np.asarray(target_spacing)
+    return zoom(volume, zoom_factors, order=order)
 
 
 def normalize_intensity(volume: np.ndarray, clip=(-1000, 4000)):
@@ -34,26 +52,52 @@ def to_tensor(volume: np.ndarray):
     return torch.from_numpy(volume).float()
 
 
+def crop_or_pad_offsets(shape, target_shape):
+    # Per axis: (source start, destination start, copied length)
+    offsets = []
+    for n, t in zip(shape, target_shape):
+        offsets.append((max((n - t) // 2, 0), max((t - n) // 2, 0), min(n, t)))
+    return offsets
+
+
 def center_crop_or_pad(volume: np.ndarray, target_shape):
     # volume: (C, D, H, W)
-    c, d, h, w = volume.shape
-    td, th, tw = target_shape
-    out = np.zeros((c, td, th, tw), dtype=volume.dtype)
-    sd = max((td - d) // 2, 0)
-    sh = max((th - h) // 2, 0)
-    sw = max((tw - w) // 2, 0)
-
-    d_start = max((d - td) // 2, 0)
-    h_start = max((h - th) // 2, 0)
-    w_start = max((w - tw) // 2, 0)
-
-    d_end = d_start + min(td, d)
-    h_end = h_start + min(th, h)
-    w_end = w_start + min(tw, w)
-
-    out[:, sd:sd + (d_end - d_start),
-        sh:sh + (h_end - h_start),
-        sw:sw + (w_end - w_start)] = volume[:, d_start:d_end,
-                                            h_start:h_end,
-                                            w_start:w_end]
+    c = volume.shape[0]
+    (d_start, sd, ld), (h_start, sh, lh), (w_start, sw, lw) = crop_or_pad_offsets(volume.shape[1:], target_shape)
+    out = np.zeros((c, *target_shape), dtype=volume.dtype)
+    out[:, sd:sd + ld, sh:sh + lh, sw:sw + lw] = volume[:, d_start:d_start + ld,
+                                                       h_start:h_start + lh,
+                                                       w_start:w_start + lw]
+    return out
+
+
+def build_geometry(native_geometry, resampled_shape, target_shape):
+    """Record everything invert_to_native needs to undo resample + crop/pad."""
+    geometry = dict(native_geometry)
+    geometry["resampled_shape"] = tuple(resampled_shape)
+    geometry["crop"] = crop_or_pad_offsets(resampled_shape, target_shape)
+    return geometry
+
+
+def invert_to_native(volume: np.ndarray, geometry):
+    """
+    Map a (..., D, H, W) array from the cropped, resampled model grid back to
+    the native grid with nearest-neighbour lookup, as a single gather.
+    Voxels that were cropped away come back as 0.
+    """
+    index, valid = [], []
+    for axis in range(3):
+        n_native = geometry["shape"][axis]
+        n_resampled = geometry["resampled_shape"][axis]
+        src, dst, length = geometry["crop"][axis]
+        # scipy.ndimage.zoom aligns corners: native i <-> resampled i * (n_resampled - 1) / (n_native - 1)
+        r = np.rint(np.arange(n_native) * ((n_resampled - 1) / max(n_native - 1, 1))).astype(np.intp)
+        ok = (r >= src) & (r < src + length)
+        index.append(np.where(ok, r - src + dst, 0))
+        valid.append(ok)
+
+    out = volume[..., index[0][:, None, None], index[1][None, :, None], index[2][None, None, :]]
+    out[..., ~valid[0], :, :] = 0
+    out[..., :, ~valid[1], :] = 0
+    out[..., :, :, ~valid[2]] = 0
     return out
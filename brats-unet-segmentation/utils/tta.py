@@ -0,0 +1,44 @@
+import torch
+
+
+# Axis-flip combinations over the spatial dims (D, H, W) = (2, 3, 4) of a
+# (B, C, D, H, W) batch. Single-axis flips come first, so a small
+# n_variants still covers every axis.
+TTA_FLIPS = [(), (2,), (3,), (4,), (2, 3), (2, 4), (3, 4), (2, 3, 4)]
+
+
+def _flip(t, dims):
+    return t.flip(dims) if dims else t
+
+
+def flip_tta(model, x, n_variants=8, batch_size=None):
+    """
+    Run `model` on up to 8 flipped copies of `x` (1, C, D, H, W), batched into
+    as few forward passes as `batch_size` allows (default: all at once).
+
+    Returns (mean_logits, prob_std), both (1, num_classes, D, H, W) on x.device.
+    prob_std is the per-voxel standard deviation of the sigmoid probabilities
+    across variants and serves as an uncertainty map.
+    """
+    flips = TTA_FLIPS[:max(1, min(n_variants, len(TTA_FLIPS)))]
+    batch_size = batch_size or len(flips)
+
+    logit_sum = prob_sum = prob_sq = None
+    with torch.no_grad():
+        for i in range(0, len(flips), batch_size):
+            group = flips[i:i + batch_size]
+            logits = model(torch.cat([_flip(x, dims) for dims in group], dim=0))
+            for j, dims in enumerate(group):
+                l = _flip(logits[j:j + 1], dims)
+                p = torch.sigmoid(l)
+                if logit_sum is None:
+                    logit_sum, prob_sum, prob_sq = l.clone(), p, p * p
+                else:
+                    logit_sum += l
+                    prob_sum += p
+                    prob_sq += p * p
+
+    n = len(flips)
+    mean_prob = prob_sum / n
+    prob_std = (prob_sq / n - mean_prob * mean_prob).clamp_(min=0).sqrt_()
+    return logit_sum / n, prob_std
@@ -1,12 +1,24 @@
 import os
+import io
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-import matplotlib.pyplot as plt
+from PIL import Image
+
+
+# RGB colours for the WT, TC, ET channels. Channels are painted in order,
+# so nested sub-regions (TC inside WT, ET inside TC) stay visible.
+LABEL_COLORS = np.array([
+    [0.0, 0.8, 0.0],    # WT - green
+    [1.0, 0.85, 0.0],   # TC - yellow
+    [1.0, 0.0, 0.3],    # ET - red
+], dtype=np.float32)
 
 
 def overlay_mask(image_slice, mask_slice, alpha=0.4):
     # image_slice: 2D
     # mask_slice:  2D (binary or multi-label)
-    img = (image_slice - image_slice.min()) / (image_slice.ptp() + 1e-8)
+    img = (image_slice - image_slice.min()) / (np.ptp(image_slice) + 1e-8)
     mask = mask_slice.astype(bool)
 
     rgb = np.stack([img, img, img], axis=-1)
@@ -17,6 +29,12 @@ def overlay_mask(image_slice, mask_slice, alpha=0.4):
 
 
 def save_overlay_grid(volume, mask, out_path, n_slices=16):
+    # matplotlib is only needed for this figure-based variant; the hot path
+    # uses render_overlay_mosaic below.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
     d = volume.shape[0]
     indices = np.linspace(0, d - 1, n_slices, dtype=int)
 
@@ -39,3 +57,70 @@ def save_overlay_grid(volume, mask, out_path, n_slices=16):
     plt.tight_layout()
     plt.savefig(out_path, dpi=150)
     plt.close(fig)
+
+
+def render_overlay_mosaic(volume, mask, n_slices=16, cols=4, alpha=0.4, colors=LABEL_COLORS):
+    """
+    Compose evenly spaced axial slices into one uint8 RGB mosaic.
+
+    volume: (D, H, W) background intensities.
+    mask:   (D, H, W) binary mask or (C, D, H, W) region channels (WT, TC, ET).
+    Returns an array of shape (rows * H, cols * W, 3).
+    """
+    d, h, w = volume.shape
+    indices = np.linspace(0, d - 1, n_slices, dtype=int)
+    rows = int(np.ceil(n_slices / cols))
+
+    # Per-slice min/max normalization, all slices at once.
+    slices = volume[indices].astype(np.float32)
+    lo = slices.min(axis=(1, 2), keepdims=True)
+    hi = slices.max(axis=(1, 2), keepdims=True)
+    gray = (slices - lo) / (hi - lo + 1e-8)
+
+    if mask.ndim == 3:
+        mask = mask[None]
+    mask = mask[:len(colors)]
+    picked = mask[:, indices] > 0.5  # (C, n, H, W)
+
+    # Label of the last channel that is set per pixel (0 = background).
+    weights = np.arange(1, picked.shape[0] + 1, dtype=np.uint8)[:, None, None, None]
+    labels = (picked * weights).max(axis=0)
+
+    palette = np.vstack([np.zeros((1, 3), dtype=np.float32), colors[:picked.shape[0]]])
+    color = palette[labels]                                     # (n, H, W, 3)
+    a = np.where(labels > 0, np.float32(alpha), np.float32(0))[..., None]
+    rgb = gray[..., None] * (1 - a) + color * a
+
+    tiles = np.zeros((rows * cols, h, w, 3), dtype=np.uint8)
+    tiles[:n_slices] = np.clip(rgb * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    return tiles.reshape(rows, cols, h, w, 3).transpose(0, 2, 1, 3, 4).reshape(rows * h, cols * w, 3)
+
+
+def encode_png(image, compress_level=1):
+    """Encode an (H, W, 3) uint8 array as PNG bytes."""
+    buf = io.BytesIO()
+    Image.fromarray(image).save(buf, format="PNG", compress_level=compress_level)
+    return buf.getvalue()
+
+
+def overlay_png_bytes(volume, mask, **kwargs):
+    return encode_png(render_overlay_mosaic(volume, mask, **kwargs))
+
+
+def save_overlay_mosaic(volume, mask, out_path, **kwargs):
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(out_path, "wb") as f:
+        f.write(overlay_png_bytes(volume, mask, **kwargs))
+    return out_path
+
+
+def render_overlays_parallel(cases, max_workers=None, **kwargs):
+    """
+    Render PNG overlays for many (volume, mask) pairs in a thread pool.
+    NumPy slicing and Pillow's zlib encoder release the GIL for most of the work.
+    Returns a list of PNG bytes in input order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda vm: overlay_png_bytes(vm[0], vm[1], **kwargs), cases))